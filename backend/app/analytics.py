@@ -0,0 +1,246 @@
+import fcntl
+import json
+import os
+import threading
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+from app.batch import BatchResult
+from app.formulas.strategies import resolve_macro_strategy
+from app.models import (
+    ActivityLevel,
+    AnalyticsDimension,
+    AnalyticsGroup,
+    AnalyticsMetric,
+    AnalyticsOutput,
+    AnalyticsQuery,
+    ForecastModel,
+    Goal,
+    MacroStrategy,
+    MetricSummary,
+    Sex,
+    UserInput,
+)
+
+# Dimensions are stored as the index of the value in its enum.
+DIMENSIONS: dict[AnalyticsDimension, type[Enum]] = {
+    AnalyticsDimension.sex: Sex,
+    AnalyticsDimension.activity_level: ActivityLevel,
+    AnalyticsDimension.goal: Goal,
+    AnalyticsDimension.forecast_model: ForecastModel,
+    AnalyticsDimension.macro_strategy: MacroStrategy,
+}
+_CODES: dict[AnalyticsDimension, dict[Enum, int]] = {
+    dim: {value: i for i, value in enumerate(enum)} for dim, enum in DIMENSIONS.items()
+}
+
+# Stored as-is from the BatchResult column of the same name.
+_RESULT_COLUMNS = (
+    "bmi",
+    "bmr",
+    "tdee",
+    "body_fat_percent_estimate",
+    "ffmi",
+    "calories_total",
+    "protein_g",
+    "fat_g",
+    "net_carbs_g",
+)
+
+# Every stored column and its on-disk dtype (little-endian, one raw file each).
+COLUMNS: dict[str, np.dtype] = {
+    **{dim.value: np.dtype("u1") for dim in DIMENSIONS},
+    **{name: np.dtype("<f8") for name in (*_RESULT_COLUMNS, "weight_kg", "weight_change_kg")},
+}
+
+# Metrics computed at query time from stored columns: (numerator, kcal per gram).
+_SHARES: dict[AnalyticsMetric, tuple[str, float]] = {
+    AnalyticsMetric.protein_pct: ("protein_g", 4.0),
+    AnalyticsMetric.fat_pct: ("fat_g", 9.0),
+    AnalyticsMetric.net_carbs_pct: ("net_carbs_g", 4.0),
+}
+
+
+class ResultStore:
+    """
+    Append-only columnar store of calculation results in `directory`.
+
+    Each column is one raw file that queries memory-map, so a query reads only the
+    columns it uses, never whole rows or models. `rows.json` holds the committed row
+    count and is replaced only after every column is written; bytes past it (from an
+    interrupted append) are ignored and truncated by the next append. Appends hold an
+    exclusive `flock` on `.lock` in the directory, so the worker processes of one
+    server can share it; queries take no lock.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._meta = self.directory / "rows.json"
+        self._lockfile = self.directory / ".lock"
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        try:
+            return json.loads(self._meta.read_text())["rows"]
+        except FileNotFoundError:
+            return 0
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.col"
+
+    def column(self, name: str, rows: int | None = None) -> np.ndarray:
+        """Read-only memory map of the first `rows` (default: all committed) values."""
+        dtype = COLUMNS[name]
+        rows = len(self) if rows is None else rows
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,))
+
+    def append(self, columns: dict[str, np.ndarray]) -> int:
+        """Append one value per row to every column; returns the new row count."""
+        if set(columns) != set(COLUMNS):
+            raise ValueError(f"columns must be exactly: {', '.join(COLUMNS)}")
+        n = {len(values) for values in columns.values()}
+        if len(n) != 1:
+            raise ValueError("columns must have the same length")
+
+        with self._lock, open(self._lockfile, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            rows = len(self)
+            for name, dtype in COLUMNS.items():
+                path = self._path(name)
+                with open(path, "ab") as f:
+                    f.truncate(rows * dtype.itemsize)
+                    f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+            rows += n.pop()
+            tmp = self._meta.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"rows": rows}))
+            os.replace(tmp, self._meta)
+        return rows
+
+    def append_batch(self, users: list[UserInput], result: BatchResult) -> int:
+        """Append the successful rows of `calculate_batch(users)`."""
+        ok = np.array([e is None for e in result.errors], dtype=bool)
+        rows = np.flatnonzero(ok)
+        kept = [users[i] for i in rows.tolist()]
+
+        weight = result.weight_kg[rows]
+        weeks = result.forecast_weeks[rows]
+        eq = result.equilibrium_weight_kg[rows]
+        final = np.where(
+            result.adaptive[rows],
+            eq + (weight - eq) * result.retention[rows] ** weeks,
+            weight + weeks * result.delta_kg_per_week[rows],
+        )
+        values = {
+            "weight_kg": weight,
+            "weight_change_kg": np.maximum(final, 0.0) - weight,
+        }
+        for name in _RESULT_COLUMNS:
+            values[name] = getattr(result, name)[rows]
+        for dim, codes in _CODES.items():
+            if dim == AnalyticsDimension.macro_strategy:
+                values[dim.value] = [codes[resolve_macro_strategy(u)] for u in kept]
+            else:
+                values[dim.value] = [codes[getattr(u, dim.value)] for u in kept]
+        return self.append(values)
+
+    def _metric(self, metric: AnalyticsMetric, rows: int, index: np.ndarray | None) -> np.ndarray:
+        def load(name: str) -> np.ndarray:
+            column = self.column(name, rows)
+            return column if index is None else column[index]
+
+        if metric in _SHARES:
+            name, kcal_per_g = _SHARES[metric]
+            return load(name) * kcal_per_g / load("calories_total") * 100.0
+        return np.asarray(load(metric.value), dtype=np.float64)
+
+    def aggregate(self, query: AnalyticsQuery) -> AnalyticsOutput:
+        """
+        Counts, means, percentiles and histograms of `query.metrics` per group.
+
+        Groups are the distinct combinations of `query.group_by` present in the
+        selected rows. Each metric is one column scan: group means with a bincount,
+        percentiles from one sort by (group, value) with linear interpolation as
+        np.percentile does, and histograms over shared bin edges with one bincount.
+        Raises ValueError for an unknown `where` value.
+        """
+        rows = len(self)
+        index = None
+        for dim, value in query.where.items():
+            try:
+                code = _CODES[dim][DIMENSIONS[dim](value)]
+            except ValueError:
+                raise ValueError(f"Unknown {dim.value}: {value}") from None
+            selected = self.column(dim.value, rows) == code
+            index = np.flatnonzero(selected) if index is None else index[selected[index]]
+        n = rows if index is None else len(index)
+
+        key = np.zeros(n, dtype=np.int64)
+        for dim in query.group_by:
+            column = self.column(dim.value, rows)
+            key = key * len(DIMENSIONS[dim]) + (column if index is None else column[index])
+        groups, inverse = np.unique(key, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(groups))
+
+        q = np.array(query.percentiles, dtype=np.float64) / 100.0
+        starts = np.cumsum(counts) - counts
+        pos = starts[:, None] + q[None, :] * (counts - 1)[:, None]
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.ceil(pos).astype(np.intp)
+        frac = pos - lo
+
+        bin_edges: dict[AnalyticsMetric, list[float]] = {}
+        summaries: dict[AnalyticsMetric, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        for metric in dict.fromkeys(query.metrics):
+            values = self._metric(metric, rows, index)
+            means = np.bincount(inverse, weights=values, minlength=len(groups)) / counts
+            ordered = values[np.lexsort((values, inverse))]
+            if n:
+                pct = ordered[lo] + (ordered[hi] - ordered[lo]) * frac
+            else:
+                pct = np.empty((0, len(q)))
+            edges = np.histogram_bin_edges(values, bins=query.bins)
+            bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, query.bins - 1)
+            hist = np.bincount(inverse * query.bins + bins, minlength=len(groups) * query.bins)
+            bin_edges[metric] = edges.tolist()
+            summaries[metric] = (means, pct, hist.reshape(len(groups), query.bins))
+
+        names = [f"p{p:g}" for p in query.percentiles]
+        out = []
+        for g, packed in enumerate(groups.tolist()):
+            key: dict[AnalyticsDimension, str] = {}
+            for dim in reversed(query.group_by):
+                packed, code = divmod(packed, len(DIMENSIONS[dim]))
+                key[dim] = list(DIMENSIONS[dim])[code].value
+            metrics = {}
+            for metric, (means, pct, hist) in summaries.items():
+                metrics[metric] = MetricSummary.model_construct(
+                    mean=float(means[g]),
+                    percentiles=dict(zip(names, pct[g].tolist(), strict=True)),
+                    histogram=hist[g].tolist(),
+                )
+            out.append(
+                AnalyticsGroup.model_construct(
+                    key=dict(reversed(key.items())), count=int(counts[g]), metrics=metrics
+                )
+            )
+        return AnalyticsOutput.model_construct(rows=n, bin_edges=bin_edges, groups=out)
+
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR")
+
+_store: ResultStore | None = None
+_store_lock = threading.Lock()
+
+
+def results_store() -> ResultStore | None:
+    """The store at ANALYTICS_DIR, opened on first use, or None when it is not set."""
+    global _store
+    with _store_lock:
+        if _store is None and ANALYTICS_DIR:
+            _store = ResultStore(ANALYTICS_DIR)
+        return _store
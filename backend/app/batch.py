@@ -0,0 +1,286 @@
+from array import array
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+from app.calc import CalcResult
+from app.formulas.bmr import BMR_KCAL_PER_KG
+from app.formulas.factors import FACTOR_INDEX, FACTORS, Factors
+from app.formulas.forecast import KCAL_PER_KG
+from app.formulas.strategies import MACRO_STRATEGIES, resolve_macro_strategy
+from app.models import CalcOutput, ForecastModel, MacroStrategy, UnitSystem, UserInput
+from app.units import IN_TO_CM, LB_TO_KG, requested_macros
+
+# One row per `Factors` field, one column per FACTOR_INDEX entry.
+FACTOR_COLUMNS = np.array(list(FACTORS.values()), dtype=np.float64).T.copy()
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """
+    Column-wise results of `calculate_batch`.
+
+    Every array has one entry per input row. Rows whose `errors` entry is not None
+    failed validation; their numeric values are undefined and must not be used.
+    """
+
+    errors: list[str | None]
+    bmi: np.ndarray
+    bmr: np.ndarray
+    tdee: np.ndarray
+    body_fat_percent_estimate: np.ndarray
+    ffmi: np.ndarray
+    calories_total: np.ndarray
+    protein_g: np.ndarray
+    fat_g: np.ndarray
+    net_carbs_g: np.ndarray
+    weight_kg: np.ndarray
+    tdee_per_kg: np.ndarray
+    forecast_weeks: np.ndarray
+    adaptive: np.ndarray
+    delta_kg_per_week: np.ndarray
+    equilibrium_weight_kg: np.ndarray
+    retention: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+    def _packed(self, rows: slice) -> np.ndarray:
+        """`CalcResult` values of `rows`, one (rows, len(layout)) float64 array."""
+        adaptive = self.adaptive[rows]
+        return np.column_stack(
+            [
+                *(getattr(self, name)[rows] for name in CalcResult.SCALARS),
+                adaptive,
+                self.weight_kg[rows],
+                np.where(adaptive, self.equilibrium_weight_kg[rows], self.delta_kg_per_week[rows]),
+                np.where(adaptive, self.retention[rows], 0.0),
+                self.forecast_weeks[rows],
+            ]
+        ).astype(np.float64, copy=False)
+
+    def result(self, i: int) -> CalcResult | None:
+        """The `CalcResult` of row `i`, or None if that row failed."""
+        if self.errors[i] is not None:
+            return None
+        return CalcResult.from_values(array("d", self._packed(slice(i, i + 1)).tobytes()))
+
+    def results(self) -> list[CalcResult | None]:
+        """`result(i)` for every row, packed from the columns in one pass."""
+        packed = self._packed(slice(None))
+        return [
+            None if error is not None else CalcResult.from_values(array("d", row.tobytes()))
+            for error, row in zip(self.errors, packed, strict=True)
+        ]
+
+    def output(self, i: int) -> CalcOutput | None:
+        """Build the `CalcOutput` for row `i`, or None if that row failed."""
+        result = self.result(i)
+        return None if result is None else result.to_output()
+
+    def outputs(self) -> list[CalcOutput | None]:
+        return [None if r is None else r.to_output() for r in self.results()]
+
+
+def _flag(errors: list[str | None], mask: np.ndarray, message: str) -> None:
+    """Record `message` for every row in `mask` that has no earlier error."""
+    for i in np.flatnonzero(mask).tolist():
+        if errors[i] is None:
+            errors[i] = message
+
+
+class BatchColumns(NamedTuple):
+    """
+    Column-wise inputs of `calculate_columns`, one entry per row.
+
+    Enums are stored as indexes: `factor_index` is the FACTOR_INDEX of the row's
+    (sex, activity_level, goal) and `macro_strategy` the position of its resolved
+    strategy in MacroStrategy. A missing height or weight is NaN, and so is a
+    net_carbs_g or protein_g_per_kg the request did not send.
+    """
+
+    imperial: np.ndarray  # bool
+    height: np.ndarray  # cm, or inches when imperial
+    weight: np.ndarray  # kg, or lb when imperial
+    age_years: np.ndarray
+    factor_index: np.ndarray
+    macro_strategy: np.ndarray
+    net_carbs_g: np.ndarray
+    protein_g_per_kg: np.ndarray
+    forecast_weeks: np.ndarray
+    adaptive: np.ndarray  # bool
+
+
+STRATEGY_INDEX: dict[MacroStrategy, int] = {s: i for i, s in enumerate(MacroStrategy)}
+
+
+def batch_columns(users: list[UserInput], *, forecast_weeks: int | None = None) -> BatchColumns:
+    """The `BatchColumns` of `users`; `forecast_weeks` overrides every row's horizon."""
+    n = len(users)
+    imperial = np.array([u.unit_system == UnitSystem.imperial for u in users], dtype=bool)
+    if forecast_weeks is None:
+        weeks = np.array([u.forecast_weeks for u in users], dtype=np.int64)
+    else:
+        weeks = np.full(n, forecast_weeks, dtype=np.int64)
+    requested = np.array([requested_macros(u) for u in users], dtype=np.float64).reshape(n, 2)
+    return BatchColumns(
+        imperial=imperial,
+        height=np.array(
+            [u.height_in if imp else u.height_cm for u, imp in zip(users, imperial, strict=True)],
+            dtype=np.float64,
+        ),
+        weight=np.array(
+            [u.weight_lb if imp else u.weight_kg for u, imp in zip(users, imperial, strict=True)],
+            dtype=np.float64,
+        ),
+        age_years=np.array([u.age_years for u in users], dtype=np.int64),
+        factor_index=np.fromiter(
+            (FACTOR_INDEX[u.sex, u.activity_level, u.goal] for u in users), dtype=np.intp, count=n
+        ),
+        macro_strategy=np.fromiter(
+            (STRATEGY_INDEX[resolve_macro_strategy(u)] for u in users), dtype=np.intp, count=n
+        ),
+        net_carbs_g=requested[:, 0],
+        protein_g_per_kg=requested[:, 1],
+        forecast_weeks=weeks,
+        adaptive=np.array([u.forecast_model == ForecastModel.adaptive for u in users], dtype=bool),
+    )
+
+
+def calculate_batch(users: list[UserInput], *, forecast_weeks: int | None = None) -> BatchResult:
+    """
+    Column-wise equivalent of `calculate_all` for many users.
+
+    Each stage is evaluated as NumPy array operations in the same order as the scalar
+    formulas, so successful rows are bit-for-bit equal to `calculate_all`. A row that
+    would make `calculate_all` raise gets that same error message in `errors` instead
+    of aborting the batch. Rows are grouped by macro strategy, and each strategy is
+    evaluated once over its group.
+    """
+    return calculate_columns(batch_columns(users, forecast_weeks=forecast_weeks))
+
+
+def calculate_columns(columns: BatchColumns) -> BatchResult:
+    """`calculate_batch` over inputs that are already columns, e.g. from app.records."""
+    n = len(columns.imperial)
+    errors: list[str | None] = [None] * n
+
+    # normalize_inputs
+    imperial = columns.imperial
+    height = np.asarray(columns.height, dtype=np.float64)
+    weight = np.asarray(columns.weight, dtype=np.float64)
+    missing = np.isnan(height) | np.isnan(weight)
+    _flag(errors, missing & ~imperial, "For metric input, height_cm and weight_kg are required.")
+    _flag(errors, missing & imperial, "For imperial input, height_in and weight_lb are required.")
+
+    height_cm = np.where(imperial, height * IN_TO_CM, height)
+    weight_kg = np.where(imperial, weight * LB_TO_KG, weight)
+
+    age = np.asarray(columns.age_years, dtype=np.int64)
+    f = Factors(*FACTOR_COLUMNS[:, columns.factor_index])
+    weeks = np.asarray(columns.forecast_weeks, dtype=np.int64)
+    adaptive = np.asarray(columns.adaptive, dtype=bool)
+    strategies = columns.macro_strategy
+    requested_carbs = np.asarray(columns.net_carbs_g, dtype=np.float64)
+    requested_protein = np.asarray(columns.protein_g_per_kg, dtype=np.float64)
+
+    with np.errstate(invalid="ignore"):
+        # calculate_bmi
+        _flag(errors, weight_kg <= 0, "weight_kg must be > 0")
+        _flag(errors, height_cm <= 0, "height_cm must be > 0")
+        height_m = height_cm / 100.0
+        bmi = weight_kg / (height_m * height_m)
+
+        # calculate_bmr_mifflin_st_jeor
+        _flag(errors, age < 18, "BMR formula not supported for minors (<18) yet.")
+        bmr = BMR_KCAL_PER_KG * weight_kg + 6.25 * height_cm - 5.0 * age + f.bmr_offset
+
+        # calculate_tdee
+        _flag(errors, bmr <= 0, "bmr must be > 0")
+        tdee = bmr * f.activity_multiplier
+
+        # estimate_body_fat_percent_from_bmi / calculate_ffmi
+        bf = 1.20 * bmi + 0.23 * age - 10.8 * f.male - 5.4
+        bf = np.clip(bf, 0.0, 75.0)
+        ffmi = (weight_kg * (1.0 - bf / 100.0)) / (height_m * height_m)
+
+        # calories_target_from_goal
+        _flag(errors, tdee <= 0, "tdee must be > 0")
+        calories = tdee * f.goal_factor
+
+        # calculate_keto_macros
+        _flag(errors, calories <= 0, "calories_total must be > 0")
+        carbs = np.empty(n)
+        protein_per_kg = np.empty(n)
+        for code in np.unique(strategies).tolist():
+            rows = np.flatnonzero(strategies == code)
+            carbs[rows], protein_per_kg[rows] = MACRO_STRATEGIES[list(MacroStrategy)[code]](
+                Factors(*(column[rows] for column in f)),
+                bf[rows],
+                requested_carbs[rows],
+                requested_protein[rows],
+            )
+        protein_g = weight_kg * protein_per_kg
+        fat_cal = calories - (protein_g * 4.0 + carbs * 4.0)
+        _flag(errors, fat_cal < 0, "Calories too low for keto macro targets.")
+        fat_g = fat_cal / 9.0
+
+        # forecast_linear / forecast_adaptive
+        _flag(errors, weeks <= 0, "weeks must be > 0")
+        delta_kg_per_week = ((calories - tdee) * 7.0) / KCAL_PER_KG
+        tdee_per_kg = f.tdee_per_kg
+        equilibrium = weight_kg + (calories - tdee) / tdee_per_kg
+        retention = 1.0 - tdee_per_kg * 7.0 / KCAL_PER_KG
+
+    return BatchResult(
+        errors=errors,
+        bmi=bmi,
+        bmr=bmr,
+        tdee=tdee,
+        body_fat_percent_estimate=bf,
+        ffmi=ffmi,
+        calories_total=calories,
+        protein_g=protein_g,
+        fat_g=fat_g,
+        net_carbs_g=carbs,
+        weight_kg=weight_kg,
+        tdee_per_kg=tdee_per_kg,
+        forecast_weeks=weeks,
+        adaptive=adaptive,
+        delta_kg_per_week=delta_kg_per_week,
+        equilibrium_weight_kg=equilibrium,
+        retention=retention,
+    )
+
+
+def project_adaptive(
+    result: BatchResult, *, days: int, step_days: int = 1, dtype: np.dtype = np.float32
+) -> np.ndarray:
+    """
+    Adaptive (metabolic-adaptation) weight trajectories for every row of a batch.
+
+    Returns an array of shape (rows, days // step_days + 1) where column k is the
+    projected weight after k * step_days days, using the same closed-form recurrence as
+    `AdaptiveForecast` with a step of `step_days` instead of 7. Rows with errors are NaN.
+
+    The whole cohort is evaluated as one broadcast power, e.g. 100k users x 5 years
+    of daily points is a single (100_000, 1827) array (about 0.7 GB as float32).
+    """
+    if days <= 0:
+        raise ValueError("days must be > 0")
+    if step_days <= 0:
+        raise ValueError("step_days must be > 0")
+
+    failed = np.array([e is not None for e in result.errors], dtype=bool)
+    start = result.weight_kg
+    equilibrium = result.equilibrium_weight_kg
+    retention = 1.0 - result.tdee_per_kg * step_days / KCAL_PER_KG
+
+    steps = np.arange(days // step_days + 1, dtype=np.float64)
+    out = np.power(retention[:, None].astype(dtype), steps.astype(dtype)[None, :])
+    out *= (start - equilibrium)[:, None].astype(dtype)
+    out += equilibrium[:, None].astype(dtype)
+    np.maximum(out, 0, out=out)
+    out[failed] = np.nan
+    return out
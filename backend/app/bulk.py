@@ -0,0 +1,196 @@
+import argparse
+import codecs
+import csv
+import json
+import sys
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.analytics import ResultStore, results_store
+from app.batch import calculate_batch
+from app.fastpath import calc_output_json
+from app.models import UserInput
+from app.pools import CALC_POOL
+
+CHUNK_SIZE = 1000
+
+FORMATS = ("ndjson", "csv")
+
+
+def nest_record(record: dict[str, str]) -> dict[str, object]:
+    """Turn flat CSV columns such as `dietary.vegan` into nested dicts, dropping empty cells."""
+    out: dict[str, object] = {}
+    for key, value in record.items():
+        if key is None or value is None or value == "":
+            continue
+        target = out
+        *parents, leaf = key.strip().split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})  # type: ignore[assignment]
+        target[leaf] = value
+    return out
+
+
+def _error_line(line: int, message: str) -> str:
+    return json.dumps({"row": line, "error": message})
+
+
+class BulkCalculator:
+    """
+    Turns chunks of NDJSON or CSV input lines into chunks of NDJSON output lines.
+
+    Each input record produces exactly one output line, in order: the `CalcOutput`
+    JSON on success, or `{"row": n, "error": "..."}` when the n-th record cannot be parsed,
+    validated or calculated. Only the current chunk is held in memory; for CSV the
+    header row is remembered across chunks. CSV records must not span lines. With
+    `record`, successful results are also appended to that analytics store.
+    """
+
+    def __init__(self, fmt: str = "ndjson", *, record: ResultStore | None = None) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.fmt = fmt
+        self.record = record
+        self._header: list[str] | None = None
+        self._line = 0
+
+    def _records(self, lines: list[str]) -> Iterator[tuple[int, object]]:
+        if self.fmt == "csv":
+            rows = csv.reader(lines)
+            if self._header is None:
+                self._header = next(rows, None)
+            for row in rows:
+                self._line += 1
+                yield self._line, nest_record(dict(zip(self._header, row, strict=False)))
+            return
+
+        for raw in lines:
+            self._line += 1
+            try:
+                yield self._line, json.loads(raw)
+            except json.JSONDecodeError as e:
+                yield self._line, e
+
+    def process(self, lines: list[str]) -> str:
+        lines = [line for line in lines if line.strip()]
+        slots: list[str] = []
+        users: list[UserInput] = []
+        pending: list[tuple[int, int]] = []
+
+        for line, record in self._records(lines):
+            if isinstance(record, Exception):
+                slots.append(_error_line(line, f"Invalid JSON: {record}"))
+                continue
+            try:
+                users.append(UserInput.model_validate(record))
+            except ValidationError as e:
+                slots.append(_error_line(line, str(e)))
+                continue
+            pending.append((len(slots), line))
+            slots.append("")
+
+        result = calculate_batch(users)
+        if self.record is not None:
+            self.record.append_batch(users, result)
+        for (pos, line), error, calc in zip(pending, result.errors, result.results(), strict=True):
+            if calc is None:
+                slots[pos] = _error_line(line, error)
+            else:
+                slots[pos] = calc_output_json(calc).decode()
+
+        return "".join(f"{s}\n" for s in slots)
+
+
+def iter_calc(
+    lines: Iterable[str],
+    *,
+    fmt: str = "ndjson",
+    chunk_size: int = CHUNK_SIZE,
+    record: ResultStore | None = None,
+) -> Iterator[str]:
+    """Run input lines through the calculator `chunk_size` lines at a time."""
+    calc = BulkCalculator(fmt, record=record)
+    chunk: list[str] = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield calc.process(chunk)
+            chunk = []
+    if chunk:
+        yield calc.process(chunk)
+
+
+async def aiter_calc(
+    body: AsyncIterable[bytes], *, fmt: str = "ndjson", chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[str]:
+    """Async `iter_calc` over a raw byte stream, e.g. an HTTP request body."""
+    calc = BulkCalculator(fmt, record=results_store())
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    chunk: list[str] = []
+
+    async for data in body:
+        pending += decoder.decode(data)
+        *complete, pending = pending.split("\n")
+        chunk.extend(complete)
+        if len(chunk) >= chunk_size:
+            yield await CALC_POOL.run_sync(calc.process, chunk)
+            chunk = []
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        chunk.append(pending)
+    if chunk:
+        yield await CALC_POOL.run_sync(calc.process, chunk)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still being read.
+
+    The default implementation (for ASGI servers older than spec 2.4) listens on
+    `receive` for disconnects, which would steal the request body messages we stream from.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError as e:
+            raise ClientDisconnect() from e
+        if self.background is not None:
+            await self.background()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.calc",
+        description="Calculate CalcOutput NDJSON rows from NDJSON or CSV UserInput rows.",
+    )
+    parser.add_argument("input", nargs="?", default="-", help="input file (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: by extension)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--record", metavar="DIR", help="also append results to this analytics store"
+    )
+    args = parser.parse_args(argv)
+    record = ResultStore(args.record) if args.record else None
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "ndjson")
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    try:
+        lines = (line.rstrip("\r\n") for line in src)
+        for out in iter_calc(lines, fmt=fmt, chunk_size=args.chunk_size, record=record):
+            dst.write(out)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    return 0
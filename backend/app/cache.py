@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Protocol
+
+from app.formulas.strategies import resolve_macro_strategy
+from app.models import UserInput
+from app.units import normalize_inputs
+
+# Bump when a formula change makes previously cached results stale.
+CALC_CACHE_VERSION = 3
+
+DEFAULT_CALC_CACHE_SIZE = 4096
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes) -> None: ...
+
+
+class LRUBackend:
+    """
+    In-process, size-bounded store that evicts the least recently used entry.
+
+    With `ttl_s`, entries also expire that many seconds after they were set.
+    """
+
+    def __init__(self, max_entries: int, *, ttl_s: float | None = None) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.evictions = 0
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        expires_at = math.inf if self.ttl_s is None else time.monotonic() + self.ttl_s
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+
+class DiskBackend:
+    """
+    One file per entry in `directory`, e.g. to survive process restarts (Lambda keeps
+    /tmp across warm invocations). Entries older than `ttl_s` are treated as missing.
+    """
+
+    def __init__(self, directory: str | Path, *, ttl_s: float | None = None) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+
+    def get(self, key: str) -> bytes | None:
+        path = self.directory / key
+        try:
+            if self.ttl_s is not None and path.stat().st_mtime + self.ttl_s <= time.time():
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        tmp = self.directory / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_bytes(value)
+        tmp.replace(self.directory / key)
+
+
+class TieredBackend:
+    """Fast `first` tier in front of a slower, longer-lived `second` tier."""
+
+    def __init__(self, first: CacheBackend, second: CacheBackend) -> None:
+        self.first = first
+        self.second = second
+
+    def __len__(self) -> int:
+        return len(self.first)
+
+    @property
+    def evictions(self) -> int:
+        return getattr(self.first, "evictions", 0)
+
+    def get(self, key: str) -> bytes | None:
+        value = self.first.get(key)
+        if value is None:
+            value = self.second.get(key)
+            if value is not None:
+                self.first.set(key, value)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self.first.set(key, value)
+        self.second.set(key, value)
+
+
+class RedisBackend:
+    """
+    Shared store for several workers, backed by any redis-py compatible client.
+
+    Eviction is left to the server (e.g. `maxmemory-policy allkeys-lru`).
+    """
+
+    def __init__(self, client: object, *, prefix: str = "", ttl_s: int | None = None) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.ttl_s = ttl_s
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(self.prefix + key, value, ex=self.ttl_s)
+
+
+class ResultCache:
+    """
+    Read-through cache of serialized results with hit/miss/eviction counters.
+
+    Concurrent misses for the same key are coalesced (single-flight): the first caller
+    computes the value and the others wait for it; they are counted as `coalesced`.
+    Exceptions are propagated to every waiter and nothing is cached.
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._inflight: dict[str, Future[bytes]] = {}
+        self._ainflight: dict[str, asyncio.Future[bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self.backend.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], bytes]) -> bytes:
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if pending is not None:
+            return pending.result()
+
+        try:
+            value = compute()
+            self.backend.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[bytes]]) -> bytes:
+        """`get_or_compute` for coroutines; waiters are coalesced without blocking the loop."""
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._ainflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await compute()
+            self.backend.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure with no waiters does not log a warning.
+            future.exception()
+            raise
+        finally:
+            del self._ainflight[key]
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "size": len(self.backend) if hasattr(self.backend, "__len__") else -1,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def calc_cache_key(user: UserInput) -> str:
+    """
+    Hash of the normalized inputs `calculate_all` actually reads.
+
+    Equivalent requests hash the same, e.g. metric and imperial input describing the
+    same person, or different dietary/meal plan preferences. Raises ValueError like
+    `normalize_inputs` for incomplete input.
+    """
+    norm = normalize_inputs(user)
+    canonical = json.dumps(
+        [
+            CALC_CACHE_VERSION,
+            norm.sex,
+            norm.age_years,
+            norm.height_cm,
+            norm.weight_kg,
+            norm.activity_level,
+            user.goal.value,
+            user.forecast_weeks,
+            user.forecast_model.value,
+            resolve_macro_strategy(user).value,
+            norm.net_carbs_g,
+            norm.protein_g_per_kg,
+        ],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _default_backend() -> CacheBackend:
+    redis_url = os.getenv("CALC_CACHE_REDIS_URL")
+    if redis_url:
+        import redis  # optional dependency, only needed for a shared cache
+
+        return RedisBackend(redis.Redis.from_url(redis_url), prefix="calc:")
+    size = int(os.getenv("CALC_CACHE_SIZE", DEFAULT_CALC_CACHE_SIZE))
+    return LRUBackend(size)
+
+
+calc_cache = ResultCache(_default_backend())
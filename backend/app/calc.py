@@ -1,59 +1,195 @@
-from app.formulas.bmi import calculate_bmi
-from app.formulas.bmr import calculate_bmr_mifflin_st_jeor
-from app.formulas.bodyfat import estimate_body_fat_percent_from_bmi
-from app.formulas.calories import calories_target_from_goal
-from app.formulas.ffmi import calculate_ffmi
-from app.formulas.forecast import forecast_weight_kg
-from app.formulas.macros import calculate_keto_macros
-from app.formulas.tdee import calculate_tdee
-from app.models import CalcOutput, ForecastPoint, UserInput
+import math
+from array import array
+
+from app.formulas.factors import FACTORS, evaluate
+from app.formulas.forecast import (
+    AdaptiveForecast,
+    LinearForecast,
+    WeightForecast,
+    forecast_adaptive,
+    forecast_linear,
+)
+from app.formulas.strategies import MACRO_STRATEGIES, resolve_macro_strategy
+from app.metrics import StageClock
+from app.models import CalcOutput, ForecastModel, Macros, UserInput
 from app.units import normalize_inputs
 
 
-def calculate_all(user: UserInput, *, forecast_weeks: int = 24) -> CalcOutput:
-    norm = normalize_inputs(user)
+class CalcResult:
+    """
+    Compact result of one calculation: the numbers behind a `CalcOutput`.
 
-    bmi = calculate_bmi(weight_kg=norm.weight_kg, height_cm=norm.height_cm)
+    The nine values and the forecast parameters are packed into one array('d'), so a
+    result is two small objects instead of models, a macros dict and boxed floats.
+    `forecast` rebuilds the closed-form forecast on access and `to_output()` builds the
+    `CalcOutput` model for callers that need one. None is stored as NaN.
+    """
 
-    bmr = calculate_bmr_mifflin_st_jeor(
-        sex=user.sex,
-        age_years=norm.age_years,
-        height_cm=norm.height_cm,
-        weight_kg=norm.weight_kg,
+    __slots__ = ("values",)
+
+    # Layout of `values`: SCALARS, then FORECAST.
+    SCALARS = (
+        "bmi",
+        "bmr",
+        "tdee",
+        "body_fat_percent_estimate",
+        "ffmi",
+        "calories_total",
+        "protein_g",
+        "fat_g",
+        "net_carbs_g",
     )
+    # adaptive is 1.0 or 0.0; rate is delta_kg_per_week (linear) or the equilibrium
+    # weight (adaptive); retention is unused (0.0) for linear.
+    FORECAST = ("adaptive", "start_weight_kg", "rate", "retention", "weeks")
+
+    values: array
+
+    def __init__(
+        self,
+        bmi: float,
+        bmr: float,
+        tdee: float,
+        body_fat_percent_estimate: float | None,
+        ffmi: float | None,
+        calories_total: float,
+        protein_g: float,
+        fat_g: float,
+        net_carbs_g: float,
+        forecast: WeightForecast,
+    ) -> None:
+        if isinstance(forecast, AdaptiveForecast):
+            params = (
+                1.0,
+                forecast.start_weight_kg,
+                forecast.equilibrium_weight_kg,
+                forecast.retention,
+            )
+        elif isinstance(forecast, LinearForecast):
+            params = (0.0, forecast.start_weight_kg, forecast.delta_kg_per_week, 0.0)
+        else:
+            raise TypeError(f"Unsupported forecast: {type(forecast).__name__}")
+        self.values = array(
+            "d",
+            (
+                bmi,
+                bmr,
+                tdee,
+                math.nan if body_fat_percent_estimate is None else body_fat_percent_estimate,
+                math.nan if ffmi is None else ffmi,
+                calories_total,
+                protein_g,
+                fat_g,
+                net_carbs_g,
+                *params,
+                forecast.weeks,
+            ),
+        )
+
+    @classmethod
+    def from_values(cls, values: array) -> "CalcResult":
+        """Wrap an array laid out like `values` (see SCALARS and FORECAST) as-is."""
+        result = cls.__new__(cls)
+        result.values = values
+        return result
+
+    @property
+    def forecast(self) -> WeightForecast:
+        adaptive, start, rate, retention, weeks = self.values[len(self.SCALARS) :]
+        if adaptive:
+            return AdaptiveForecast(
+                start_weight_kg=start,
+                equilibrium_weight_kg=rate,
+                retention=retention,
+                weeks=int(weeks),
+            )
+        return LinearForecast(start_weight_kg=start, delta_kg_per_week=rate, weeks=int(weeks))
+
+    def to_output(self) -> CalcOutput:
+        v = self.values
+        return CalcOutput.model_construct(
+            bmi=v[0],
+            bmr=v[1],
+            tdee=v[2],
+            body_fat_percent_estimate=self.body_fat_percent_estimate,
+            ffmi=self.ffmi,
+            macros=Macros.model_construct(
+                calories_total=v[5], protein_g=v[6], fat_g=v[7], net_carbs_g=v[8]
+            ),
+            forecast=self.forecast,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CalcResult):
+            return NotImplemented
+        return self.values.tobytes() == other.values.tobytes()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={value!r}"
+            for name, value in zip(self.SCALARS, self.values[: len(self.SCALARS)], strict=True)
+        )
+        return f"CalcResult({fields}, forecast={self.forecast!r})"
 
-    tdee = calculate_tdee(bmr=bmr, activity_level=user.activity_level)
 
-    bf = estimate_body_fat_percent_from_bmi(bmi=bmi, age_years=norm.age_years, sex=user.sex)
-    ffmi = calculate_ffmi(weight_kg=norm.weight_kg, height_cm=norm.height_cm, body_fat_percent=bf)
+def _scalar(index: int, optional: bool) -> property:
+    if optional:
+        return property(lambda self: None if math.isnan(v := self.values[index]) else v)
+    return property(lambda self: self.values[index])
 
-    calories_target = calories_target_from_goal(tdee=tdee, goal=user.goal)
 
-    cal, protein_g, fat_g, net_carbs_g = calculate_keto_macros(
-        calories_total=calories_target,
+for _index, _name in enumerate(CalcResult.SCALARS):
+    setattr(CalcResult, _name, _scalar(_index, _name in ("body_fat_percent_estimate", "ffmi")))
+
+
+def calculate_values(user: UserInput, *, forecast_weeks: int | None = None) -> CalcResult:
+    stages = StageClock()
+    norm = normalize_inputs(user)
+    stages.mark("calc.normalize")
+
+    f = FACTORS[user.sex, user.activity_level, user.goal]
+    bmi, bmr, tdee, bf, ffmi, calories_target, protein_g, fat_g, net_carbs_g = evaluate(
+        f,
+        MACRO_STRATEGIES[resolve_macro_strategy(user)],
+        age_years=norm.age_years,
+        height_cm=norm.height_cm,
         weight_kg=norm.weight_kg,
-        goal=user.goal,
+        net_carbs_g=norm.net_carbs_g,
+        protein_g_per_kg=norm.protein_g_per_kg,
     )
+    stages.mark("calc.formulas")
 
-    forecast_pts = forecast_weight_kg(
-        start_weight_kg=norm.weight_kg,
-        tdee=tdee,
-        calories_target=calories_target,
-        weeks=forecast_weeks,
-    )
-    forecast = [ForecastPoint(week=w, weight_kg=kg) for (w, kg) in forecast_pts]
-
-    return CalcOutput(
-        bmi=bmi,
-        bmr=bmr,
-        tdee=tdee,
-        body_fat_percent_estimate=bf,
-        ffmi=ffmi,
-        macros={
-            "calories_total": cal,
-            "protein_g": protein_g,
-            "fat_g": fat_g,
-            "net_carbs_g": net_carbs_g,
-        },
-        forecast=forecast,
+    weeks = user.forecast_weeks if forecast_weeks is None else forecast_weeks
+    if user.forecast_model == ForecastModel.adaptive:
+        forecast = forecast_adaptive(
+            start_weight_kg=norm.weight_kg,
+            tdee=tdee,
+            tdee_per_kg=f.tdee_per_kg,
+            calories_target=calories_target,
+            weeks=weeks,
+        )
+    else:
+        forecast = forecast_linear(
+            start_weight_kg=norm.weight_kg,
+            tdee=tdee,
+            calories_target=calories_target,
+            weeks=weeks,
+        )
+    stages.mark("calc.forecast")
+    stages.done()
+
+    return CalcResult(
+        bmi, bmr, tdee, bf, ffmi, calories_target, protein_g, fat_g, net_carbs_g, forecast
     )
+
+
+def calculate_all(user: UserInput, *, forecast_weeks: int | None = None) -> CalcOutput:
+    return calculate_values(user, forecast_weeks=forecast_weeks).to_output()
+
+
+if __name__ == "__main__":
+    from app.bulk import main
+
+    raise SystemExit(main())
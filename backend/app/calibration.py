@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.formulas.forecast import KCAL_PER_KG
+
+MIN_POINTS = 3
+MIN_SPAN_DAYS = 14
+# Fitted energy densities outside this range are not believed: ~1800 kcal/kg is lean
+# tissue, ~9500 kcal/kg pure fat. Such users keep KCAL_PER_KG.
+KCAL_PER_KG_RANGE = (1800.0, 9500.0)
+# Relative determinant below which time and cumulative intake are collinear, e.g. a
+# constant calorie target, so the energy density cannot be told apart from TDEE.
+_COLLINEAR = 1e-6
+
+
+@dataclass(frozen=True)
+class CalibrationResult:
+    """
+    Column-wise results of `calibrate`, one entry per user.
+
+    Users whose `errors` entry is not None could not be calibrated; their values are
+    undefined and must not be used.
+    """
+
+    errors: list[str | None]
+    tdee: np.ndarray  # effective TDEE, kcal/day
+    kcal_per_kg: np.ndarray
+    energy_density_fitted: np.ndarray  # bool: kcal_per_kg was fitted, not KCAL_PER_KG
+    rmse_kg: np.ndarray
+    points: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.errors)
+
+
+def calibrate(
+    days: np.ndarray,
+    weight_kg: np.ndarray,
+    calories: np.ndarray | float,
+    *,
+    fit_energy_density: bool = False,
+    kcal_per_kg: float = KCAL_PER_KG,
+) -> CalibrationResult:
+    """
+    Fit an effective TDEE (and optionally the energy density) per user to logged weights.
+
+    `days` and `weight_kg` are (users, points) arrays: each row holds one user's
+    weigh-ins in time order, padded at the end with NaN. `calories` broadcasts to the
+    same shape; column j is the daily intake between points j - 1 and j (column 0 is
+    unused), e.g. one calorie target per user as a (users, 1) array.
+
+    The energy-balance model behind the forecasts is, with E(t) the calories eaten up
+    to day t,
+
+        w(t) = w0 + (E(t) - tdee * t) / kcal_per_kg
+
+    so with a known energy density w - E / kcal_per_kg is linear in t with slope
+    -tdee / kcal_per_kg: one least-squares line per user. With `fit_energy_density`,
+    w is regressed on t and E together and kcal_per_kg = 1 / (coefficient of E); users
+    whose intake never changed (t and E collinear) or whose fit is implausible keep
+    `kcal_per_kg`. Every user is solved at once with closed-form sums, no Python loop.
+    """
+    days = np.asarray(days, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    calories = np.broadcast_to(np.asarray(calories, dtype=np.float64), days.shape)
+    n = days.shape[0]
+    errors: list[str | None] = [None] * n
+
+    valid = ~(np.isnan(days) | np.isnan(weight_kg))
+    points = valid.sum(axis=1)
+    t = np.where(valid, days, 0.0)
+    w = np.where(valid, weight_kg, 0.0)
+    dt = np.diff(t, axis=1, prepend=t[:, :1])
+    eaten = np.where(valid, np.cumsum(np.where(valid, calories * dt, 0.0), axis=1), 0.0)
+
+    first = np.where(valid, days, np.inf).min(axis=1, initial=np.inf)
+    span = np.where(valid, days, -np.inf).max(axis=1, initial=-np.inf) - first
+    too_few = (points < MIN_POINTS) | (span < MIN_SPAN_DAYS)
+    for i in np.flatnonzero(too_few).tolist():
+        errors[i] = f"At least {MIN_POINTS} weigh-ins over {MIN_SPAN_DAYS} days are needed."
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        count = np.maximum(points, 1)
+
+        def centered(x: np.ndarray) -> np.ndarray:
+            return np.where(valid, x - (x.sum(axis=1) / count)[:, None], 0.0)
+
+        tc, ec, wc = centered(t), centered(eaten), centered(w)
+        stt = (tc * tc).sum(axis=1)
+
+        # Known energy density: slope of w - E / kcal_per_kg over t.
+        yc = wc - ec / kcal_per_kg
+        slope = (tc * yc).sum(axis=1) / stt
+        tdee = -slope * kcal_per_kg
+        density = np.full(n, kcal_per_kg)
+        residual = yc - slope[:, None] * tc
+
+        fitted = np.zeros(n, dtype=bool)
+        if fit_energy_density:
+            see = (ec * ec).sum(axis=1)
+            ste = (tc * ec).sum(axis=1)
+            det = stt * see - ste * ste
+            stw = (tc * wc).sum(axis=1)
+            sew = (ec * wc).sum(axis=1)
+            b = (see * stw - ste * sew) / det
+            g = (stt * sew - ste * stw) / det
+            fitted_density = 1.0 / g
+            low, high = KCAL_PER_KG_RANGE
+            fitted = (
+                (det > _COLLINEAR * stt * see) & (fitted_density >= low) & (fitted_density <= high)
+            )
+            tdee = np.where(fitted, -b * fitted_density, tdee)
+            density = np.where(fitted, fitted_density, density)
+            residual = np.where(fitted[:, None], wc - b[:, None] * tc - g[:, None] * ec, residual)
+
+        rmse = np.sqrt((np.where(valid, residual, 0.0) ** 2).sum(axis=1) / count)
+
+    for i in np.flatnonzero(~(tdee > 0)).tolist():
+        if errors[i] is None:
+            errors[i] = "Calibrated TDEE is not positive."
+
+    return CalibrationResult(
+        errors=errors,
+        tdee=tdee,
+        kcal_per_kg=density,
+        energy_density_fitted=fitted & ~np.array([e is not None for e in errors], dtype=bool),
+        rmse_kg=rmse,
+        points=points,
+    )
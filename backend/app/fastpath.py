@@ -0,0 +1,65 @@
+from typing import Any
+
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+from app.calc import CalcResult
+from app.models import UserInput
+
+# Compiled once at import: JSON bytes straight to a validated UserInput (no json.loads
+# dict in between), and a list of floats straight to JSON bytes.
+USER_INPUT = TypeAdapter(UserInput)
+_FLOATS = TypeAdapter(list[float])
+
+_CALC_OUTPUT = (
+    b'{"bmi":%s,"bmr":%s,"tdee":%s,"body_fat_percent_estimate":%s,"ffmi":%s,'
+    b'"macros":{"calories_total":%s,"protein_g":%s,"fat_g":%s,"net_carbs_g":%s},'
+    b'"forecast":[%s]}'
+)
+_FORECAST_POINT = b'{"week":%d,"weight_kg":%s}'
+_SCALARS = len(CalcResult.SCALARS)
+
+
+class JSONBytesResponse(JSONResponse):
+    """
+    JSON response that sends pre-encoded `bytes` as-is and encodes anything else with
+    pydantic-core (in Rust) instead of `json.dumps`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+def parse_user_input(body: bytes) -> UserInput:
+    """
+    Validate a raw JSON request body as `UserInput`.
+
+    Errors are raised as FastAPI's `RequestValidationError` with the same `body` locations
+    a `user: UserInput` parameter would report, so clients see the usual 422.
+    """
+    try:
+        return USER_INPUT.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        ) from None
+
+
+def calc_output_json(result: CalcResult) -> bytes:
+    """
+    `CalcOutput` JSON for `result`, byte-for-byte equal to `model_dump_json()`.
+
+    All numbers (scalars and forecast weights) are encoded in one pydantic-core call and
+    spliced into a fixed template, so no model, dict or list of points is built.
+    """
+    forecast = result.forecast
+    # NaN (stored for None) encodes as null, like the None it stands in for.
+    numbers = result.values[:_SCALARS].tolist()
+    numbers.extend([forecast.weight_at(week) for week in range(len(forecast))])
+    encoded = _FLOATS.dump_json(numbers)[1:-1].split(b",")
+    points = b",".join([_FORECAST_POINT % point for point in enumerate(encoded[_SCALARS:])])
+    return _CALC_OUTPUT % (*encoded[:_SCALARS], points)
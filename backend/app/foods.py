@@ -0,0 +1,160 @@
+import csv
+import difflib
+import re
+import threading
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+
+FOODS_CSV = Path(__file__).parent / "data" / "foods.csv"
+
+# Columns of `FoodTable.per_g`.
+PROTEIN, FAT, NET_CARBS, KCAL = range(4)
+
+
+@dataclass(frozen=True)
+class FoodTable:
+    """
+    Nutrient table with one row per food.
+
+    `per_g` holds protein, fat and net carbs (g) and energy (kcal) per gram of food,
+    so the nutrients of a vector of gram amounts `g` are `g @ per_g[rows]`. `max_g` is
+    the largest sensible portion of the food in one meal. Foods with role "other" are
+    only used to look up nutrients, never picked by the local meal plan engine.
+    """
+
+    names: list[str]
+    kinds: np.ndarray
+    roles: np.ndarray
+    meals: list[str]
+    per_g: np.ndarray
+    max_g: np.ndarray
+    aliases: list[list[str]]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def select(self, *, role: str, meal_type: str, kinds: frozenset[str]) -> list[int]:
+        """Rows with `role` that suit `meal_type` ("b", "m" or "s") and one of `kinds`."""
+        return [
+            i
+            for i in np.flatnonzero(self.roles == role).tolist()
+            if meal_type in self.meals[i] and self.kinds[i] in kinds
+        ]
+
+
+def load_foods(path: str | Path = FOODS_CSV) -> FoodTable:
+    """Load a food table CSV with nutrients per 100 g."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    per_100g = np.array(
+        [
+            [float(r["protein_g"]), float(r["fat_g"]), float(r["net_carbs_g"]), float(r["kcal"])]
+            for r in rows
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    if (per_100g < 0).any():
+        raise ValueError(f"{path}: nutrient values must be >= 0")
+
+    return FoodTable(
+        names=[r["name"] for r in rows],
+        kinds=np.array([r["kind"] for r in rows]),
+        roles=np.array([r["role"] for r in rows]),
+        meals=[r["meals"] for r in rows],
+        per_g=per_100g / 100.0,
+        max_g=np.array([float(r["max_g"]) for r in rows]),
+        aliases=[[a for a in r["aliases"].split("|") if a] for r in rows],
+    )
+
+
+@cache
+def food_table() -> FoodTable:
+    """The built-in table (app/data/foods.csv), loaded once per process."""
+    return load_foods()
+
+
+# Preparation and size words that do not change which food an item is.
+_IGNORED_WORDS = frozenset(
+    "a an and of with in on cooked raw grilled baked roasted steamed sauteed fried pan seared "
+    "smoked boiled hard soft scrambled poached fresh frozen canned boneless skinless sliced "
+    "chopped diced shredded minced large small medium organic plain full fat unsweetened "
+    "lean".split()
+)
+
+
+def _singular(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_food_name(name: str) -> str:
+    """Lowercase, drop parentheses and preparation words, singularize: "Eggs (large)" -> "egg"."""
+    name = re.sub(r"\(.*?\)", " ", name.lower())
+    words = re.findall(r"[a-z0-9%]+", name)
+    return " ".join(_singular(w) for w in words if w not in _IGNORED_WORDS)
+
+
+MAX_MEMOIZED_NAMES = 10_000
+
+
+class FoodIndex:
+    """
+    Resolves free-text food names (e.g. LLM output) to `FoodTable` rows.
+
+    Lookup order: exact normalized name or alias (dict), then the longest table name whose
+    words all occur in the item ("salmon fillet with dill" -> salmon), then a difflib
+    close match for misspellings. Results of the slower fallbacks are memoized, so
+    repeated names cost one dict lookup.
+    """
+
+    def __init__(self, table: FoodTable, *, cutoff: float = 0.85) -> None:
+        self.table = table
+        self.cutoff = cutoff
+        self._exact: dict[str, int] = {}
+        for row, name in enumerate(table.names):
+            for key in (name, *table.aliases[row]):
+                self._exact.setdefault(normalize_food_name(key), row)
+        self._words = sorted(
+            ((frozenset(key.split()), row) for key, row in self._exact.items() if key),
+            key=lambda item: -len(item[0]),
+        )
+        self._keys = list(self._exact)
+        self._memo: dict[str, int | None] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> int | None:
+        """Table row for `name`, or None if nothing matches well enough."""
+        key = normalize_food_name(name)
+        row = self._exact.get(key)
+        if row is not None:
+            return row
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+
+        row = self._fallback(key)
+        with self._lock:
+            if len(self._memo) >= MAX_MEMOIZED_NAMES:
+                self._memo.clear()
+            self._memo[key] = row
+        return row
+
+    def _fallback(self, key: str) -> int | None:
+        words = frozenset(key.split())
+        for food_words, row in self._words:
+            if food_words <= words:
+                return row
+        matches = difflib.get_close_matches(key, self._keys, n=1, cutoff=self.cutoff)
+        return self._exact[matches[0]] if matches else None
+
+
+@cache
+def food_index() -> FoodIndex:
+    """Index over `food_table()`, built once per process."""
+    return FoodIndex(food_table())
@@ -1,5 +1,7 @@
 from app.models import Sex
 
+BMR_KCAL_PER_KG = 10.0
+
 
 def calculate_bmr_mifflin_st_jeor(
     *, sex: Sex, age_years: int, height_cm: float, weight_kg: float
@@ -25,7 +27,7 @@ def calculate_bmr_mifflin_st_jeor(
     if age_years <= 0:
         raise ValueError("age_years must be > 0")
 
-    base = 10.0 * weight_kg + 6.25 * height_cm - 5.0 * age_years
+    base = BMR_KCAL_PER_KG * weight_kg + 6.25 * height_cm - 5.0 * age_years
     if sex == Sex.male:
         return base + 5.0
     return base - 161.0
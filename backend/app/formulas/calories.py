@@ -1,5 +1,11 @@
 from app.models import Goal
 
+GOAL_CALORIE_FACTORS: dict[Goal, float] = {
+    Goal.lose: 0.8,
+    Goal.maintain: 1.0,
+    Goal.gain: 1.2,
+}
+
 
 def calories_target_from_goal(*, tdee: float, goal: Goal) -> float:
     """
@@ -0,0 +1,118 @@
+from collections.abc import Callable
+from itertools import product
+from typing import NamedTuple
+
+from app.formulas.bmr import BMR_KCAL_PER_KG
+from app.formulas.calories import GOAL_CALORIE_FACTORS
+from app.formulas.macros import (
+    LEAN_MASS_PROTEIN_G_PER_KG_BY_GOAL,
+    PROTEIN_G_PER_KG_BY_GOAL,
+    TRAINING_DAYS_BY_ACTIVITY,
+)
+from app.formulas.tdee import ACTIVITY_MULTIPLIERS
+from app.models import ActivityLevel, Goal, Sex
+
+FactorKey = tuple[Sex, ActivityLevel, Goal]
+
+
+class Factors(NamedTuple):
+    """Every categorical coefficient of the calculation for one (sex, activity, goal)."""
+
+    bmr_offset: float  # Mifflin-St Jeor sex constant: +5 (male) or -161
+    male: float  # 1.0 or 0.0, the sex term of the body fat estimate
+    activity_multiplier: float
+    tdee_per_kg: float  # BMR_KCAL_PER_KG * activity_multiplier (adaptive forecast)
+    goal_factor: float
+    protein_g_per_kg: float
+    lean_protein_g_per_kg: float  # per kg of fat-free mass
+    training_days: float  # per week, for targeted keto
+
+
+def _factors(sex: Sex, activity_level: ActivityLevel, goal: Goal) -> Factors:
+    multiplier = ACTIVITY_MULTIPLIERS[activity_level]
+    return Factors(
+        bmr_offset=5.0 if sex == Sex.male else -161.0,
+        male=1.0 if sex == Sex.male else 0.0,
+        activity_multiplier=multiplier,
+        tdee_per_kg=BMR_KCAL_PER_KG * multiplier,
+        goal_factor=GOAL_CALORIE_FACTORS[goal],
+        protein_g_per_kg=PROTEIN_G_PER_KG_BY_GOAL[goal],
+        lean_protein_g_per_kg=LEAN_MASS_PROTEIN_G_PER_KG_BY_GOAL[goal],
+        training_days=TRAINING_DAYS_BY_ACTIVITY[activity_level],
+    )
+
+
+# All 2 x 5 x 3 combinations, compiled once. FACTOR_INDEX numbers them in FACTORS
+# order, so a batch can gather its coefficient columns from one array.
+FACTORS: dict[FactorKey, Factors] = {
+    key: _factors(*key) for key in product(Sex, ActivityLevel, Goal)
+}
+FACTOR_INDEX: dict[FactorKey, int] = {key: i for i, key in enumerate(FACTORS)}
+
+
+def evaluate(
+    f: Factors,
+    strategy: Callable[..., tuple[float, float]],
+    *,
+    age_years: int,
+    height_cm: float,
+    weight_kg: float,
+    net_carbs_g: float,
+    protein_g_per_kg: float,
+) -> tuple[float, float, float, float, float, float, float, float, float]:
+    """
+    Body metrics, calorie target and keto macros of an adult from one `Factors` row,
+    with no per-call enum lookups. `strategy` (see app.formulas.strategies) picks the
+    net carbs and protein per kg from the row, the body fat estimate and the requested
+    `net_carbs_g` / `protein_g_per_kg`; fat fills the remaining calories.
+
+    Returns:
+        (bmi, bmr, tdee, body_fat_percent, ffmi, calories_total, protein_g, fat_g,
+         net_carbs_g)
+
+    The arithmetic is that of calculate_bmi, calculate_bmr_mifflin_st_jeor,
+    calculate_tdee, estimate_body_fat_percent_from_bmi, calculate_ffmi,
+    calories_target_from_goal and calculate_keto_macros, operation for operation, so the
+    fixed_keto results are bit-for-bit the same; the factors are not folded together because that
+    would change the rounding. Invalid inputs raise the same ValueError, in the same
+    order, as calling those functions in sequence.
+    """
+    if weight_kg <= 0:
+        raise ValueError("weight_kg must be > 0")
+    if height_cm <= 0:
+        raise ValueError("height_cm must be > 0")
+    if age_years < 18:
+        raise ValueError("BMR formula not supported for minors (<18) yet.")
+
+    height_m = height_cm / 100.0
+    height_m2 = height_m * height_m
+    bmi = weight_kg / height_m2
+
+    # base + 5.0 / base - 161.0 as one addition: x + (-161.0) is exactly x - 161.0.
+    bmr = BMR_KCAL_PER_KG * weight_kg + 6.25 * height_cm - 5.0 * age_years + f.bmr_offset
+    if bmr <= 0:
+        raise ValueError("bmr must be > 0")
+    tdee = bmr * f.activity_multiplier
+
+    if bmi <= 0:
+        raise ValueError("bmi must be > 0")
+    bf = 1.20 * bmi + 0.23 * age_years - 10.8 * f.male - 5.4
+    # max(0.0, min(75.0, bf)) without the two calls; NaN also becomes 75.0.
+    bf = bf if bf < 75.0 else 75.0
+    bf = bf if bf > 0.0 else 0.0
+    ffmi = (weight_kg * (1.0 - bf / 100.0)) / height_m2
+
+    if tdee <= 0:
+        raise ValueError("tdee must be > 0")
+    # x * 1.0 is exactly x, so "maintain" needs no branch.
+    calories = tdee * f.goal_factor
+    if calories <= 0:
+        raise ValueError("calories_total must be > 0")
+
+    carbs, protein_per_kg = strategy(f, bf, net_carbs_g, protein_g_per_kg)
+    protein_g = weight_kg * protein_per_kg
+    fat_cal = calories - (protein_g * 4.0 + carbs * 4.0)
+    if fat_cal < 0:
+        raise ValueError("Calories too low for keto macro targets.")
+
+    return bmi, bmr, tdee, bf, ffmi, calories, protein_g, fat_cal / 9.0, carbs
@@ -1,13 +1,111 @@
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
 KCAL_PER_KG = 7700.0
 
 
-def forecast_weight_kg(
+class WeightForecast:
+    """
+    Read-only sequence of (week_index, projected_weight_kg) for weeks 0..weeks.
+
+    Subclasses store a handful of parameters and compute any week in O(1).
+    """
+
+    __slots__ = ()
+
+    weeks: int
+
+    def weight_at(self, week: int) -> float:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self.weeks + 1
+
+    def __getitem__(self, index: int) -> tuple[int, float]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("forecast index out of range")
+        return index, self.weight_at(index)
+
+    def __iter__(self) -> Iterator[tuple[int, float]]:
+        for week in range(len(self)):
+            yield week, self.weight_at(week)
+
+
+@dataclass(frozen=True, slots=True)
+class LinearForecast(WeightForecast):
+    """
+    Constant-delta weight projection, evaluated in closed form.
+
+    weight(week) = max(0, start_weight_kg + week * delta_kg_per_week)
+
+    Only the start weight, weekly delta and clamp point are stored.
+    """
+
+    start_weight_kg: float
+    delta_kg_per_week: float
+    weeks: int
+    # First week at which the projection reaches 0 kg, or None if it never does.
+    clamp_week: int | None = field(init=False, compare=False)
+
+    def __post_init__(self) -> None:
+        clamp_week = None
+        if self.delta_kg_per_week < 0:
+            clamp_week = max(1, math.ceil(self.start_weight_kg / -self.delta_kg_per_week))
+            # Settle float rounding so clamp_week is exactly the first week <= 0 kg.
+            while clamp_week > 1 and self._raw(clamp_week - 1) <= 0:
+                clamp_week -= 1
+            while self._raw(clamp_week) > 0:
+                clamp_week += 1
+        object.__setattr__(self, "clamp_week", clamp_week)
+
+    def _raw(self, week: int) -> float:
+        return self.start_weight_kg + week * self.delta_kg_per_week
+
+    def weight_at(self, week: int) -> float:
+        if self.clamp_week is not None and week >= self.clamp_week:
+            return 0.0
+        return self._raw(week)
+
+
+@dataclass(frozen=True, slots=True)
+class AdaptiveForecast(WeightForecast):
+    """
+    Weight projection with metabolic adaptation: TDEE is recomputed from the projected
+    weight every week.
+
+    Mifflin–St Jeor BMR is affine in weight and TDEE is BMR times a constant, so
+      TDEE(w) = tdee + tdee_per_kg * (w - start_weight_kg)
+    and the weekly energy-balance step
+      w[k+1] = w[k] + (calories_target - TDEE(w[k])) * 7 / 7700
+    is a linear recurrence with the closed form
+      w[k] = equilibrium + (start - equilibrium) * retention**k
+      equilibrium = start + (calories_target - tdee) / tdee_per_kg
+      retention   = 1 - tdee_per_kg * 7 / 7700
+
+    Age (and so the BMR age term) is held constant over the horizon.
+    """
+
+    start_weight_kg: float
+    equilibrium_weight_kg: float
+    retention: float
+    weeks: int
+
+    def weight_at(self, week: int) -> float:
+        eq = self.equilibrium_weight_kg
+        return max(0.0, eq + (self.start_weight_kg - eq) * self.retention**week)
+
+
+def forecast_linear(
     *,
     start_weight_kg: float,
     tdee: float,
     calories_target: float,
     weeks: int = 24,
-) -> list[tuple[int, float]]:
+    kcal_per_kg: float = KCAL_PER_KG,
+) -> LinearForecast:
     """
     Simple weight projection based on energy balance.
 
@@ -17,7 +115,7 @@ def forecast_weight_kg(
 
     delta_kg_per_week ≈ (daily_delta_kcal * 7) / 7700
 
-    Returns list of (week_index, projected_weight_kg), including week 0.
+    `kcal_per_kg` replaces the 7700 kcal/kg energy density, e.g. with a calibrated one.
     """
     if start_weight_kg <= 0:
         raise ValueError("start_weight_kg must be > 0")
@@ -29,14 +127,67 @@ def forecast_weight_kg(
         raise ValueError("weeks must be > 0")
 
     daily_delta_kcal = calories_target - tdee
-    delta_kg_per_week = (daily_delta_kcal * 7.0) / KCAL_PER_KG
+    delta_kg_per_week = (daily_delta_kcal * 7.0) / kcal_per_kg
+
+    return LinearForecast(
+        start_weight_kg=float(start_weight_kg),
+        delta_kg_per_week=delta_kg_per_week,
+        weeks=weeks,
+    )
 
-    points: list[tuple[int, float]] = [(0, float(start_weight_kg))]
-    current = float(start_weight_kg)
 
-    for week in range(1, weeks + 1):
-        current = current + delta_kg_per_week
-        current = max(0.0, current)
-        points.append((week, current))
+def forecast_adaptive(
+    *,
+    start_weight_kg: float,
+    tdee: float,
+    tdee_per_kg: float,
+    calories_target: float,
+    weeks: int = 24,
+    kcal_per_kg: float = KCAL_PER_KG,
+) -> AdaptiveForecast:
+    """
+    Energy-balance weight projection where TDEE follows the projected weight.
 
-    return points
+    tdee_per_kg is the change in TDEE per kg of body weight, i.e.
+    calculate_tdee(bmr=BMR_KCAL_PER_KG, activity_level=...). `kcal_per_kg` is the
+    energy density as in `forecast_linear`.
+    """
+    if start_weight_kg <= 0:
+        raise ValueError("start_weight_kg must be > 0")
+    if tdee <= 0:
+        raise ValueError("tdee must be > 0")
+    if tdee_per_kg <= 0:
+        raise ValueError("tdee_per_kg must be > 0")
+    if calories_target <= 0:
+        raise ValueError("calories_target must be > 0")
+    if weeks <= 0:
+        raise ValueError("weeks must be > 0")
+
+    return AdaptiveForecast(
+        start_weight_kg=float(start_weight_kg),
+        equilibrium_weight_kg=start_weight_kg + (calories_target - tdee) / tdee_per_kg,
+        retention=1.0 - tdee_per_kg * 7.0 / kcal_per_kg,
+        weeks=weeks,
+    )
+
+
+def forecast_weight_kg(
+    *,
+    start_weight_kg: float,
+    tdee: float,
+    calories_target: float,
+    weeks: int = 24,
+) -> list[tuple[int, float]]:
+    """
+    Materialized `forecast_linear`.
+
+    Returns list of (week_index, projected_weight_kg), including week 0.
+    """
+    return list(
+        forecast_linear(
+            start_weight_kg=start_weight_kg,
+            tdee=tdee,
+            calories_target=calories_target,
+            weeks=weeks,
+        )
+    )
@@ -1,4 +1,4 @@
-from app.models import Goal
+from app.models import ActivityLevel, Goal
 
 NET_CARBS_G = 20.0
 
@@ -8,6 +8,29 @@ PROTEIN_G_PER_KG_BY_GOAL: dict[Goal, float] = {
     Goal.gain: 2.2,
 }
 
+# Protein per kg of fat-free mass, for the lean-mass strategy.
+LEAN_MASS_PROTEIN_G_PER_KG_BY_GOAL: dict[Goal, float] = {
+    Goal.lose: 2.2,
+    Goal.maintain: 2.0,
+    Goal.gain: 2.5,
+}
+
+# Cyclical keto: keto days at NET_CARBS_G, then refeed days at CKD_REFEED_CARBS_G.
+CKD_KETO_DAYS = 5
+CKD_REFEED_DAYS = 2
+CKD_REFEED_CARBS_G = 150.0
+
+# Targeted keto: extra net carbs eaten around each workout.
+TKD_WORKOUT_CARBS_G = 25.0
+
+TRAINING_DAYS_BY_ACTIVITY: dict[ActivityLevel, float] = {
+    ActivityLevel.sedentary: 0.0,
+    ActivityLevel.light: 2.0,
+    ActivityLevel.moderate: 4.0,
+    ActivityLevel.very: 5.0,
+    ActivityLevel.athlete: 6.0,
+}
+
 
 def calculate_keto_macros(
     *,
@@ -0,0 +1,96 @@
+import math
+from collections.abc import Callable
+
+import numpy as np
+
+from app.formulas.factors import Factors
+from app.formulas.macros import (
+    CKD_KETO_DAYS,
+    CKD_REFEED_CARBS_G,
+    CKD_REFEED_DAYS,
+    NET_CARBS_G,
+    TKD_WORKOUT_CARBS_G,
+)
+from app.models import MacroStrategy, UserInput
+
+# A float for one user, or an array for a batch (then `Factors` holds columns too).
+# Strategies use plain arithmetic only, so the same function evaluates both and gives
+# bit-for-bit equal results.
+Value = float | np.ndarray
+
+# (factors, body_fat_percent, requested net_carbs_g, requested protein_g_per_kg)
+#   -> (net_carbs_g, protein_g_per_kg of body weight)
+# A requested value is NaN when the request did not send it (see units.requested_macros).
+MacroFn = Callable[[Factors, Value, Value, Value], tuple[Value, Value]]
+
+_USER_MACRO_FIELDS = frozenset({"net_carbs_g", "protein_g_per_kg"})
+
+# Average day of the cyclical week: keto days plus higher-carb refeed days.
+CKD_NET_CARBS_G = (CKD_KETO_DAYS * NET_CARBS_G + CKD_REFEED_DAYS * CKD_REFEED_CARBS_G) / (
+    CKD_KETO_DAYS + CKD_REFEED_DAYS
+)
+
+
+def fixed_keto(
+    f: Factors, body_fat_percent: Value, net_carbs_g: Value, protein_g_per_kg: Value
+) -> tuple[Value, Value]:
+    """20g net carbs, protein per kg of body weight by goal (the original rules)."""
+    return NET_CARBS_G, f.protein_g_per_kg
+
+
+def _sent(value: Value, default: Value) -> Value:
+    """`value`, or `default` where it is NaN (not sent)."""
+    if isinstance(value, np.ndarray) or isinstance(default, np.ndarray):
+        return np.where(np.isnan(value), default, value)
+    return default if math.isnan(value) else value
+
+
+def user_override(
+    f: Factors, body_fat_percent: Value, net_carbs_g: Value, protein_g_per_kg: Value
+) -> tuple[Value, Value]:
+    """The request's own net_carbs_g and protein_g_per_kg; a field not sent is fixed_keto's."""
+    carbs, protein = fixed_keto(f, body_fat_percent, net_carbs_g, protein_g_per_kg)
+    return _sent(net_carbs_g, carbs), _sent(protein_g_per_kg, protein)
+
+
+def lean_mass(
+    f: Factors, body_fat_percent: Value, net_carbs_g: Value, protein_g_per_kg: Value
+) -> tuple[Value, Value]:
+    """20g net carbs, protein per kg of fat-free mass by goal."""
+    return NET_CARBS_G, (1.0 - body_fat_percent / 100.0) * f.lean_protein_g_per_kg
+
+
+def cyclical(
+    f: Factors, body_fat_percent: Value, net_carbs_g: Value, protein_g_per_kg: Value
+) -> tuple[Value, Value]:
+    """Cyclical keto (CKD): the average day of 5 keto and 2 refeed days."""
+    return CKD_NET_CARBS_G, f.protein_g_per_kg
+
+
+def targeted(
+    f: Factors, body_fat_percent: Value, net_carbs_g: Value, protein_g_per_kg: Value
+) -> tuple[Value, Value]:
+    """Targeted keto (TKD): workout carbs on training days, averaged over the week."""
+    return NET_CARBS_G + TKD_WORKOUT_CARBS_G * f.training_days / 7.0, f.protein_g_per_kg
+
+
+MACRO_STRATEGIES: dict[MacroStrategy, MacroFn] = {
+    MacroStrategy.fixed_keto: fixed_keto,
+    MacroStrategy.user_override: user_override,
+    MacroStrategy.lean_mass: lean_mass,
+    MacroStrategy.cyclical: cyclical,
+    MacroStrategy.targeted: targeted,
+}
+
+
+def resolve_macro_strategy(user: UserInput) -> MacroStrategy:
+    """
+    The strategy a request asked for. Without one, sending net_carbs_g or
+    protein_g_per_kg selects user_override (a field left out keeps its fixed_keto value);
+    otherwise fixed_keto keeps the original macros.
+    """
+    if user.macro_strategy is not None:
+        return user.macro_strategy
+    if _USER_MACRO_FIELDS.isdisjoint(user.model_fields_set):
+        return MacroStrategy.fixed_keto
+    return MacroStrategy.user_override
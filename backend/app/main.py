@@ -1,11 +1,81 @@
-from fastapi import APIRouter, FastAPI, HTTPException
+import datetime
+import importlib
+import os
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from functools import partial
+from types import ModuleType
+from typing import Annotated
 
-from app.calc import calculate_all
-from app.models import CalcOutput, UserInput
+from fastapi import APIRouter, FastAPI, HTTPException, Path, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic_core import to_json
+
+from app.analytics import results_store
+from app.batch import calculate_batch
+from app.bulk import DuplexStreamingResponse, aiter_calc
+from app.cache import calc_cache, calc_cache_key
+from app.calc import calculate_all, calculate_values
+from app.fastpath import JSONBytesResponse, calc_output_json, parse_user_input
+from app.foods import food_index
+from app.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, span
+from app.models import (
+    AnalyticsOutput,
+    AnalyticsQuery,
+    BatchCalcRow,
+    CalcOutput,
+    CalibrationSummary,
+    ProgressOutput,
+    SweepOutput,
+    SweepRequest,
+    UserInput,
+    WeighIn,
+)
 from app.models_mealplan import MealPlanResponse
-from app.services.llm_mealplan import generate_meal_plan
+from app.pools import CALC_POOL, MEALPLAN_POOL, PooledStreamingResponse
+from app.profiler import get_profile
+from app.progress import (
+    add_weighins,
+    calibrate_store,
+    get_snapshot,
+    list_weighins,
+    save_profile,
+)
+from app.sweep import calculate_sweep
+
+# The meal plan service pulls in google.genai, about half of the app's import time, so
+# instances that only serve /calc never load it. MEALPLAN_PREWARM=1 loads it (and the
+# Gemini client and food table) at startup instead of on the first meal plan request.
+MEALPLAN_SERVICE = "app.services.llm_mealplan"
+MEALPLAN_PREWARM = os.getenv("MEALPLAN_PREWARM", "0") != "0"
+
+_mealplan_service: ModuleType | None = None
+
+
+async def mealplan_service() -> ModuleType:
+    """The meal plan service module, imported on a meal plan pool thread on first use."""
+    global _mealplan_service
+    if _mealplan_service is None:
+        _mealplan_service = await MEALPLAN_POOL.run_sync(importlib.import_module, MEALPLAN_SERVICE)
+    return _mealplan_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    MEALPLAN_POOL.open()
+    if MEALPLAN_PREWARM:
+        (await mealplan_service()).init_client()
+        await MEALPLAN_POOL.run_sync(food_index)
+    yield
+    # Let in-flight meal plans finish before their Gemini client is closed.
+    MEALPLAN_POOL.close()
+    await MEALPLAN_POOL.drain()
+    if _mealplan_service is not None:
+        await _mealplan_service.close_client()
 
-app = FastAPI(title="Keto Calculator API", version="0.1.0")
+
+app = FastAPI(title="Keto Calculator API", version="0.1.0", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 api = APIRouter(prefix="/api")
 
 
@@ -14,34 +84,214 @@ def health():
     return {"status": "ok"}
 
 
-def do_calc(user: UserInput) -> CalcOutput:
+# /calc validates the raw body itself (see app/fastpath.py); this documents it as usual.
+USER_INPUT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/UserInput"}}},
+    }
+}
+
+
+def _cached_calc(user: UserInput) -> bytes:
+    return calc_cache.get_or_compute(
+        calc_cache_key(user), lambda: calc_output_json(calculate_values(user))
+    )
+
+
+async def do_calc(request: Request) -> JSONBytesResponse:
+    user = parse_user_input(await request.body())
     try:
-        return calculate_all(user)
+        # Disk and Redis cache backends block, so the whole lookup stays off the loop.
+        body = await CALC_POOL.run_sync(_cached_calc, user)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    return JSONBytesResponse(body)
+
+
+def _calc_batch(users: list[UserInput]) -> list[BatchCalcRow]:
+    with span("calc.batch"):
+        result = calculate_batch(users)
+    if (store := results_store()) is not None:
+        with span("analytics.append"):
+            store.append_batch(users, result)
+    return [
+        BatchCalcRow(index=i, result=None if calc is None else calc.to_output(), error=error)
+        for i, (calc, error) in enumerate(zip(result.results(), result.errors, strict=True))
+    ]
+
+
+async def do_calc_batch(users: list[UserInput]) -> list[BatchCalcRow]:
+    return await CALC_POOL.run_sync(_calc_batch, users)
+
+
+def _calc_sweep(req: SweepRequest) -> bytes:
+    with span("calc.sweep"):
+        return to_json(calculate_sweep(req))
+
+
+async def do_calc_sweep(req: SweepRequest) -> JSONBytesResponse:
+    try:
+        body = await CALC_POOL.run_sync(_calc_sweep, req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return JSONBytesResponse(body)
+
+
+def do_calc_stream(request: Request) -> DuplexStreamingResponse:
+    content_type = request.headers.get("content-type", "")
+    fmt = "csv" if content_type.startswith("text/csv") else "ndjson"
+    return DuplexStreamingResponse(
+        aiter_calc(request.stream(), fmt=fmt), media_type="application/x-ndjson"
+    )
+
+
+UserId = Annotated[str, Path(min_length=1, max_length=128)]
 
 
-def do_mealplan(user: UserInput) -> MealPlanResponse:
+async def do_progress(fn: Callable[..., bytes], *args, **kwargs) -> JSONBytesResponse:
+    """Run a progress store operation on the calc pool (SQLite blocks)."""
+    try:
+        with span("progress.store"):
+            body = await CALC_POOL.run_sync(partial(fn, *args, **kwargs))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return JSONBytesResponse(body)
+
+
+async def do_list_weighins(user_id: str) -> list[WeighIn]:
+    try:
+        return await CALC_POOL.run_sync(list_weighins, user_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+
+
+async def do_calibrate(fit_energy_density: bool) -> CalibrationSummary:
+    with span("progress.calibrate"):
+        return await CALC_POOL.run_sync(
+            partial(calibrate_store, fit_energy_density=fit_energy_density)
+        )
+
+
+def _analytics(query: AnalyticsQuery) -> bytes:
+    store = results_store()
+    if store is None:
+        raise RuntimeError("Analytics are disabled; set ANALYTICS_DIR to record results.")
+    with span("analytics.aggregate"):
+        return to_json(store.aggregate(query))
+
+
+async def do_analytics(query: AnalyticsQuery) -> JSONBytesResponse:
+    try:
+        body = await CALC_POOL.run_sync(_analytics, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except RuntimeError as e:
+        raise _unavailable(e) from e
+    return JSONBytesResponse(body)
+
+
+def _unavailable(e: RuntimeError) -> HTTPException:
+    msg = str(e)
+    if "RESOURCE_EXHAUSTED" in msg or "RATE_LIMIT" in msg:
+        return HTTPException(status_code=429, detail=msg)
+    return HTTPException(status_code=503, detail=msg)
+
+
+async def do_mealplan(user: UserInput) -> MealPlanResponse:
     try:
         calc = calculate_all(user)
-        return generate_meal_plan(user, calc)
+        with MEALPLAN_POOL:
+            return await (await mealplan_service()).generate_meal_plan(user, calc)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except RuntimeError as e:
+        raise _unavailable(e) from e
+
+
+async def do_mealplan_stream(user: UserInput) -> StreamingResponse:
+    service = await mealplan_service()
+    try:
+        events = service.stream_meal_plan(user, calculate_all(user))
+        MEALPLAN_POOL.acquire()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
     except RuntimeError as e:
-        msg = str(e)
-        if "RESOURCE_EXHAUSTED" in msg or "RATE_LIMIT" in msg:
-            raise HTTPException(status_code=429, detail=msg) from e
-        raise HTTPException(status_code=503, detail=msg) from e
+        raise _unavailable(e) from e
+    return PooledStreamingResponse(events, pool=MEALPLAN_POOL, media_type="text/event-stream")
 
 
-@app.post("/calc", response_model=CalcOutput)
-def calc(user: UserInput) -> CalcOutput:
-    return do_calc(user)
+def do_metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    return do_metrics()
+
+
+@app.post("/calc", response_model=CalcOutput, openapi_extra=USER_INPUT_BODY)
+async def calc(request: Request) -> JSONBytesResponse:
+    return await do_calc(request)
+
+
+@app.post("/calc/batch", response_model=list[BatchCalcRow])
+async def calc_batch(users: list[UserInput]) -> list[BatchCalcRow]:
+    return await do_calc_batch(users)
+
+
+@app.post("/calc/sweep", response_model=SweepOutput)
+async def calc_sweep(req: SweepRequest) -> JSONBytesResponse:
+    return await do_calc_sweep(req)
+
+
+@app.post("/calc/stream")
+async def calc_stream(request: Request) -> DuplexStreamingResponse:
+    return do_calc_stream(request)
+
+
+@app.put("/users/{user_id}", response_model=ProgressOutput)
+async def put_user(
+    user_id: UserId, user: UserInput, start_date: datetime.date | None = None
+) -> JSONBytesResponse:
+    return await do_progress(save_profile, user_id, user, start_date=start_date)
+
+
+@app.get("/users/{user_id}", response_model=ProgressOutput)
+async def get_user(user_id: UserId) -> JSONBytesResponse:
+    return await do_progress(get_snapshot, user_id)
+
+
+@app.post("/users/{user_id}/weighins", response_model=ProgressOutput)
+async def post_weighins(user_id: UserId, weighins: list[WeighIn]) -> JSONBytesResponse:
+    return await do_progress(add_weighins, user_id, weighins)
+
+
+@app.get("/users/{user_id}/weighins", response_model=list[WeighIn])
+async def get_weighins(user_id: UserId) -> list[WeighIn]:
+    return await do_list_weighins(user_id)
+
+
+@app.post("/users/calibrate", response_model=CalibrationSummary)
+async def calibrate_users(fit_energy_density: bool = False) -> CalibrationSummary:
+    return await do_calibrate(fit_energy_density)
+
+
+@app.post("/analytics/calc", response_model=AnalyticsOutput)
+async def analytics_calc(query: AnalyticsQuery) -> JSONBytesResponse:
+    return await do_analytics(query)
 
 
 @app.post("/mealplan", response_model=MealPlanResponse)
-def mealplan(user: UserInput) -> MealPlanResponse:
-    return do_mealplan(user)
+async def mealplan(user: UserInput) -> MealPlanResponse:
+    return await do_mealplan(user)
+
+
+@app.post("/mealplan/stream")
+async def mealplan_stream(user: UserInput) -> StreamingResponse:
+    return await do_mealplan_stream(user)
 
 
 @api.get("/health")
@@ -49,14 +299,89 @@ def api_health():
     return {"status": "ok"}
 
 
-@api.post("/calc", response_model=CalcOutput)
-def api_calc(user: UserInput) -> CalcOutput:
-    return do_calc(user)
+@api.get("/metrics", include_in_schema=False)
+def api_metrics() -> PlainTextResponse:
+    return do_metrics()
+
+
+@api.get("/profiles/{profile_id}", include_in_schema=False)
+def api_profile(profile_id: str) -> PlainTextResponse:
+    folded = get_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile id")
+    return PlainTextResponse(folded)
+
+
+@api.post("/calc", response_model=CalcOutput, openapi_extra=USER_INPUT_BODY)
+async def api_calc(request: Request) -> JSONBytesResponse:
+    return await do_calc(request)
+
+
+@api.get("/calc/cache")
+def api_calc_cache():
+    return calc_cache.stats()
+
+
+@api.post("/calc/batch", response_model=list[BatchCalcRow])
+async def api_calc_batch(users: list[UserInput]) -> list[BatchCalcRow]:
+    return await do_calc_batch(users)
+
+
+@api.post("/calc/sweep", response_model=SweepOutput)
+async def api_calc_sweep(req: SweepRequest) -> JSONBytesResponse:
+    return await do_calc_sweep(req)
+
+
+@api.post("/calc/stream")
+async def api_calc_stream(request: Request) -> DuplexStreamingResponse:
+    return do_calc_stream(request)
+
+
+@api.put("/users/{user_id}", response_model=ProgressOutput)
+async def api_put_user(
+    user_id: UserId, user: UserInput, start_date: datetime.date | None = None
+) -> JSONBytesResponse:
+    return await do_progress(save_profile, user_id, user, start_date=start_date)
+
+
+@api.get("/users/{user_id}", response_model=ProgressOutput)
+async def api_get_user(user_id: UserId) -> JSONBytesResponse:
+    return await do_progress(get_snapshot, user_id)
+
+
+@api.post("/users/{user_id}/weighins", response_model=ProgressOutput)
+async def api_post_weighins(user_id: UserId, weighins: list[WeighIn]) -> JSONBytesResponse:
+    return await do_progress(add_weighins, user_id, weighins)
+
+
+@api.get("/users/{user_id}/weighins", response_model=list[WeighIn])
+async def api_get_weighins(user_id: UserId) -> list[WeighIn]:
+    return await do_list_weighins(user_id)
+
+
+@api.post("/users/calibrate", response_model=CalibrationSummary)
+async def api_calibrate_users(fit_energy_density: bool = False) -> CalibrationSummary:
+    return await do_calibrate(fit_energy_density)
+
+
+@api.post("/analytics/calc", response_model=AnalyticsOutput)
+async def api_analytics_calc(query: AnalyticsQuery) -> JSONBytesResponse:
+    return await do_analytics(query)
 
 
 @api.post("/mealplan", response_model=MealPlanResponse)
-def api_mealplan(user: UserInput) -> MealPlanResponse:
-    return do_mealplan(user)
+async def api_mealplan(user: UserInput) -> MealPlanResponse:
+    return await do_mealplan(user)
+
+
+@api.get("/mealplan/stats")
+async def api_mealplan_stats():
+    return (await mealplan_service()).mealplan_stats()
+
+
+@api.post("/mealplan/stream")
+async def api_mealplan_stream(user: UserInput) -> StreamingResponse:
+    return await do_mealplan_stream(user)
 
 
 app.include_router(api)
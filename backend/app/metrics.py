@@ -0,0 +1,334 @@
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import ParamSpec, TypeVar
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import profiler
+
+# Set METRICS_SPANS=0 to skip the per-stage timers (request metrics are always on).
+METRICS_SPANS = os.getenv("METRICS_SPANS", "1") != "0"
+
+HTTP_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS_S = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+# Distinct request paths remembered for the route label; beyond that, unknown paths are
+# resolved on every request instead of growing the table.
+MAX_ROUTE_LABELS = 1024
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        # An unlabelled series is exported as 0 before its first increment.
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; `observe` is a bisect plus a few additions under a lock."""
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: tuple[str, ...], buckets: tuple[float, ...]
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf)..., sum, count]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.observe_many(((value, labels),))
+
+    def observe_many(self, observations: Iterable[tuple[float, tuple[str, ...]]]) -> None:
+        """Record several (value, labels) pairs under one lock acquisition."""
+        with self._lock:
+            for value, labels in observations:
+                series = self._series.get(labels)
+                if series is None:
+                    series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+                series[bisect.bisect_left(self.buckets, value)] += 1
+                series[-2] += value
+                series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return 0 if series is None else int(series[-1])
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            cumulative = 0.0
+            for bound, n in zip((*self.buckets, math.inf), values, strict=False):
+                cumulative += n
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {_number(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(values[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {_number(values[-1])}"
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[_Metric] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        return "\n".join(line for m in self.metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from request start until the response is fully sent.",
+        ("method", "route"),
+        HTTP_BUCKETS_S,
+    )
+)
+REQUESTS = REGISTRY.register(
+    Counter(
+        "http_requests_total", "Finished requests by status code.", ("method", "route", "status")
+    )
+)
+IN_FLIGHT = REGISTRY.register(
+    Gauge("http_requests_in_flight", "Requests currently being handled.", ("method", "route"))
+)
+STAGE_DURATION = REGISTRY.register(
+    Histogram(
+        "stage_duration_seconds",
+        "Time spent in one stage of a calculation or meal plan request.",
+        ("stage",),
+        STAGE_BUCKETS_S,
+    )
+)
+
+# Meal plan queueing and retries (also returned as JSON by /api/mealplan/stats). They are
+# registered here rather than in the lazily imported meal plan service so that they are
+# exported from startup.
+RATE_LIMIT_WAITING = REGISTRY.register(
+    Gauge(
+        "rate_limit_waiting_requests",
+        "Requests queued for a client-side rate limit token.",
+        ("bucket",),
+    )
+)
+RATE_LIMIT_WAITS = REGISTRY.register(
+    Counter(
+        "rate_limit_waits_total",
+        "Requests that had to wait for a client-side rate limit token.",
+        ("bucket",),
+    )
+)
+MEALPLAN_SLOT_WAITING = REGISTRY.register(
+    Gauge(
+        "mealplan_slot_waiting_requests",
+        "Meal plan requests queued for one of the MEALPLAN_MAX_CONCURRENCY LLM slots.",
+    )
+)
+MEALPLAN_RETRIES = REGISTRY.register(
+    Counter("mealplan_retries_total", "Gemini requests retried after a 429 or 5xx response.")
+)
+MEALPLAN_DEADLINE_EXCEEDED = REGISTRY.register(
+    Counter(
+        "mealplan_queue_deadline_exceeded_total",
+        "Meal plan requests that failed after queueing past MEALPLAN_QUEUE_DEADLINE_S.",
+    )
+)
+
+
+class span:
+    """
+    Context manager that records its duration under `stage` in `stage_duration_seconds`
+    (also when the block raises).
+
+        with span("mealplan.prompt"):
+            ...
+    """
+
+    __slots__ = ("stage", "_start")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        if METRICS_SPANS:
+            STAGE_DURATION.observe(time.perf_counter() - self._start, self.stage)
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def timed(stage: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator recording every call of a (synchronous) function as a `span`."""
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class StageClock:
+    """
+    Times consecutive stages of one call: `mark(stage)` ends the stage that started at
+    the previous mark (or at construction), and `done()` records them all at once.
+    Cheaper than a `span` per stage in hot, microsecond-scale code such as
+    `calculate_values`; stages of a call that raises before `done()` are dropped.
+    """
+
+    __slots__ = ("_last", "_stages")
+
+    def __init__(self) -> None:
+        self._last = time.perf_counter()
+        self._stages: list[tuple[float, tuple[str, ...]]] = []
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self._stages.append((now - self._last, (stage,)))
+        self._last = now
+
+    def done(self) -> None:
+        if METRICS_SPANS:
+            STAGE_DURATION.observe_many(self._stages)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight requests and status codes per route.
+
+    Routes are labelled by their path template (`/api/calc`); paths no route matches
+    share the `unmatched` label. Requests sent with an `X-Profile` header are run under
+    the sampling profiler when PROFILING_ENABLED=1 (see app/profiler.py).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._routes: dict[str, str] = {}
+
+    def _route(self, scope: Scope) -> str:
+        path = scope["path"]
+        route = self._routes.get(path)
+        if route is not None:
+            return route
+
+        route = "unmatched"
+        for candidate in scope["app"].router.routes:
+            if candidate.matches(scope)[0] != Match.NONE:
+                route = getattr(candidate, "path", path)
+                break
+        if len(self._routes) < MAX_ROUTE_LABELS:
+            self._routes[path] = route
+        return route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        profile = profiler.requested(scope)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile is not None:
+                    headers = [*message.get("headers", []), profile.header()]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        IN_FLIGHT.inc(method, route)
+        start = time.perf_counter()
+        try:
+            if profile is not None:
+                with profile:
+                    await self.app(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start, method, route)
+            REQUESTS.inc(method, route, str(status))
+            IN_FLIGHT.dec(method, route)
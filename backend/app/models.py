@@ -1,6 +1,18 @@
+import datetime
 from enum import Enum
+from typing import Annotated, TypedDict
 
-from pydantic import BaseModel, Field
+from pydantic import (
+    BaseModel,
+    Field,
+    PlainSerializer,
+    PlainValidator,
+    TypeAdapter,
+    field_validator,
+    model_validator,
+)
+
+from app.formulas.forecast import KCAL_PER_KG, WeightForecast
 
 
 class UnitSystem(str, Enum):
@@ -27,6 +39,19 @@ class ActivityLevel(str, Enum):
     athlete = "athlete"
 
 
+class ForecastModel(str, Enum):
+    linear = "linear"
+    adaptive = "adaptive"
+
+
+class MacroStrategy(str, Enum):
+    fixed_keto = "fixed_keto"
+    user_override = "user_override"
+    lean_mass = "lean_mass"
+    cyclical = "cyclical"
+    targeted = "targeted"
+
+
 class Macros(BaseModel):
     calories_total: float
     protein_g: float
@@ -39,6 +64,35 @@ class ForecastPoint(BaseModel):
     weight_kg: float
 
 
+class ForecastPointDict(TypedDict):
+    week: int
+    weight_kg: float
+
+
+_FORECAST_POINTS = TypeAdapter(list[ForecastPoint])
+
+
+def _validate_forecast(value: object) -> WeightForecast | list[ForecastPoint]:
+    if isinstance(value, WeightForecast):
+        return value
+    return _FORECAST_POINTS.validate_python(value)
+
+
+def _serialize_forecast(value: WeightForecast | list[ForecastPoint]) -> list[ForecastPointDict]:
+    if isinstance(value, WeightForecast):
+        return [{"week": week, "weight_kg": kg} for week, kg in value]
+    return [{"week": p.week, "weight_kg": p.weight_kg} for p in value]
+
+
+# A lazily evaluated forecast is kept as-is and serialized straight to JSON points;
+# explicit point lists (e.g. parsed from JSON) are still accepted.
+Forecast = Annotated[
+    WeightForecast | list[ForecastPoint],
+    PlainValidator(_validate_forecast, json_schema_input_type=list[ForecastPoint]),
+    PlainSerializer(_serialize_forecast, return_type=list[ForecastPointDict]),
+]
+
+
 class DietaryPreferences(BaseModel):
     kosher: bool = False
     halal: bool = False
@@ -46,9 +100,17 @@ class DietaryPreferences(BaseModel):
     vegetarian: bool = False
 
 
+class MealPlanEngine(str, Enum):
+    llm = "llm"
+    local = "local"
+
+
 class MealPlanPreferences(BaseModel):
     meals_per_day: int = Field(default=3, ge=1, le=6)
     days: int = Field(default=1, ge=1, le=7)
+    engine: MealPlanEngine = MealPlanEngine.llm
+    # Generate the plan in chunks of this many days, one LLM call per chunk.
+    days_per_chunk: int | None = Field(default=None, ge=1, le=7)
 
 
 class UserInput(BaseModel):
@@ -67,6 +129,11 @@ class UserInput(BaseModel):
 
     net_carbs_g: float = Field(default=25, ge=0, le=100)
     protein_g_per_kg: float = Field(default=1.8, ge=0.5, le=4.0)
+    # None: user_override if net_carbs_g or protein_g_per_kg is sent, else fixed_keto.
+    macro_strategy: MacroStrategy | None = None
+
+    forecast_weeks: int = Field(default=24, ge=1, le=520)
+    forecast_model: ForecastModel = ForecastModel.linear
 
     dietary: DietaryPreferences = Field(default_factory=DietaryPreferences)
 
@@ -80,4 +147,185 @@ class CalcOutput(BaseModel):
     body_fat_percent_estimate: float | None
     ffmi: float | None
     macros: Macros
-    forecast: list[ForecastPoint]
+    forecast: Forecast
+
+
+class WeighIn(BaseModel):
+    date: datetime.date
+    weight_kg: float | None = Field(default=None, gt=0)
+    weight_lb: float | None = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def _one_weight(self) -> "WeighIn":
+        if (self.weight_kg is None) == (self.weight_lb is None):
+            raise ValueError("Exactly one of weight_kg and weight_lb is required.")
+        return self
+
+
+class ProgressOutput(CalcOutput):
+    """
+    Materialized state of a stored user: `CalcOutput` at the latest weigh-in, with the
+    forecast counted in weeks from `start_date`.
+    """
+
+    user_id: str
+    start_date: datetime.date
+    # Date and weight the metrics and the forecast tail are anchored at: the latest
+    # weigh-in on or after start_date, else start_date and the profile weight.
+    as_of: datetime.date
+    weight_kg: float
+    weighins: int
+    # Set once the user is calibrated (see app.calibration); the forecast tail then
+    # uses these instead of `tdee` and KCAL_PER_KG.
+    calibrated_tdee: float | None = None
+    kcal_per_kg: float = KCAL_PER_KG
+
+
+class CalibrationSummary(BaseModel):
+    users: int
+    calibrated: int
+    # Users whose energy density was fitted too (fit_energy_density=true).
+    energy_density_fitted: int
+    errors: dict[str, str]
+
+
+class BatchCalcRow(BaseModel):
+    index: int
+    result: CalcOutput | None = None
+    error: str | None = None
+
+
+SWEEP_MAX_SCENARIOS = 10_000
+
+ProteinGPerKg = Annotated[float, Field(ge=0.5, le=4.0)]
+NetCarbsG = Annotated[float, Field(ge=0, le=100)]
+
+
+def _expand_range(value: object) -> object:
+    """`{"start": a, "stop": b, "step": s}` -> [a, a + s, ...] up to and including b."""
+    if not isinstance(value, dict):
+        return value
+    start, stop, step = (float(value[k]) for k in ("start", "stop", "step"))
+    if step <= 0:
+        raise ValueError("step must be > 0")
+    if stop < start:
+        raise ValueError("stop must be >= start")
+    count = int((stop - start) / step + 1e-9) + 1
+    if count > SWEEP_MAX_SCENARIOS:
+        raise ValueError(f"range has more than {SWEEP_MAX_SCENARIOS} values")
+    return [round(start + i * step, 6) for i in range(count)]
+
+
+class SweepRequest(BaseModel):
+    user: UserInput
+    # Each axis defaults to the base user's value; protein and net carbs default to
+    # what the user's macro strategy gives. Numeric axes also take {"start", "stop", "step"}.
+    goals: list[Goal] | None = Field(default=None, min_length=1)
+    activity_levels: list[ActivityLevel] | None = Field(default=None, min_length=1)
+    protein_g_per_kg: list[ProteinGPerKg] | None = Field(default=None, min_length=1)
+    net_carbs_g: list[NetCarbsG] | None = Field(default=None, min_length=1)
+
+    @field_validator("protein_g_per_kg", "net_carbs_g", mode="before")
+    @classmethod
+    def _ranges(cls, value: object) -> object:
+        return _expand_range(value)
+
+    @model_validator(mode="after")
+    def _grid_size(self) -> "SweepRequest":
+        scenarios = 1
+        for axis in (self.goals, self.activity_levels, self.protein_g_per_kg, self.net_carbs_g):
+            scenarios *= len(axis) if axis else 1
+        if scenarios > SWEEP_MAX_SCENARIOS:
+            raise ValueError(f"sweep has {scenarios} scenarios, max is {SWEEP_MAX_SCENARIOS}")
+        return self
+
+
+class SweepOutput(BaseModel):
+    # Shared by every scenario.
+    bmi: float
+    bmr: float
+    body_fat_percent_estimate: float | None
+    ffmi: float | None
+    # One entry per scenario in every list: goals outermost, then activity levels,
+    # protein, and net carbs innermost. Scenarios with an error have null fat_g.
+    goal: list[Goal]
+    activity_level: list[ActivityLevel]
+    protein_g_per_kg: list[float]
+    net_carbs_g: list[float]
+    tdee: list[float]
+    calories_total: list[float]
+    protein_g: list[float]
+    fat_g: list[float | None]
+    delta_kg_per_week: list[float]
+    final_weight_kg: list[float]
+    error: list[str | None]
+
+
+class AnalyticsDimension(str, Enum):
+    sex = "sex"
+    activity_level = "activity_level"
+    goal = "goal"
+    forecast_model = "forecast_model"
+    macro_strategy = "macro_strategy"
+
+
+class AnalyticsMetric(str, Enum):
+    bmi = "bmi"
+    bmr = "bmr"
+    tdee = "tdee"
+    body_fat_percent_estimate = "body_fat_percent_estimate"
+    ffmi = "ffmi"
+    calories_total = "calories_total"
+    protein_g = "protein_g"
+    fat_g = "fat_g"
+    net_carbs_g = "net_carbs_g"
+    # Shares of calories_total, in percent.
+    protein_pct = "protein_pct"
+    fat_pct = "fat_pct"
+    net_carbs_pct = "net_carbs_pct"
+    weight_kg = "weight_kg"
+    # Projected weight at the end of the forecast minus the start weight.
+    weight_change_kg = "weight_change_kg"
+
+
+class AnalyticsQuery(BaseModel):
+    group_by: list[AnalyticsDimension] = Field(default_factory=list)
+    metrics: list[AnalyticsMetric] = Field(
+        default_factory=lambda: [
+            AnalyticsMetric.bmi,
+            AnalyticsMetric.tdee,
+            AnalyticsMetric.weight_change_kg,
+        ],
+        min_length=1,
+    )
+    percentiles: list[float] = Field(default=[5, 25, 50, 75, 95], max_length=20)
+    bins: int = Field(default=20, ge=1, le=200)
+    # Only rows matching every given dimension value, e.g. {"goal": "lose"}.
+    where: dict[AnalyticsDimension, str] = Field(default_factory=dict)
+
+    @field_validator("percentiles")
+    @classmethod
+    def _percent(cls, value: list[float]) -> list[float]:
+        if any(not 0 <= p <= 100 for p in value):
+            raise ValueError("percentiles must be between 0 and 100")
+        return value
+
+
+class MetricSummary(BaseModel):
+    mean: float
+    # Keyed like "p50".
+    percentiles: dict[str, float]
+    # Counts per bin of AnalyticsOutput.bin_edges[metric].
+    histogram: list[int]
+
+
+class AnalyticsGroup(BaseModel):
+    key: dict[AnalyticsDimension, str]
+    count: int
+    metrics: dict[AnalyticsMetric, MetricSummary]
+
+
+class AnalyticsOutput(BaseModel):
+    rows: int
+    bin_edges: dict[AnalyticsMetric, list[float]]
+    groups: list[AnalyticsGroup]
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+import anyio.to_thread
+from anyio import CapacityLimiter
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.metrics import REGISTRY, Counter, Gauge
+
+# Per worker process. Calc threads run CPU-bound batches, so more of them than cores
+# only adds GIL contention; meal plan threads mostly wait (SDK import, food table).
+CALC_THREADS = int(os.getenv("CALC_THREADS", "2"))
+MEALPLAN_THREADS = int(os.getenv("MEALPLAN_THREADS", "4"))
+# Meal plan requests a worker accepts at once before answering 503 (0 = no limit).
+MEALPLAN_MAX_IN_FLIGHT = int(os.getenv("MEALPLAN_MAX_IN_FLIGHT", "0"))
+# How long shutdown waits for in-flight meal plans; longer than a Gemini call may take.
+SHUTDOWN_GRACE_S = float(os.getenv("SHUTDOWN_GRACE_S", "90"))
+
+POOL_IN_FLIGHT = REGISTRY.register(
+    Gauge("pool_requests_in_flight", "Requests admitted to a work pool.", ("pool",))
+)
+POOL_REJECTED = REGISTRY.register(
+    Counter(
+        "pool_requests_rejected_total",
+        "Requests refused by a full or draining work pool.",
+        ("pool",),
+    )
+)
+
+R = TypeVar("R")
+
+
+class WorkPool:
+    """
+    Worker threads and an in-flight limit for one class of routes.
+
+    `run_sync` runs blocking work on the pool's own threads rather than the threadpool
+    Starlette shares between all sync endpoints, so a burst of batch calculations cannot
+    hold every thread while a meal plan request waits for one, or the other way round.
+
+    `acquire` admits a request until `release`: past `max_in_flight` (0 = no limit), or
+    once `close` has been called at shutdown, it raises RuntimeError, which the routes
+    turn into a 503. `drain` waits for the admitted requests to finish.
+    """
+
+    def __init__(self, name: str, *, threads: int, max_in_flight: int = 0) -> None:
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.limiter = CapacityLimiter(threads)
+        self.in_flight = 0
+        self.closed = False
+
+    async def run_sync(self, fn: Callable[..., R], *args: object) -> R:
+        return await anyio.to_thread.run_sync(fn, *args, limiter=self.limiter)
+
+    def acquire(self) -> None:
+        if self.closed or (self.max_in_flight and self.in_flight >= self.max_in_flight):
+            POOL_REJECTED.inc(self.name)
+            reason = "shutting down" if self.closed else "at capacity"
+            raise RuntimeError(f"Server is {reason}; retry the {self.name} request")
+        self.in_flight += 1
+        POOL_IN_FLIGHT.inc(self.name)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        POOL_IN_FLIGHT.dec(self.name)
+
+    def __enter__(self) -> None:
+        self.acquire()
+
+    def __exit__(self, *exc: object) -> None:
+        self.release()
+
+    def open(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        """Refuse new requests; the ones already admitted keep running."""
+        self.closed = True
+
+    async def drain(self, timeout_s: float = SHUTDOWN_GRACE_S) -> int:
+        """Wait up to `timeout_s` for admitted requests; return how many are still running."""
+        deadline = time.monotonic() + timeout_s
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self.in_flight
+
+
+class PooledStreamingResponse(StreamingResponse):
+    """StreamingResponse holding a slot of `pool` until the stream ends, however it ends."""
+
+    def __init__(self, content, *, pool: WorkPool, **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self.pool = pool
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.pool.release()
+
+
+CALC_POOL = WorkPool("calc", threads=CALC_THREADS)
+MEALPLAN_POOL = WorkPool("mealplan", threads=MEALPLAN_THREADS, max_in_flight=MEALPLAN_MAX_IN_FLIGHT)
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from pathlib import Path
+from types import FrameType
+
+from starlette.types import Scope
+
+# Off by default: profiling a request costs a sampling thread for its whole duration.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") != "0"
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_S", "0.001"))
+PROFILE_HEADER = b"x-profile"
+MAX_PROFILES = 32
+
+_APP_ROOT = str(Path(__file__).resolve().parent.parent)
+_profiles: OrderedDict[str, str] = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_APP_ROOT):
+        filename = filename[len(_APP_ROOT) + 1 :]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """
+    Samples the Python stack of the thread that entered it every PROFILE_INTERVAL_S.
+
+    On exit the samples are stored as folded stacks ("outer;inner count" lines, as read
+    by flamegraph.pl and speedscope) under `id`, keeping the last MAX_PROFILES. Async
+    requests share the event loop thread, so concurrent requests show up in each
+    other's profiles.
+    """
+
+    def __init__(self, interval_s: float = PROFILE_INTERVAL_S) -> None:
+        self.id = uuid.uuid4().hex[:16]
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def header(self) -> tuple[bytes, bytes]:
+        return b"x-profile-id", self.id.encode()
+
+    def _sample(self, thread_id: int) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def __enter__(self) -> "RequestProfile":
+        self._thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident(),), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with _profiles_lock:
+            _profiles[self.id] = self.folded()
+            while len(_profiles) > MAX_PROFILES:
+                _profiles.popitem(last=False)
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def requested(scope: Scope) -> RequestProfile | None:
+    """A new profile if profiling is enabled and the request has an `X-Profile` header."""
+    if not PROFILING_ENABLED:
+        return None
+    for name, _ in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return RequestProfile()
+    return None
+
+
+def get_profile(profile_id: str) -> str | None:
+    """Folded stacks of a finished profiled request, or None if unknown or evicted."""
+    with _profiles_lock:
+        return _profiles.get(profile_id)
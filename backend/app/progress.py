@@ -0,0 +1,308 @@
+import datetime
+import math
+import os
+import threading
+
+import numpy as np
+from pydantic_core import to_json
+
+from app.batch import FACTOR_COLUMNS
+from app.calibration import calibrate
+from app.formulas.bmr import BMR_KCAL_PER_KG
+from app.formulas.factors import FACTOR_INDEX, FACTORS, Factors, evaluate
+from app.formulas.forecast import KCAL_PER_KG, forecast_adaptive, forecast_linear
+from app.formulas.strategies import MACRO_STRATEGIES, resolve_macro_strategy
+from app.models import (
+    CalibrationSummary,
+    ForecastModel,
+    ForecastPoint,
+    Macros,
+    ProgressOutput,
+    UserInput,
+    WeighIn,
+)
+from app.store import Calibration, ProgressStore, SQLiteStore, StoredProfile
+from app.units import LB_TO_KG, normalize_inputs, requested_macros
+
+# Lambda keeps /tmp across warm invocations only; point this at a mounted volume to keep
+# profiles for good.
+PROGRESS_DB_PATH = os.getenv("PROGRESS_DB_PATH", "/tmp/keto-progress.sqlite3")
+
+_store: ProgressStore | None = None
+_store_lock = threading.Lock()
+
+
+def progress_store() -> ProgressStore:
+    """The process-wide store, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(PROGRESS_DB_PATH)
+        return _store
+
+
+def _snapshot(
+    user_id: str,
+    profile: StoredProfile,
+    *,
+    as_of: datetime.date,
+    weight_kg: float,
+    weighins: int,
+    head: list[ForecastPoint],
+    calibration: Calibration | None,
+) -> ProgressOutput:
+    """
+    Re-anchor a snapshot at (as_of, weight_kg).
+
+    Only what depends on the new weight is evaluated: the formulas from the profile's
+    `Factors` row and stored height/age (no normalization), and the forecast weeks from
+    `as_of` on, projected from the new weight. Earlier weeks are kept from `head`. With a
+    `calibration`, the tail uses its effective TDEE and energy density.
+    """
+    user = profile.user
+    f = FACTORS[user.sex, user.activity_level, user.goal]
+    requested_carbs, requested_protein = requested_macros(user)
+    bmi, bmr, tdee, bf, ffmi, calories_target, protein_g, fat_g, net_carbs_g = evaluate(
+        f,
+        MACRO_STRATEGIES[resolve_macro_strategy(user)],
+        age_years=profile.age_years,
+        height_cm=profile.height_cm,
+        weight_kg=weight_kg,
+        net_carbs_g=requested_carbs,
+        protein_g_per_kg=requested_protein,
+    )
+
+    weeks = user.forecast_weeks
+    forecast_tdee, kcal_per_kg = calibration or (tdee, KCAL_PER_KG)
+    if user.forecast_model == ForecastModel.adaptive:
+        tail = forecast_adaptive(
+            start_weight_kg=weight_kg,
+            tdee=forecast_tdee,
+            tdee_per_kg=f.tdee_per_kg,
+            calories_target=calories_target,
+            weeks=weeks,
+            kcal_per_kg=kcal_per_kg,
+        )
+    else:
+        tail = forecast_linear(
+            start_weight_kg=weight_kg,
+            tdee=forecast_tdee,
+            calories_target=calories_target,
+            weeks=weeks,
+            kcal_per_kg=kcal_per_kg,
+        )
+    # Both forecasts are closed forms, so a weigh-in between two weekly points just
+    # evaluates the tail at fractional weeks.
+    offset = (as_of - profile.start_date).days / 7.0
+    forecast = [p for p in head if p.week < offset]
+    forecast += [
+        ForecastPoint.model_construct(week=week, weight_kg=tail.weight_at(week - offset))
+        for week in range(math.ceil(offset), weeks + 1)
+    ]
+
+    return ProgressOutput.model_construct(
+        bmi=bmi,
+        bmr=bmr,
+        tdee=tdee,
+        body_fat_percent_estimate=bf,
+        ffmi=ffmi,
+        macros=Macros.model_construct(
+            calories_total=calories_target,
+            protein_g=protein_g,
+            fat_g=fat_g,
+            net_carbs_g=net_carbs_g,
+        ),
+        forecast=forecast,
+        user_id=user_id,
+        start_date=profile.start_date,
+        as_of=as_of,
+        weight_kg=weight_kg,
+        weighins=weighins,
+        calibrated_tdee=calibration.tdee if calibration else None,
+        kcal_per_kg=kcal_per_kg,
+    )
+
+
+def save_profile(
+    user_id: str,
+    user: UserInput,
+    *,
+    start_date: datetime.date | None = None,
+    store: ProgressStore | None = None,
+) -> bytes:
+    """
+    Create or replace a user's profile and return the new snapshot JSON.
+
+    `start_date` (week 0 of the forecast) defaults to the stored one, or today for a new
+    user. Stored weigh-ins are kept; the latest one since `start_date` anchors the
+    snapshot. Raises ValueError like `calculate_all` for invalid input.
+    """
+    store = store or progress_store()
+    norm = normalize_inputs(user)
+    with store.transaction():
+        if start_date is None:
+            existing = store.get_profile(user_id)
+            start_date = existing.start_date if existing else datetime.date.today()
+        profile = StoredProfile(user, start_date, norm.age_years, norm.height_cm)
+        count = len(store.weighins(user_id))
+        calibration = store.get_calibration(user_id)
+        snapshot = _snapshot(
+            user_id,
+            profile,
+            as_of=start_date,
+            weight_kg=norm.weight_kg,
+            weighins=count,
+            head=[],
+            calibration=calibration,
+        )
+        latest = store.latest_weighin(user_id, since=start_date)
+        if latest is not None:
+            date, weight_kg = latest
+            snapshot = _snapshot(
+                user_id,
+                profile,
+                as_of=date,
+                weight_kg=weight_kg,
+                weighins=count,
+                head=snapshot.forecast,
+                calibration=calibration,
+            )
+        body = to_json(snapshot)
+        store.put_profile(user_id, profile)
+        store.put_snapshot(user_id, body)
+    return body
+
+
+def add_weighins(
+    user_id: str, weighins: list[WeighIn], *, store: ProgressStore | None = None
+) -> bytes:
+    """
+    Append weigh-ins (a later one for the same date wins) and return the snapshot JSON.
+
+    Only the newest weigh-in can move the snapshot: if it is not older than the current
+    anchor, the snapshot is re-anchored there and its forecast tail recomputed; older
+    back-filled weigh-ins are only stored and counted. Raises LookupError for an unknown
+    user and ValueError if the new weight makes the targets invalid, in which case
+    nothing is stored.
+    """
+    if not weighins:
+        raise ValueError("No weigh-ins given.")
+    store = store or progress_store()
+    rows = {
+        w.date: w.weight_kg if w.weight_kg is not None else w.weight_lb * LB_TO_KG for w in weighins
+    }
+    with store.transaction():
+        profile = store.get_profile(user_id)
+        stored = store.get_snapshot(user_id)
+        if profile is None or stored is None:
+            raise LookupError(f"Unknown user_id: {user_id}")
+        count = store.add_weighins(user_id, rows.items())
+        snapshot = ProgressOutput.model_validate_json(stored)
+        date, weight_kg = max(rows.items())
+        if date < snapshot.as_of:
+            snapshot = snapshot.model_copy(update={"weighins": count})
+        else:
+            snapshot = _snapshot(
+                user_id,
+                profile,
+                as_of=date,
+                weight_kg=weight_kg,
+                weighins=count,
+                head=snapshot.forecast,
+                calibration=store.get_calibration(user_id),
+            )
+        body = to_json(snapshot)
+        store.put_snapshot(user_id, body)
+    return body
+
+
+def get_snapshot(user_id: str, *, store: ProgressStore | None = None) -> bytes:
+    """The materialized snapshot JSON, as stored; nothing is recomputed."""
+    body = (store or progress_store()).get_snapshot(user_id)
+    if body is None:
+        raise LookupError(f"Unknown user_id: {user_id}")
+    return body
+
+
+def list_weighins(user_id: str, *, store: ProgressStore | None = None) -> list[WeighIn]:
+    store = store or progress_store()
+    if store.get_profile(user_id) is None:
+        raise LookupError(f"Unknown user_id: {user_id}")
+    return [WeighIn(date=date, weight_kg=weight_kg) for date, weight_kg in store.weighins(user_id)]
+
+
+def calibrate_store(
+    *, fit_energy_density: bool = False, store: ProgressStore | None = None
+) -> CalibrationSummary:
+    """
+    Calibrate every stored user in one pass and re-project their forecast tails.
+
+    Each user's series is the profile weight at start_date followed by the weigh-ins
+    since. The intake between two points is taken to be the calorie target the app gave
+    at the earlier one (the target follows the latest weigh-in), so the effective TDEE
+    also absorbs how closely the user keeps to it. All series are padded into one
+    (users, points) array and fitted with a single `calibrate` call; users that cannot
+    be calibrated keep their previous calibration, if any.
+    """
+    store = store or progress_store()
+    with store.transaction():
+        profiles = dict(store.profiles())
+        series: dict[str, dict[datetime.date, float]] = {
+            user_id: {p.start_date: normalize_inputs(p.user).weight_kg}
+            for user_id, p in profiles.items()
+        }
+        for user_id, date, weight_kg in store.all_weighins():
+            if user_id in profiles and date >= profiles[user_id].start_date:
+                series[user_id][date] = weight_kg
+
+        ids = list(profiles)
+        width = max((len(points) for points in series.values()), default=1)
+        days = np.full((len(ids), width), np.nan)
+        weights = np.full((len(ids), width), np.nan)
+        for i, user_id in enumerate(ids):
+            start = profiles[user_id].start_date
+            points = sorted(series[user_id].items())
+            days[i, : len(points)] = [(date - start).days for date, _ in points]
+            weights[i, : len(points)] = [weight_kg for _, weight_kg in points]
+
+        # Calorie target at each previous point's weight, as evaluate() computes it.
+        users = [profiles[user_id] for user_id in ids]
+        codes = np.array(
+            [FACTOR_INDEX[p.user.sex, p.user.activity_level, p.user.goal] for p in users],
+            dtype=np.intp,
+        )
+        f = Factors(*FACTOR_COLUMNS[:, codes])
+        age = np.array([p.age_years for p in users], dtype=np.float64)[:, None]
+        height = np.array([p.height_cm for p in users], dtype=np.float64)[:, None]
+        previous = weights[:, :-1]
+        bmr = BMR_KCAL_PER_KG * previous + 6.25 * height - 5.0 * age + f.bmr_offset[:, None]
+        calories = np.zeros_like(weights)
+        calories[:, 1:] = bmr * f.activity_multiplier[:, None] * f.goal_factor[:, None]
+
+        result = calibrate(days, weights, calories, fit_energy_density=fit_energy_density)
+
+        errors: dict[str, str] = {}
+        for i, user_id in enumerate(ids):
+            if result.errors[i] is not None:
+                errors[user_id] = result.errors[i]
+                continue
+            calibration = Calibration(float(result.tdee[i]), float(result.kcal_per_kg[i]))
+            store.put_calibration(user_id, calibration)
+            snapshot = ProgressOutput.model_validate_json(store.get_snapshot(user_id))
+            snapshot = _snapshot(
+                user_id,
+                profiles[user_id],
+                as_of=snapshot.as_of,
+                weight_kg=snapshot.weight_kg,
+                weighins=snapshot.weighins,
+                head=snapshot.forecast,
+                calibration=calibration,
+            )
+            store.put_snapshot(user_id, to_json(snapshot))
+
+    return CalibrationSummary(
+        users=len(ids),
+        calibrated=len(ids) - len(errors),
+        energy_density_fitted=int(result.energy_density_fitted.sum()),
+        errors=errors,
+    )
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Protocol
+
+from app.metrics import RATE_LIMIT_WAITING, RATE_LIMIT_WAITS
+
+
+class BucketStore(Protocol):
+    def take(self, key: str, *, rate: float, capacity: float, now: float) -> float:
+        """Take one token from bucket `key`; return 0.0, or seconds until one is available."""
+        ...
+
+
+class MemoryBucketStore:
+    """Per-process token buckets."""
+
+    def __init__(self) -> None:
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, *, rate: float, capacity: float, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1.0 - tokens) / rate
+
+
+# Same refill/take as MemoryBucketStore, atomically on the server. The wait is returned as
+# a string because Redis truncates Lua numbers to integers.
+_REDIS_TAKE = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """
+    Buckets shared by every worker using the same redis-py compatible client, so the
+    quota holds for the deployment as a whole. Workers' clocks must roughly agree.
+    """
+
+    def __init__(self, client: object, *, prefix: str = "") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key: str, *, rate: float, capacity: float, now: float) -> float:
+        wait = self.client.eval(_REDIS_TAKE, 1, self.prefix + key, rate, capacity, now)
+        return float(wait)
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `capacity` requests at once, refilled at `rate_per_s`.
+
+    `acquire` waits for a token instead of failing, up to a deadline. `waiting` is the
+    number of callers currently queued and `throttled` counts callers that had to wait;
+    both are also exported per `key` as `rate_limit_waiting_requests` and
+    `rate_limit_waits_total`.
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        capacity: float,
+        *,
+        store: BucketStore | None = None,
+        key: str = "default",
+    ) -> None:
+        if rate_per_s <= 0:
+            raise ValueError("rate_per_s must be > 0")
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self.store = store if store is not None else MemoryBucketStore()
+        self.key = key
+        self.waiting = 0
+        self.throttled = 0
+
+    async def acquire(self, deadline: float) -> bool:
+        """
+        Take a token, sleeping while the bucket is empty.
+
+        Returns False without taking a token if one would not be available before
+        `deadline` (a `time.monotonic()` value).
+        """
+        wait = self._take()
+        if wait <= 0:
+            return True
+
+        self.throttled += 1
+        self.waiting += 1
+        RATE_LIMIT_WAITS.inc(self.key)
+        RATE_LIMIT_WAITING.inc(self.key)
+        try:
+            while wait > 0:
+                if time.monotonic() + wait > deadline:
+                    return False
+                await asyncio.sleep(wait)
+                wait = self._take()
+            return True
+        finally:
+            self.waiting -= 1
+            RATE_LIMIT_WAITING.dec(self.key)
+
+    def _take(self) -> float:
+        return self.store.take(
+            self.key, rate=self.rate_per_s, capacity=self.capacity, now=time.time()
+        )
+
+
+def backoff_delay(attempt: int, *, base_s: float, max_s: float) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0.0, min(max_s, base_s * 2**attempt))
+
+
+def default_bucket_store(prefix: str) -> BucketStore:
+    redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if redis_url:
+        import redis  # optional dependency, only needed for a shared quota
+
+        return RedisBucketStore(redis.Redis.from_url(redis_url), prefix=prefix)
+    return MemoryBucketStore()
@@ -0,0 +1,472 @@
+"""
+Fixed-width binary records for bulk `UserInput` / `CalcOutput` exchange.
+
+    cd backend && python -m app.records encode users.ndjson users.kin
+    cd backend && python -m app.records calc users.kin results.kout
+    cd backend && python -m app.records decode results.kout results.ndjson
+
+A file is a 16-byte header (8-byte magic, little-endian u4 forecast points, u4
+reserved) followed by records of one NumPy structured dtype, so readers memory-map it
+and hand fields to the batch engine as array views, and `calculate_records` writes
+results straight into a mapped output file, a chunk at a time.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from enum import Enum
+from pathlib import Path
+from typing import BinaryIO, TextIO
+
+import numpy as np
+from pydantic import ValidationError
+
+from app.batch import BatchColumns, BatchResult, calculate_columns
+from app.bulk import nest_record
+from app.formulas.factors import FACTOR_INDEX
+from app.formulas.strategies import resolve_macro_strategy
+from app.models import (
+    ActivityLevel,
+    CalcOutput,
+    ForecastModel,
+    ForecastPoint,
+    Goal,
+    Macros,
+    MacroStrategy,
+    Sex,
+    UnitSystem,
+    UserInput,
+)
+from app.units import requested_macros
+
+INPUT_MAGIC = b"KETOINP1"
+OUTPUT_MAGIC = b"KETOOUT1"
+HEADER = np.dtype([("magic", "S8"), ("forecast_points", "<u4"), ("reserved", "<u4")])
+
+CHUNK_SIZE = 65_536
+# Forecasts are computed this many bytes of rows at a time and written into the output
+# in place, so their temporaries stay small whatever the forecast width (a whole chunk
+# of 521-point forecasts would be 270 MB per temporary).
+FORECAST_BLOCK_BYTES = 8 << 20
+
+# Enum fields are stored as the index of the value in its enum.
+ENUMS: dict[str, type[Enum]] = {
+    "unit_system": UnitSystem,
+    "sex": Sex,
+    "goal": Goal,
+    "activity_level": ActivityLevel,
+    "forecast_model": ForecastModel,
+    "macro_strategy": MacroStrategy,
+}
+_CODES: dict[str, dict[Enum, int]] = {
+    name: {value: i for i, value in enumerate(enum)} for name, enum in ENUMS.items()
+}
+_MEMBERS: dict[str, list[Enum]] = {name: list(enum) for name, enum in ENUMS.items()}
+
+# Floats are float64 so that NDJSON -> records -> NDJSON is lossless and results stay
+# bit-for-bit equal to /calc. Height and weight are in the record's unit system, NaN
+# when missing; net_carbs_g and protein_g_per_kg are NaN when the row did not send them
+# (see requested_macros). macro_strategy is the resolved strategy (see
+# resolve_macro_strategy).
+# Dietary and meal plan preferences do not affect the calculation and are not stored.
+INPUT_RECORD = np.dtype(
+    [
+        *((name, "u1") for name in ENUMS),
+        ("age_years", "u1"),
+        ("forecast_weeks", "<u2"),
+        ("height", "<f8"),
+        ("weight", "<f8"),
+        ("net_carbs_g", "<f8"),
+        ("protein_g_per_kg", "<f8"),
+    ]
+)
+
+# `calculate_batch` errors by code; 0 is success. Codes are part of the file format:
+# append new messages, never reorder.
+ERRORS = (
+    "For metric input, height_cm and weight_kg are required.",
+    "For imperial input, height_in and weight_lb are required.",
+    "weight_kg must be > 0",
+    "height_cm must be > 0",
+    "BMR formula not supported for minors (<18) yet.",
+    "bmr must be > 0",
+    "tdee must be > 0",
+    "calories_total must be > 0",
+    "Calories too low for keto macro targets.",
+    "weeks must be > 0",
+)
+_ERROR_CODES = {message: i + 1 for i, message in enumerate(ERRORS)}
+UNKNOWN_ERROR = 255
+
+_OUTPUT_VALUES = (
+    "bmi",
+    "bmr",
+    "tdee",
+    "body_fat_percent_estimate",
+    "ffmi",
+    "calories_total",
+    "protein_g",
+    "fat_g",
+    "net_carbs_g",
+)
+
+# FACTOR_INDEX as a (sex, activity_level, goal) code lookup table.
+_FACTOR_TABLE = np.zeros((len(Sex), len(ActivityLevel), len(Goal)), dtype=np.intp)
+for (_sex, _activity, _goal), _index in FACTOR_INDEX.items():
+    _FACTOR_TABLE[
+        _CODES["sex"][_sex], _CODES["activity_level"][_activity], _CODES["goal"][_goal]
+    ] = _index
+
+
+def output_record(forecast_points: int) -> np.dtype:
+    """
+    Record dtype of a results file whose forecasts hold `forecast_points` weeks.
+
+    `forecast` holds weeks 0..forecast_weeks of the row and NaN after; every value of a
+    failed row (nonzero `error`) is NaN. The width is shared by every row of the file,
+    so each record takes 8 bytes per point of the longest forecast: one 520-week row
+    makes every record about 4.2 KB.
+    """
+    return np.dtype(
+        [
+            ("error", "u1"),
+            *((name, "<f8") for name in _OUTPUT_VALUES),
+            ("forecast_weeks", "<u2"),
+            ("forecast", "<f8", (forecast_points,)),
+        ]
+    )
+
+
+def encode_users(users: Iterable[UserInput]) -> np.ndarray:
+    """`INPUT_RECORD` array of `users`."""
+    rows = []
+    for u in users:
+        imperial = u.unit_system == UnitSystem.imperial
+        height = u.height_in if imperial else u.height_cm
+        weight = u.weight_lb if imperial else u.weight_kg
+        net_carbs_g, protein_g_per_kg = requested_macros(u)
+        rows.append(
+            (
+                _CODES["unit_system"][u.unit_system],
+                _CODES["sex"][u.sex],
+                _CODES["goal"][u.goal],
+                _CODES["activity_level"][u.activity_level],
+                _CODES["forecast_model"][u.forecast_model],
+                _CODES["macro_strategy"][resolve_macro_strategy(u)],
+                u.age_years,
+                u.forecast_weeks,
+                np.nan if height is None else height,
+                np.nan if weight is None else weight,
+                net_carbs_g,
+                protein_g_per_kg,
+            )
+        )
+    return np.array(rows, dtype=INPUT_RECORD)
+
+
+def decode_users(records: np.ndarray) -> list[UserInput]:
+    """The `UserInput`s of `INPUT_RECORD` rows (validated, like parsed JSON)."""
+    users = []
+    for row in records.tolist():
+        values = dict(zip(INPUT_RECORD.names, row, strict=True))
+        imperial = values["unit_system"] == _CODES["unit_system"][UnitSystem.imperial]
+        height, weight = values.pop("height"), values.pop("weight")
+        for name, members in _MEMBERS.items():
+            values[name] = members[values[name]]
+        values["height_in" if imperial else "height_cm"] = None if height != height else height
+        values["weight_lb" if imperial else "weight_kg"] = None if weight != weight else weight
+        for name in ("net_carbs_g", "protein_g_per_kg"):
+            if values[name] != values[name]:
+                del values[name]
+        users.append(UserInput(**values))
+    return users
+
+
+def input_columns(records: np.ndarray) -> BatchColumns:
+    """`BatchColumns` over `INPUT_RECORD` rows; the float columns are views."""
+    return BatchColumns(
+        imperial=records["unit_system"] == _CODES["unit_system"][UnitSystem.imperial],
+        height=records["height"],
+        weight=records["weight"],
+        age_years=records["age_years"],
+        factor_index=_FACTOR_TABLE[records["sex"], records["activity_level"], records["goal"]],
+        macro_strategy=records["macro_strategy"],
+        net_carbs_g=records["net_carbs_g"],
+        protein_g_per_kg=records["protein_g_per_kg"],
+        forecast_weeks=records["forecast_weeks"],
+        adaptive=records["forecast_model"] == _CODES["forecast_model"][ForecastModel.adaptive],
+    )
+
+
+def _write_header(f: BinaryIO, magic: bytes, forecast_points: int = 0) -> None:
+    f.write(np.array((magic, forecast_points, 0), dtype=HEADER).tobytes())
+
+
+def _open(path: str | Path, magic: bytes, mode: str = "r") -> np.ndarray:
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.itemsize)
+    if len(raw) < HEADER.itemsize:
+        raise ValueError(f"{path}: not a records file")
+    header = np.frombuffer(raw, dtype=HEADER)[0]
+    if header["magic"] != magic:
+        raise ValueError(f"{path}: expected {magic.decode()} records")
+    dtype = INPUT_RECORD if magic == INPUT_MAGIC else output_record(int(header["forecast_points"]))
+    rows, rest = divmod(os.path.getsize(path) - HEADER.itemsize, dtype.itemsize)
+    if rest:
+        raise ValueError(f"{path}: truncated record")
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, offset=HEADER.itemsize, shape=(rows,))
+
+
+def write_inputs(
+    path: str | Path, users: Iterable[UserInput], *, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Write `users` as an inputs file, `chunk_size` at a time; returns the row count."""
+    rows = 0
+    with open(path, "wb") as f:
+        _write_header(f, INPUT_MAGIC)
+        chunk: list[UserInput] = []
+        for user in users:
+            chunk.append(user)
+            if len(chunk) >= chunk_size:
+                f.write(encode_users(chunk).tobytes())
+                rows += len(chunk)
+                chunk = []
+        f.write(encode_users(chunk).tobytes())
+        rows += len(chunk)
+    return rows
+
+
+def open_inputs(path: str | Path) -> np.ndarray:
+    """Read-only memory map of an inputs file. Raises ValueError for a bad file."""
+    records = _open(path, INPUT_MAGIC)
+    for name, enum in ENUMS.items():
+        if len(records) and records[name].max() >= len(enum):
+            raise ValueError(f"{path}: invalid {name} code")
+    return records
+
+
+def create_outputs(path: str | Path, rows: int, forecast_points: int) -> np.ndarray:
+    """Writable memory map of a new results file of `rows` zeroed records."""
+    size = HEADER.itemsize + rows * output_record(forecast_points).itemsize
+    with open(path, "wb") as f:
+        _write_header(f, OUTPUT_MAGIC, forecast_points)
+        f.truncate(size)
+    return _open(path, OUTPUT_MAGIC, mode="r+")
+
+
+def open_outputs(path: str | Path) -> np.ndarray:
+    """Read-only memory map of a results file. Raises ValueError for a bad file."""
+    return _open(path, OUTPUT_MAGIC)
+
+
+def fill_outputs(out: np.ndarray, result: BatchResult) -> None:
+    """Write `result` into the `output_record` rows `out`, one row per result row."""
+    failed = np.array([e is not None for e in result.errors], dtype=bool)
+    out["error"] = [0 if e is None else _ERROR_CODES.get(e, UNKNOWN_ERROR) for e in result.errors]
+    for name in _OUTPUT_VALUES:
+        out[name] = np.where(failed, np.nan, getattr(result, name))
+    out["forecast_weeks"] = result.forecast_weeks
+
+    points = out.dtype["forecast"].shape[0]
+    week = np.arange(points, dtype=np.float64)
+    # retention**week with Python's pow, once per distinct retention (one per factor
+    # combination): NumPy's vectorized pow can differ from it in the last bit.
+    retention, which = np.unique(result.retention, return_inverse=True)
+    powers = np.array([[r**k for k in range(points)] for r in retention.tolist()])
+    powers = powers.reshape(-1, points)
+    forecast = out["forecast"]
+    block = max(1, FORECAST_BLOCK_BYTES // (8 * points))
+    for first in range(0, len(out), block):
+        rows = slice(first, first + block)
+        forecast[rows] = _forecast_block(result, rows, week, powers[which[rows]], failed[rows])
+
+
+def _forecast_block(
+    result: BatchResult, rows: slice, week: np.ndarray, powers: np.ndarray, failed: np.ndarray
+) -> np.ndarray:
+    """Forecasts of `rows`: the closed forms of LinearForecast / AdaptiveForecast."""
+    start = result.weight_kg[rows, None]
+    with np.errstate(invalid="ignore", over="ignore"):
+        linear = start + week * result.delta_kg_per_week[rows, None]
+        # LinearForecast is 0 from the first week it reaches 0 kg on.
+        linear[np.logical_or.accumulate(linear <= 0, axis=1)] = 0.0
+        eq = result.equilibrium_weight_kg[rows, None]
+        adaptive = np.maximum(eq + (start - eq) * powers, 0.0)
+    forecast = np.where(result.adaptive[rows, None], adaptive, linear)
+    forecast[(week > result.forecast_weeks[rows, None]) | failed[:, None]] = np.nan
+    return forecast
+
+
+def calculate_records(
+    inputs: np.ndarray, path: str | Path, *, chunk_size: int = CHUNK_SIZE
+) -> np.ndarray:
+    """
+    Calculate every `INPUT_RECORD` row into a new results file at `path`.
+
+    Each chunk of input rows goes to `calculate_columns` as field views and its results
+    are written into the mapped output, so memory stays at one chunk of results. The
+    file's forecast width is the largest `forecast_weeks` + 1 of the inputs (see
+    `output_record`); split inputs by horizon to keep short-forecast files small.
+    Returns the output memory map.
+    """
+    points = int(inputs["forecast_weeks"].max(initial=0)) + 1
+    out = create_outputs(path, len(inputs), points)
+    for start in range(0, len(inputs), chunk_size):
+        rows = slice(start, start + chunk_size)
+        fill_outputs(out[rows], calculate_columns(input_columns(inputs[rows])))
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+def decode_output(record: np.void) -> CalcOutput | str:
+    """The `CalcOutput` of one `output_record` row, or its error message."""
+    if record["error"]:
+        code = int(record["error"])
+        return ERRORS[code - 1] if code <= len(ERRORS) else "Calculation failed."
+    weeks = int(record["forecast_weeks"])
+    return CalcOutput.model_construct(
+        bmi=float(record["bmi"]),
+        bmr=float(record["bmr"]),
+        tdee=float(record["tdee"]),
+        body_fat_percent_estimate=float(record["body_fat_percent_estimate"]),
+        ffmi=float(record["ffmi"]),
+        macros=Macros.model_construct(
+            calories_total=float(record["calories_total"]),
+            protein_g=float(record["protein_g"]),
+            fat_g=float(record["fat_g"]),
+            net_carbs_g=float(record["net_carbs_g"]),
+        ),
+        forecast=[
+            ForecastPoint.model_construct(week=week, weight_kg=kg)
+            for week, kg in enumerate(record["forecast"][: weeks + 1].tolist())
+        ],
+    )
+
+
+def output_lines(records: np.ndarray) -> Iterator[str]:
+    """NDJSON lines of results, as app.bulk writes them (row numbers from 1)."""
+    for i, record in enumerate(records, start=1):
+        out = decode_output(record)
+        if isinstance(out, str):
+            yield json.dumps({"row": i, "error": out}) + "\n"
+        else:
+            yield out.model_dump_json() + "\n"
+
+
+# Columns of inputs decoded to CSV; empty cells are unset.
+CSV_FIELDS = (
+    "unit_system",
+    "sex",
+    "age_years",
+    "goal",
+    "height_cm",
+    "weight_kg",
+    "height_in",
+    "weight_lb",
+    "activity_level",
+    "net_carbs_g",
+    "protein_g_per_kg",
+    "macro_strategy",
+    "forecast_weeks",
+    "forecast_model",
+)
+
+
+def read_users(lines: Iterable[str], fmt: str = "ndjson") -> Iterator[UserInput]:
+    """Parse NDJSON or CSV `UserInput` rows. Raises ValueError naming the first bad row."""
+    if fmt == "csv":
+        records: Iterable[str | dict[str, object]] = (nest_record(r) for r in csv.DictReader(lines))
+    else:
+        records = (line for line in lines if line.strip())
+    for row, record in enumerate(records, start=1):
+        try:
+            if isinstance(record, str):
+                yield UserInput.model_validate_json(record)
+            else:
+                yield UserInput.model_validate(record)
+        except ValidationError as e:
+            raise ValueError(f"row {row}: {e}") from None
+
+
+def write_users(users: Iterable[UserInput], f: TextIO, fmt: str = "ndjson") -> None:
+    """
+    Write `users` as NDJSON, or CSV with `CSV_FIELDS` columns, to text file `f`. Only
+    fields the user was given are written, since sending a macro field changes results.
+    """
+    if fmt != "csv":
+        for user in users:
+            f.write(user.model_dump_json(exclude_unset=True) + "\n")
+        return
+    writer = csv.DictWriter(f, CSV_FIELDS, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for user in users:
+        writer.writerow(user.model_dump(mode="json", exclude_unset=True, exclude_none=True))
+
+
+def _format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def _decode(path: str, dst: TextIO, fmt: str) -> None:
+    with open(path, "rb") as f:
+        magic = f.read(len(OUTPUT_MAGIC))
+    if magic == OUTPUT_MAGIC:
+        if fmt == "csv":
+            raise ValueError("results files decode to NDJSON only")
+        dst.writelines(output_lines(open_outputs(path)))
+        return
+    records = open_inputs(path)
+    chunks = (
+        decode_users(records[start : start + CHUNK_SIZE])
+        for start in range(0, len(records), CHUNK_SIZE)
+    )
+    write_users((user for chunk in chunks for user in chunk), dst, fmt)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.records",
+        description="Convert between NDJSON/CSV rows and binary records, and calculate records.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    encode = commands.add_parser("encode", help="NDJSON or CSV UserInput rows to an inputs file")
+    calc = commands.add_parser("calc", help="inputs file to a results file")
+    decode = commands.add_parser(
+        "decode", help="inputs file to NDJSON or CSV, or results file to NDJSON"
+    )
+    for command in (encode, calc, decode):
+        command.add_argument("input", help="input file (encode: - for stdin)")
+        command.add_argument("output", help="output file (decode: - for stdout)")
+    calc.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "encode":
+            src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+            try:
+                write_inputs(args.output, read_users(src, _format(args.input)))
+            finally:
+                if src is not sys.stdin:
+                    src.close()
+        elif args.command == "calc":
+            calculate_records(open_inputs(args.input), args.output, chunk_size=args.chunk_size)
+        else:
+            dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+            try:
+                _decode(args.input, dst, _format(args.output))
+            finally:
+                if dst is not sys.stdout:
+                    dst.close()
+    except ValueError as e:
+        parser.error(str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,62 @@
+"""
+Production server: uvicorn with several worker processes sharing one listening socket.
+
+    cd backend && python -m app.serve [--workers 4] [--host 0.0.0.0] [--port 8080]
+
+Each worker has its own event loop and GIL, so CPU-bound /calc traffic scales with the
+worker count. Within a worker, calc and meal plan routes use separate thread pools, and
+meal plan requests can be capped (app/pools.py). On SIGTERM uvicorn stops accepting
+connections and gives running requests, in-flight Gemini calls included, up to
+SHUTDOWN_GRACE_S to finish before the app shuts down and closes its Gemini client.
+"""
+
+import argparse
+import os
+
+import uvicorn
+
+from app.pools import SHUTDOWN_GRACE_S
+
+APP = "app.main:app"
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def server_options(argv: list[str] | None = None) -> dict[str, object]:
+    """Keyword arguments for `uvicorn.run`, from the command line and environment."""
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "0")),
+        help="worker processes (default: one per available CPU)",
+    )
+    parser.add_argument("--grace", type=float, default=SHUTDOWN_GRACE_S, help="drain seconds")
+    parser.add_argument(
+        "--no-access-log", action="store_true", default=os.getenv("ACCESS_LOG", "1") == "0"
+    )
+    args = parser.parse_args(argv)
+
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers or available_cpus(),
+        "timeout_graceful_shutdown": args.grace,
+        "timeout_keep_alive": int(os.getenv("KEEPALIVE_TIMEOUT_S", "5")),
+        "access_log": not args.no_access_log,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    uvicorn.run(APP, **server_options(argv))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,74 @@
+import asyncio
+import hashlib
+import json
 import os
+import time
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.cache import DiskBackend, LRUBackend, ResultCache, TieredBackend
+from app.foods import food_index
+from app.metrics import (
+    MEALPLAN_DEADLINE_EXCEEDED,
+    MEALPLAN_RETRIES,
+    MEALPLAN_SLOT_WAITING,
+    span,
+    timed,
+)
+from app.models import CalcOutput, MealPlanEngine, UserInput
+from app.models_mealplan import DayPlan, Meal, MealPlanResponse
+from app.ratelimit import TokenBucket, backoff_delay, default_bucket_store
+from app.services.local_mealplan import generate_local_meal_plan
+from app.services.mealplan_rules import (
+    CALORIE_TOLERANCE,
+    MAX_ITEMS_PER_MEAL,
+    MAX_NET_CARBS_G,
+    meal_names,
+)
+from app.services.mealplan_verify import MealPlanVerifier, verify_meal_plan
+
+# google.genai is imported where a Gemini request is made, so local-engine plans never load it.
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import errors
+    from google.genai.types import GenerateContentConfig
+
+MODEL = "gemini-2.5-flash"
+
+MEALPLAN_MAX_CONCURRENCY = int(os.getenv("MEALPLAN_MAX_CONCURRENCY", "8"))
+MEALPLAN_TIMEOUT_S = float(os.getenv("MEALPLAN_TIMEOUT_S", "60"))
+MEALPLAN_SHARD_PARALLELISM = int(os.getenv("MEALPLAN_SHARD_PARALLELISM", "4"))
+# Most recent dishes of earlier waves a chunk prompt asks the model not to repeat.
+MAX_AVOIDED_DISHES = 20
+
+# Client-side quota (0 disables it), retries of 429/5xx responses, and how long a request
+# may spend queued for quota, a concurrency slot or a retry before failing with 429.
+MEALPLAN_RPM = float(os.getenv("MEALPLAN_RPM", "0"))
+MEALPLAN_BURST = float(os.getenv("MEALPLAN_BURST", "1"))
+MEALPLAN_MAX_RETRIES = int(os.getenv("MEALPLAN_MAX_RETRIES", "3"))
+MEALPLAN_RETRY_BASE_S = float(os.getenv("MEALPLAN_RETRY_BASE_S", "1"))
+MEALPLAN_RETRY_MAX_S = float(os.getenv("MEALPLAN_RETRY_MAX_S", "20"))
+MEALPLAN_QUEUE_DEADLINE_S = float(os.getenv("MEALPLAN_QUEUE_DEADLINE_S", "30"))
+# Serve a plan from the local engine instead of a 429 when Gemini is rate-limited.
+MEALPLAN_LOCAL_FALLBACK = os.getenv("MEALPLAN_LOCAL_FALLBACK", "1") != "0"
+# Recompute LLM plan nutrition from the food table and rescale days that miss the targets.
+MEALPLAN_VERIFY = os.getenv("MEALPLAN_VERIFY", "1") != "0"
 
-from google import genai
-from google.genai import errors
-from google.genai.types import GenerateContentConfig
+_client: "genai.Client | None" = None
+_limiter: asyncio.Semaphore | None = None
+_bucket: TokenBucket | None = None
 
-from app.models import CalcOutput, UserInput
-from app.models_mealplan import MealPlanResponse
+
+@dataclass
+class LLMStats:
+    queued: int = 0
+    retries: int = 0
+    deadline_exceeded: int = 0
+
+
+_stats = LLMStats()
 
 SCHEMA_EXAMPLE = (
     '{"generated_mealplan":[{"meals":[{"meal_name":"lunch","items":[{"name":"chicken breast",'
@@ -15,21 +78,19 @@ SCHEMA_EXAMPLE = (
 )
 
 
-def _mealplan_pref_lines(user: UserInput) -> list[str]:
+def _mealplan_pref_lines(user: UserInput, days: range | None = None) -> list[str]:
     mp = user.mealplan
-    lines: list[str] = [
-        f"- Number of days: {mp.days}",
+    lines: list[str] = [f"- Number of days: {mp.days if days is None else len(days)}"]
+    if days is not None and len(days) != mp.days:
+        lines.append(f"- These are days {days[0] + 1}-{days[-1] + 1} of a {mp.days}-day plan.")
+    lines += [
         f"- Meals per day: {mp.meals_per_day} ({'OMAD' if mp.meals_per_day == 1 else 'standard'})",
         "- Each day MUST contain exactly `meals_per_day` meals.",
         "- Generate exactly `days` days in the meal plan.",
         "- Use these meal_name values:",
     ]
 
-    if mp.meals_per_day == 1:
-        lines.append('  - "meal"')
-    else:
-        base = ['"breakfast"', '"lunch"', '"dinner"', '"snack"', '"snack2"', '"snack3"']
-        lines.append("  - " + ", ".join(base[: mp.meals_per_day]))
+    lines.append("  - " + ", ".join(f'"{name}"' for name in meal_names(mp.meals_per_day)))
 
     return lines
 
@@ -55,9 +116,25 @@ def _dietary_lines(user: UserInput) -> list[str]:
     return rules
 
 
-def build_prompt(user: UserInput, calc: CalcOutput) -> str:
+@timed("mealplan.prompt")
+def build_prompt(
+    user: UserInput, calc: CalcOutput, *, days: range | None = None, avoid: Sequence[str] = ()
+) -> str:
+    """
+    Prompt for the whole plan, or with `days` (0-based day indices) for one chunk of it.
+
+    `avoid` lists dishes already used on other days (see `_dish`) so chunks stay different.
+    """
     dietary_rules = _dietary_lines(user)
-    mealplan_rules = _mealplan_pref_lines(user)
+    mealplan_rules = _mealplan_pref_lines(user, days)
+    avoid_rules = (
+        [
+            f"- Do not repeat these dishes (meal with its main protein) from other days: "
+            f"{', '.join(avoid)}."
+        ]
+        if avoid
+        else []
+    )
 
     return "\n".join(
         [
@@ -77,13 +154,15 @@ def build_prompt(user: UserInput, calc: CalcOutput) -> str:
             "- Ensure all strings are double-quoted and properly escaped.",
             "- Output compact JSON on a single line (no pretty formatting).",
             "- Use common foods; include grams for each item.",
-            "- Limit each meal to at most 3 items.",
+            f"- Limit each meal to at most {MAX_ITEMS_PER_MEAL} items.",
             "- Avoid alcohol.",
             "- Keep it simple.",
             "- Each day should be different; avoid repeating the same meals/items.",
-            "- Net carbs per day MUST be <= 20g.",
+            *avoid_rules,
+            f"- Net carbs per day MUST be <= {MAX_NET_CARBS_G:.0f}g.",
             "- Protein per day MUST be >= the target.",
-            "- Calories per day can be up to 5% off the target (within ±5% of target).",
+            f"- Calories per day can be up to {CALORIE_TOLERANCE:.0%} off the target "
+            f"(within ±{CALORIE_TOLERANCE:.0%} of target).",
             "- Meals should be realistic: combine a protein + vegetable + fat/sauce.",
             "- Snacks should be snack-like (e.g., olives, nuts, dark chocolate).",
             "- If user is imperial, you can still output grams (preferred).",
@@ -107,65 +186,553 @@ def _check_truncation(resp: object) -> bool:
     return False
 
 
-def generate_meal_plan(user: UserInput, calc: CalcOutput) -> MealPlanResponse:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY is not set")
+def _mealplan_cache() -> ResultCache:
+    """
+    Validated plans keyed by prompt hash; identical prompts within the TTL are served
+    without calling the LLM. Set MEALPLAN_CACHE_DIR (e.g. /tmp/mealplan-cache on Lambda)
+    to add an on-disk tier that survives cold starts.
+    """
+    ttl_s = float(os.getenv("MEALPLAN_CACHE_TTL_S", "3600"))
+    backend = LRUBackend(int(os.getenv("MEALPLAN_CACHE_SIZE", "256")), ttl_s=ttl_s)
+    cache_dir = os.getenv("MEALPLAN_CACHE_DIR")
+    if cache_dir:
+        backend = TieredBackend(backend, DiskBackend(cache_dir, ttl_s=ttl_s))
+    return ResultCache(backend)
 
-    client = genai.Client()
-    prompt = build_prompt(user, calc)
+
+mealplan_cache = _mealplan_cache()
+
+
+def mealplan_cache_key(prompt: str) -> str:
+    return hashlib.sha256(f"{MODEL}\n{prompt}".encode()).hexdigest()
+
+
+def init_client(client: object | None = None) -> None:
+    """
+    Create the shared client at app startup (or install a fake one in tests).
+
+    Without GEMINI_API_KEY no client is created and /mealplan reports the missing key.
+    """
+    global _client, _limiter, _bucket
+    if client is None and os.getenv("GEMINI_API_KEY"):
+        from google import genai
+
+        client = genai.Client()
+    _client = client
+    _limiter = asyncio.Semaphore(MEALPLAN_MAX_CONCURRENCY)
+    _bucket = _make_bucket()
+
+
+async def close_client() -> None:
+    global _client
+    client, _client = _client, None
+    aio = getattr(client, "aio", None)
+    if aio is not None and hasattr(aio, "aclose"):
+        await aio.aclose()
+
+
+def _get_client() -> object:
+    if _client is None:
+        if not os.getenv("GEMINI_API_KEY"):
+            raise ValueError("GEMINI_API_KEY is not set")
+        init_client()
+    return _client
+
+
+async def generate_meal_plan(user: UserInput, calc: CalcOutput) -> MealPlanResponse:
+    """
+    Meal plan from the engine selected in `user.mealplan`.
+
+    LLM plans are checked and repaired by `verify_meal_plan` unless MEALPLAN_VERIFY=0
+    (the cache keeps them as generated). LLM requests that end rate-limited fall back to
+    the local engine unless MEALPLAN_LOCAL_FALLBACK=0. Raises ValueError if the LLM is selected and
+    GEMINI_API_KEY is not set, RuntimeError if the LLM request fails.
+    """
+    if user.mealplan.engine == MealPlanEngine.local:
+        with span("mealplan.local"):
+            return generate_local_meal_plan(user, calc)
+
+    client = _get_client()
+    try:
+        chunk = user.mealplan.days_per_chunk
+        if chunk is not None and chunk < user.mealplan.days:
+            parts: list[MealPlanResponse] = []
+            async for wave in _shard_waves(client, user, calc, chunk):
+                parts += wave
+            return _verified(merge_meal_plans(parts), calc)
+
+        return _verified(await _cached_meal_plan(client, build_prompt(user, calc)), calc)
+    except RuntimeError as e:
+        if MEALPLAN_LOCAL_FALLBACK and _is_rate_limited(str(e)):
+            return _local_fallback(user, calc)
+        raise
+
+
+def _verified(plan: MealPlanResponse, calc: CalcOutput) -> MealPlanResponse:
+    if not MEALPLAN_VERIFY:
+        return plan
+    with span("mealplan.verify"):
+        return verify_meal_plan(plan, calc.macros)
+
+
+def _verifier(calc: CalcOutput) -> MealPlanVerifier | None:
+    return MealPlanVerifier(calc.macros) if MEALPLAN_VERIFY else None
+
+
+def _is_rate_limited(msg: str) -> bool:
+    return "RESOURCE_EXHAUSTED" in msg or "RATE_LIMIT" in msg
+
+
+def _local_fallback(user: UserInput, calc: CalcOutput) -> MealPlanResponse:
+    with span("mealplan.local"):
+        plan = generate_local_meal_plan(user, calc)
+    plan.assumptions.insert(0, "The AI planner was rate-limited, so this plan was made locally.")
+    return plan
+
+
+async def _cached_meal_plan(client: object, prompt: str) -> MealPlanResponse:
+    async def request() -> bytes:
+        plan = await _request_meal_plan(client, prompt)
+        return plan.model_dump_json().encode()
+
+    data = await mealplan_cache.aget_or_compute(mealplan_cache_key(prompt), request)
+    return MealPlanResponse.model_validate_json(data)
+
+
+async def _shard_waves(
+    client: object, user: UserInput, calc: CalcOutput, days_per_chunk: int
+) -> AsyncIterator[list[MealPlanResponse]]:
+    """
+    Generate the plan `days_per_chunk` days per LLM call, yielding one list per wave.
+
+    Up to MEALPLAN_SHARD_PARALLELISM chunks run concurrently in a wave, and each wave
+    starts once the previous one is done: the last MAX_AVOIDED_DISHES dishes of earlier
+    waves are passed to its prompts to keep days different. Latency is therefore the sum
+    of the slowest chunk of each wave, one wave per days_per_chunk *
+    MEALPLAN_SHARD_PARALLELISM days (7 one-day chunks at parallelism 4 take two round
+    trips). Each chunk has its own prompt and therefore its own cache entry.
+    """
+    total = user.mealplan.days
+    shards = [range(s, min(s + days_per_chunk, total)) for s in range(0, total, days_per_chunk)]
+    used: dict[str, str] = {}
+
+    for start in range(0, len(shards), MEALPLAN_SHARD_PARALLELISM):
+        avoid = list(used.values())[-MAX_AVOIDED_DISHES:]
+        wave = await asyncio.gather(
+            *(
+                _cached_meal_plan(client, build_prompt(user, calc, days=days, avoid=avoid))
+                for days in shards[start : start + MEALPLAN_SHARD_PARALLELISM]
+            )
+        )
+        for plan in wave:
+            for day in plan.generated_mealplan:
+                for meal in day.meals:
+                    dish = _dish(meal)
+                    if dish is not None:
+                        used.pop(dish.casefold(), None)
+                        used[dish.casefold()] = dish
+        yield wave
+
+
+def _dish(meal: Meal) -> str | None:
+    """
+    "lunch with salmon": the meal and its main protein, the first item that is a protein
+    food in the food table, or else the first item not in it at all (a named dish).
+    Fats, vegetables and other staples are never the main protein; a meal of only those
+    (e.g. a snack of olives) has no dish.
+    """
+    index = food_index()
+    unknown = None
+    for item in meal.items:
+        row = index.resolve(item.name)
+        if row is not None and index.table.roles[row] == "protein":
+            return f"{meal.meal_name.strip()} with {index.table.names[row]}"
+        if row is None and unknown is None:
+            unknown = item.name.strip()
+    return None if unknown is None else f"{meal.meal_name.strip()} with {unknown}"
+
+
+def _unique(values: list[str]) -> list[str]:
+    """Drop case/whitespace-insensitive duplicates, keeping the first spelling."""
+    seen: dict[str, str] = {}
+    for v in values:
+        seen.setdefault(v.strip().casefold(), v.strip())
+    return list(seen.values())
+
+
+def merge_meal_plans(parts: list[MealPlanResponse]) -> MealPlanResponse:
+    """Concatenate chunked plans in order with de-duplicated shopping list and assumptions."""
+    return MealPlanResponse(
+        generated_mealplan=[day for part in parts for day in part.generated_mealplan],
+        shopping_list=_unique([s for part in parts for s in part.shopping_list]),
+        assumptions=_unique([a for part in parts for a in part.assumptions]),
+    )
+
+
+def _get_limiter() -> asyncio.Semaphore:
+    global _limiter
+    if _limiter is None:
+        _limiter = asyncio.Semaphore(MEALPLAN_MAX_CONCURRENCY)
+    return _limiter
+
+
+def _make_bucket() -> TokenBucket | None:
+    if MEALPLAN_RPM <= 0:
+        return None
+    store = default_bucket_store(prefix="ratelimit:")
+    return TokenBucket(MEALPLAN_RPM / 60.0, MEALPLAN_BURST, store=store, key=MODEL)
+
+
+def mealplan_stats() -> dict[str, int]:
+    """
+    Queue depth (waiting for quota or a concurrency slot) and retry counters, as also
+    exported on /metrics.
+    """
+    return {
+        "queue_depth": _stats.queued + (_bucket.waiting if _bucket is not None else 0),
+        "throttled": _bucket.throttled if _bucket is not None else 0,
+        "retries": _stats.retries,
+        "deadline_exceeded": _stats.deadline_exceeded,
+    }
+
+
+def _queue_deadline_error() -> RuntimeError:
+    _stats.deadline_exceeded += 1
+    MEALPLAN_DEADLINE_EXCEEDED.inc()
+    return RuntimeError(
+        f"RATE_LIMIT: request queued longer than {MEALPLAN_QUEUE_DEADLINE_S:g}s for Gemini quota"
+    )
+
+
+@asynccontextmanager
+async def _slot(deadline: float) -> AsyncIterator[None]:
+    """Hold a quota token and a concurrency slot, queueing until `deadline` at most."""
+    if _bucket is not None and not await _bucket.acquire(deadline):
+        raise _queue_deadline_error()
+
+    limiter = _get_limiter()
+    _stats.queued += 1
+    MEALPLAN_SLOT_WAITING.inc()
+    try:
+        await asyncio.wait_for(limiter.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+    except TimeoutError:
+        raise _queue_deadline_error() from None
+    finally:
+        _stats.queued -= 1
+        MEALPLAN_SLOT_WAITING.dec()
+    try:
+        yield
+    finally:
+        limiter.release()
+
+
+def _api_status(e: "errors.APIError") -> int | None:
+    return getattr(e, "code", None) or getattr(e, "status_code", None)
+
+
+def _retryable(e: "errors.APIError") -> bool:
+    status = _api_status(e)
+    return status is not None and (status == 429 or status >= 500)
+
+
+async def _generate_with_retries(client: object, prompt: str, max_tokens: int) -> object:
+    """
+    `generate_content`, retrying 429 and 5xx responses with jittered exponential backoff.
+
+    Retries stop once the backoff would run past MEALPLAN_QUEUE_DEADLINE_S.
+    """
+    from google.genai import errors
+
+    deadline = time.monotonic() + MEALPLAN_QUEUE_DEADLINE_S
+    attempt = 0
+    while True:
+        try:
+            async with _slot(deadline):
+                with span("mealplan.llm"):
+                    return await asyncio.wait_for(
+                        client.aio.models.generate_content(
+                            model=MODEL, contents=prompt, config=_generate_config(max_tokens)
+                        ),
+                        timeout=MEALPLAN_TIMEOUT_S,
+                    )
+        except errors.APIError as e:
+            delay = backoff_delay(attempt, base_s=MEALPLAN_RETRY_BASE_S, max_s=MEALPLAN_RETRY_MAX_S)
+            if (
+                not _retryable(e)
+                or attempt >= MEALPLAN_MAX_RETRIES
+                or time.monotonic() + delay > deadline
+            ):
+                raise
+        attempt += 1
+        _stats.retries += 1
+        MEALPLAN_RETRIES.inc()
+        await asyncio.sleep(delay)
+
+
+def _generate_config(max_tokens: int) -> "GenerateContentConfig":
+    from google.genai.types import GenerateContentConfig
+
+    return GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=MealPlanResponse,
+        max_output_tokens=max_tokens,
+    )
+
+
+async def _request_meal_plan(client: object, prompt: str) -> MealPlanResponse:
+    """
+    One LLM request, bounded by the client-side quota, MEALPLAN_MAX_CONCURRENCY and
+    MEALPLAN_TIMEOUT_S, with 429/5xx responses retried.
+    """
+    from google.genai import errors
 
     # Use maximum allowed tokens for Gemini 2.5 Flash (8192)
     # This should be sufficient for up to 7 days with 6 meals per day
     max_tokens = 8192
 
     try:
-        resp = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=GenerateContentConfig(
-                response_mime_type="application/json",
-                response_schema=MealPlanResponse,
-                max_output_tokens=max_tokens,
-            ),
-        )
+        resp = await _generate_with_retries(client, prompt, max_tokens)
 
         # Check if response was truncated
         if _check_truncation(resp):
             raise RuntimeError(
                 f"Response was truncated (max_output_tokens={max_tokens} may be too low). "
-                "Try reducing the number of days or meals per day."
+                "Try reducing the number of days or meals per day, or set days_per_chunk."
             )
 
-        parsed = _get_parsed_response(resp)
-        if parsed is not None:
-            if isinstance(parsed, MealPlanResponse):
-                return parsed
-            return MealPlanResponse.model_validate(parsed)
-        text = _response_text(resp)
-        json_text = _extract_json(text)
+        with span("mealplan.parse"):
+            parsed = _get_parsed_response(resp)
+            if parsed is not None:
+                if isinstance(parsed, MealPlanResponse):
+                    return parsed
+                return MealPlanResponse.model_validate(parsed)
+            text = _response_text(resp)
+            json_text = _extract_json(text)
+
+            # Check if JSON appears truncated (doesn't end properly)
+            if json_text and not json_text.rstrip().endswith("}"):
+                raise RuntimeError(
+                    f"Response appears to be truncated. JSON doesn't end properly. "
+                    f"Preview (last 200 chars): {text[-200:] if len(text) > 200 else text}"
+                )
+
+            try:
+                return MealPlanResponse.model_validate_json(json_text)
+            except Exception as e:
+                preview = text[:500] if text else ""
+                raise RuntimeError(
+                    f"LLM returned invalid JSON. "
+                    f"This may indicate truncation (max_output_tokens={max_tokens}). "
+                    f"Preview: {preview}"
+                ) from e
+
+    except TimeoutError as e:
+        raise RuntimeError(f"Gemini request timed out after {MEALPLAN_TIMEOUT_S:g}s") from e
+    except errors.APIError as e:
+        if _api_status(e) == 429:
+            raise RuntimeError(f"RATE_LIMIT:{e}") from e
+        raise RuntimeError(f"Gemini API error: {e}") from e
+
+
+class MealPlanStreamParser:
+    """
+    Incremental parser for streamed `MealPlanResponse` JSON.
+
+    `feed` scans only the newly received text, tracking string/escape state and nesting
+    depth, and returns every `generated_mealplan` day whose closing brace has arrived,
+    validated as a `DayPlan`. `finish` validates the complete document, which is when
+    `shopping_list` and `assumptions` (emitted after the days) become available.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._in_days = False
+        self._day_start = 0
+
+    def feed(self, chunk: str) -> list[DayPlan]:
+        self.text += chunk
+        text = self.text
+        days: list[DayPlan] = []
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1 : i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == "{" or c == "[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._last_key == "generated_mealplan":
+                    self._in_days = True
+                elif c == "{" and self._depth == 3 and self._in_days:
+                    self._day_start = i
+            elif c == "}" or c == "]":
+                if c == "}" and self._depth == 3 and self._in_days:
+                    days.append(DayPlan.model_validate_json(text[self._day_start : i + 1]))
+                elif c == "]" and self._depth == 2:
+                    self._in_days = False
+                self._depth -= 1
+
+        self._pos = len(text)
+        return days
+
+    def finish(self) -> MealPlanResponse:
+        return MealPlanResponse.model_validate_json(_extract_json(self.text))
+
+
+def sse_event(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _summary_event(plan: MealPlanResponse, verifier: MealPlanVerifier | None = None) -> str:
+    assumptions = plan.assumptions + (verifier.notes() if verifier is not None else [])
+    return sse_event("summary", {"shopping_list": plan.shopping_list, "assumptions": assumptions})
+
+
+def stream_meal_plan(user: UserInput, calc: CalcOutput) -> AsyncIterator[str]:
+    """
+    Generate a meal plan as server-sent events.
+
+    Emits one `day` event per `DayPlan` as soon as its JSON is complete, then a `summary`
+    event with `shopping_list` and `assumptions`, then `done`. Failures after streaming
+    has started become an `error` event with the HTTP status the plain endpoint would
+    use. Plans share the `generate_meal_plan` cache; cached plans are replayed at once.
+    Each day is verified as it arrives, like `generate_meal_plan` does.
+    With `mealplan.days_per_chunk`, days are emitted as each wave of chunks completes.
+    Local-engine plans, and rate-limited requests that have not emitted a day yet, are
+    replayed from `generate_local_meal_plan`.
+
+    Raises ValueError (before streaming) if GEMINI_API_KEY is not set.
+    """
+    if user.mealplan.engine == MealPlanEngine.local:
+        return _replay_events(generate_local_meal_plan(user, calc))
+
+    client = _get_client()
+    chunk = user.mealplan.days_per_chunk
+    if chunk is not None and chunk < user.mealplan.days:
+        return _sharded_events(client, user, calc, chunk)
 
-        # Check if JSON appears truncated (doesn't end properly)
-        if json_text and not json_text.rstrip().endswith("}"):
+    prompt = build_prompt(user, calc)
+    key = mealplan_cache_key(prompt)
+
+    cached = mealplan_cache.get(key)
+    if cached is not None:
+        return _replay_events(_verified(MealPlanResponse.model_validate_json(cached), calc))
+    return _stream_events(client, prompt, key, user, calc)
+
+
+async def _replay_events(plan: MealPlanResponse) -> AsyncIterator[str]:
+    for i, day in enumerate(plan.generated_mealplan):
+        yield sse_event("day", {"index": i, "day": day.model_dump()})
+    yield _summary_event(plan)
+    yield sse_event("done", {})
+
+
+async def _error_events(
+    user: UserInput, calc: CalcOutput, status: int, detail: str, emitted: int
+) -> AsyncIterator[str]:
+    if status == 429 and emitted == 0 and MEALPLAN_LOCAL_FALLBACK:
+        async for event in _replay_events(_local_fallback(user, calc)):
+            yield event
+    else:
+        yield sse_event("error", {"status": status, "detail": detail})
+
+
+async def _sharded_events(
+    client: object, user: UserInput, calc: CalcOutput, days_per_chunk: int
+) -> AsyncIterator[str]:
+    parts: list[MealPlanResponse] = []
+    verifier = _verifier(calc)
+    emitted = 0
+
+    try:
+        async for wave in _shard_waves(client, user, calc, days_per_chunk):
+            for plan in wave:
+                for day in plan.generated_mealplan:
+                    if verifier is not None:
+                        day = verifier.verify_day(day)
+                    yield sse_event("day", {"index": emitted, "day": day.model_dump()})
+                    emitted += 1
+            parts += wave
+
+        yield _summary_event(merge_meal_plans(parts), verifier)
+        yield sse_event("done", {})
+
+    except (RuntimeError, ValueError) as e:
+        msg = str(e)
+        status = 429 if _is_rate_limited(msg) else 503
+        async for event in _error_events(user, calc, status, msg, emitted):
+            yield event
+
+
+async def _stream_events(
+    client: object, prompt: str, key: str, user: UserInput, calc: CalcOutput
+) -> AsyncIterator[str]:
+    from google.genai import errors
+
+    max_tokens = 8192
+    parser = MealPlanStreamParser()
+    verifier = _verifier(calc)
+    emitted = 0
+    last = None
+
+    try:
+        deadline = time.monotonic() + MEALPLAN_QUEUE_DEADLINE_S
+        async with _slot(deadline), asyncio.timeout(MEALPLAN_TIMEOUT_S):
+            # Includes the time the client takes to read the days emitted so far.
+            with span("mealplan.llm_stream"):
+                chunks = await client.aio.models.generate_content_stream(
+                    model=MODEL, contents=prompt, config=_generate_config(max_tokens)
+                )
+                async for chunk in chunks:
+                    last = chunk
+                    for day in parser.feed(getattr(chunk, "text", None) or ""):
+                        if verifier is not None:
+                            day = verifier.verify_day(day)
+                        yield sse_event("day", {"index": emitted, "day": day.model_dump()})
+                        emitted += 1
+
+        if _check_truncation(last):
             raise RuntimeError(
-                f"Response appears to be truncated. JSON doesn't end properly. "
-                f"Preview (last 200 chars): {text[-200:] if len(text) > 200 else text}"
+                f"Response was truncated (max_output_tokens={max_tokens} may be too low). "
+                "Try reducing the number of days or meals per day, or set days_per_chunk."
             )
-
         try:
-            return MealPlanResponse.model_validate_json(json_text)
+            plan = parser.finish()
         except Exception as e:
-            preview = text[:500] if text else ""
-            raise RuntimeError(
-                f"LLM returned invalid JSON. "
-                f"This may indicate truncation (max_output_tokens={max_tokens}). "
-                f"Preview: {preview}"
-            ) from e
+            preview = parser.text[:500]
+            raise RuntimeError(f"LLM returned invalid JSON. Preview: {preview}") from e
+
+        mealplan_cache.set(key, plan.model_dump_json().encode())
+        yield _summary_event(plan, verifier)
+        yield sse_event("done", {})
 
+    except TimeoutError:
+        detail = f"Gemini request timed out after {MEALPLAN_TIMEOUT_S:g}s"
+        yield sse_event("error", {"status": 503, "detail": detail})
     except errors.APIError as e:
-        if getattr(e, "status_code", None) == 429:
-            raise RuntimeError(f"RATE_LIMIT:{e}") from e
-        raise RuntimeError(f"Gemini API error: {e}") from e
+        status = 429 if _api_status(e) == 429 else 503
+        async for event in _error_events(user, calc, status, f"Gemini API error: {e}", emitted):
+            yield event
+    except (RuntimeError, ValueError) as e:
+        msg = str(e)
+        status = 429 if _is_rate_limited(msg) else 503
+        async for event in _error_events(user, calc, status, msg, emitted):
+            yield event
 
 
 def _extract_json(text: str) -> str:
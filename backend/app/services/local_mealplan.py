@@ -0,0 +1,299 @@
+import math
+from collections.abc import Callable
+
+import numpy as np
+
+from app.foods import FAT, KCAL, NET_CARBS, PROTEIN, FoodTable, food_table
+from app.models import CalcOutput, Macros, UserInput
+from app.models_mealplan import DayPlan, Meal, MealItem, MealPlanResponse
+from app.services.mealplan_rules import (
+    CALORIE_TOLERANCE,
+    MAX_NET_CARBS_G,
+    allowed_food_kinds,
+    meal_names,
+    mixes_meat_and_dairy,
+)
+
+# Share of the day's calories per main meal (normalized over the meals in the plan) and
+# per snack, and default vegetable portions by meal type.
+MAIN_MEAL_WEIGHTS = {"meal": 1.0, "breakfast": 0.3, "lunch": 0.35, "dinner": 0.35}
+SNACK_KCAL_SHARE = 0.1
+VEGETABLE_G = {"b": 60.0, "m": 150.0}
+REFERENCE_MEAL_KCAL = 650.0
+
+# Food combinations tried per day before settling for the closest one. Every LEAN_EVERY
+# attempts, the choice narrows to the leaner half of the foods.
+MAX_ATTEMPTS = 12
+LEAN_EVERY = 4
+
+ASSUMPTIONS = [
+    "Generated by the built-in planner from a fixed food table; no LLM was used.",
+    "Weights are for cooked or ready-to-eat food.",
+]
+
+
+def _meal_type(name: str) -> str:
+    if name.startswith("snack"):
+        return "s"
+    return "b" if name == "breakfast" else "m"
+
+
+def _lean_key(table: FoodTable, role: str, row: int) -> float:
+    """Lower is leaner: carbs (and, for proteins, calories) per unit of what the food adds."""
+    p = table.per_g[row]
+    if role == "protein":
+        return (p[KCAL] + 40.0 * p[NET_CARBS]) / p[PROTEIN]
+    if role == "vegetable":
+        return p[NET_CARBS]
+    return p[NET_CARBS] / p[KCAL]
+
+
+def _pick(
+    table: FoodTable,
+    role: str,
+    meal_type: str,
+    kinds: frozenset[str],
+    turn: int,
+    lean: int,
+    exclude: Callable[[int], bool] | None = None,
+) -> int | None:
+    """
+    Rotate through the foods for `role` by `turn`; with `lean` > 0 only the leanest
+    1 / 2**lean of them are considered.
+    """
+    rows = table.select(role=role, meal_type=meal_type, kinds=kinds)
+    if exclude is not None:
+        rows = [i for i in rows if not exclude(i)]
+    if lean:
+        rows = sorted(rows, key=lambda i: _lean_key(table, role, i))[: max(1, len(rows) >> lean)]
+    return rows[turn % len(rows)] if rows else None
+
+
+def _choose_meal(
+    table: FoodTable, kinds: frozenset[str], meal_type: str, turn: int, lean: int, kosher: bool
+) -> dict[str, int]:
+    """Food row per role for one meal: protein + vegetable + fat, or a single snack."""
+    if meal_type == "s":
+        snack = _pick(table, "snack", "s", kinds, turn, lean)
+        return {} if snack is None else {"snack": snack}
+
+    chosen: dict[str, int] = {}
+    protein = _pick(table, "protein", meal_type, kinds, turn, lean)
+    if protein is not None:
+        chosen["protein"] = protein
+
+    def clashes(row: int) -> bool:
+        return kosher and mixes_meat_and_dairy({table.kinds[j] for j in (row, *chosen.values())})
+
+    for role, step in (("vegetable", 2), ("fat", 3)):
+        row = _pick(table, role, meal_type, kinds, turn * step + 1, lean, clashes)
+        if row is not None:
+            chosen[role] = row
+    return chosen
+
+
+def _fit_meal(
+    table: FoodTable, foods: dict[str, int], vegetable_g: float, protein: float, kcal: float
+) -> dict[str, float]:
+    """
+    Gram amounts hitting the meal's protein and calorie targets.
+
+    The vegetable portion is fixed; protein and fat items solve a 2x2 linear system.
+    If that needs a negative amount, protein wins and the fat item is dropped to 0 g.
+    """
+    grams = {role: 0.0 for role in foods}
+    if "vegetable" in foods:
+        grams["vegetable"] = vegetable_g
+        v = table.per_g[foods["vegetable"]]
+        protein -= vegetable_g * v[PROTEIN]
+        kcal -= vegetable_g * v[KCAL]
+    protein, kcal = max(protein, 0.0), max(kcal, 0.0)
+
+    p = table.per_g[foods["protein"]] if "protein" in foods else None
+    f = table.per_g[foods["fat"]] if "fat" in foods else None
+    if p is not None and f is not None:
+        a = np.array([[p[PROTEIN], f[PROTEIN]], [p[KCAL], f[KCAL]]])
+        if abs(np.linalg.det(a)) > 1e-12:
+            g_protein, g_fat = np.linalg.solve(a, [protein, kcal])
+            if g_protein >= 0 and g_fat >= 0:
+                grams["protein"], grams["fat"] = float(g_protein), float(g_fat)
+                return grams
+    if p is not None:
+        grams["protein"] = protein / p[PROTEIN]
+        kcal -= grams["protein"] * p[KCAL]
+    if f is not None:
+        grams["fat"] = max(kcal, 0.0) / f[KCAL]
+    return grams
+
+
+def _portions(
+    table: FoodTable, foods: dict[str, int], grams: dict[str, float], scale: float = 1.0
+) -> dict[str, float]:
+    """Cap grams at each food's `max_g` times `scale` and round to whole grams."""
+    # Protein sources are rounded up so rounding never drops protein below the target.
+    portions = {}
+    for role, g in grams.items():
+        g = min(g, table.max_g[foods[role]] * scale)
+        portions[role] = float(math.ceil(g) if role == "protein" else max(round(g), 0))
+    return portions
+
+
+def _plan_day(
+    table: FoodTable,
+    kinds: frozenset[str],
+    names: list[str],
+    macros: Macros,
+    carbs_limit: float,
+    turn: int,
+    lean: int,
+    kosher: bool,
+) -> tuple[list[tuple[str, dict[str, int], dict[str, float]]], np.ndarray]:
+    """Foods and grams per meal for one day, plus the day's nutrient totals."""
+    meals = [
+        (name, _choose_meal(table, kinds, _meal_type(name), turn + i, lean, kosher))
+        for i, name in enumerate(names)
+    ]
+
+    snack_nutrients = np.zeros(4)
+    snack_grams: dict[int, dict[str, float]] = {}
+    for i, (name, foods) in enumerate(meals):
+        if _meal_type(name) == "s" and foods:
+            per_g = table.per_g[foods["snack"]]
+            g = SNACK_KCAL_SHARE * macros.calories_total / per_g[KCAL]
+            snack_grams[i] = _portions(table, foods, {"snack": g})
+            snack_nutrients += snack_grams[i]["snack"] * per_g
+
+    main = [i for i, (name, _) in enumerate(meals) if _meal_type(name) != "s"]
+    weights = np.array([MAIN_MEAL_WEIGHTS[meals[i][0]] for i in main])
+    weights /= weights.sum()
+    protein_left = macros.protein_g - snack_nutrients[PROTEIN]
+    kcal_left = macros.calories_total - snack_nutrients[KCAL]
+
+    vegetable_scale = 1.0
+    for _ in range(2):
+        grams = dict(snack_grams)
+        # Whatever a meal misses (e.g. at a portion cap) carries over to the next one.
+        carry = np.zeros(4)
+        for w, i in zip(weights, main, strict=True):
+            name, foods = meals[i]
+            vegetable_g = VEGETABLE_G[_meal_type(name)] * vegetable_scale
+            protein = w * protein_left + carry[PROTEIN]
+            kcal = w * kcal_left + carry[KCAL]
+            fitted = _fit_meal(table, foods, vegetable_g, protein, kcal)
+            # Portion caps are for a meal of REFERENCE_MEAL_KCAL; larger meals get more.
+            scale = max(1.0, kcal / REFERENCE_MEAL_KCAL)
+            grams[i] = _portions(table, foods, fitted, scale=scale)
+            carry = np.array([protein, 0.0, 0.0, kcal]) - _nutrients(table, foods, grams[i])
+        totals = _day_totals(table, meals, grams)
+
+        # Too many carbs: shrink the vegetables to the budget the other foods leave.
+        if totals[NET_CARBS] <= carbs_limit:
+            break
+        vegetable_carbs = sum(
+            grams[i].get("vegetable", 0.0) * table.per_g[meals[i][1]["vegetable"], NET_CARBS]
+            for i in main
+            if "vegetable" in meals[i][1]
+        )
+        if vegetable_carbs <= 0:
+            break
+        budget = carbs_limit - 1.0 - (totals[NET_CARBS] - vegetable_carbs)
+        vegetable_scale *= max(budget, 0.0) / vegetable_carbs
+
+    return [(name, foods, grams.get(i, {})) for i, (name, foods) in enumerate(meals)], totals
+
+
+def _nutrients(table: FoodTable, foods: dict[str, int], grams: dict[str, float]) -> np.ndarray:
+    totals = np.zeros(4)
+    for role, row in foods.items():
+        totals += grams.get(role, 0.0) * table.per_g[row]
+    return totals
+
+
+def _day_totals(
+    table: FoodTable, meals: list[tuple[str, dict[str, int]]], grams: dict[int, dict[str, float]]
+) -> np.ndarray:
+    return sum(
+        (_nutrients(table, foods, grams.get(i, {})) for i, (_, foods) in enumerate(meals)),
+        np.zeros(4),
+    )
+
+
+def _violation(totals: np.ndarray, macros: Macros, carbs_limit: float) -> float:
+    """0.0 when the day meets every plan constraint, else how far off it is (relative)."""
+    kcal_error = abs(totals[KCAL] - macros.calories_total) / macros.calories_total
+    # A 0 g carb limit (net_carbs_g=0) is scored per gram of excess instead.
+    return (
+        max(0.0, macros.protein_g - totals[PROTEIN]) / macros.protein_g
+        + max(0.0, kcal_error - CALORIE_TOLERANCE)
+        + max(0.0, totals[NET_CARBS] - carbs_limit) / max(carbs_limit, 1.0)
+    )
+
+
+def _meal(name: str, items: list[MealItem], nutrients: np.ndarray) -> Meal:
+    return Meal(
+        meal_name=name,
+        items=items,
+        protein_g=round(float(nutrients[PROTEIN]), 1),
+        fat_g=round(float(nutrients[FAT]), 1),
+        net_carbs_g=round(float(nutrients[NET_CARBS]), 1),
+        calories=round(float(nutrients[KCAL]), 1),
+    )
+
+
+def generate_local_meal_plan(user: UserInput, calc: CalcOutput) -> MealPlanResponse:
+    """
+    Deterministic meal plan from the built-in food table, without an LLM.
+
+    Each meal combines a protein, a vegetable and a fat (snacks are one snack food),
+    rotated by day so days differ, with gram amounts solved to hit the protein and
+    calorie targets under the same rules the LLM prompt states. If no combination in
+    `MAX_ATTEMPTS` satisfies every rule, the closest one is used and noted in
+    `assumptions`.
+    """
+    table = food_table()
+    mp = user.mealplan
+    kinds = allowed_food_kinds(user.dietary)
+    names = meal_names(mp.meals_per_day)
+    macros = calc.macros
+    carbs_limit = min(macros.net_carbs_g, MAX_NET_CARBS_G)
+
+    days: list[DayPlan] = []
+    shopping: dict[str, float] = {}
+    assumptions = list(ASSUMPTIONS)
+    for d in range(mp.days):
+        best = None
+        for attempt in range(MAX_ATTEMPTS):
+            turn = d + attempt * mp.days
+            lean = attempt // LEAN_EVERY
+            meals, totals = _plan_day(
+                table, kinds, names, macros, carbs_limit, turn, lean, user.dietary.kosher
+            )
+            violation = _violation(totals, macros, carbs_limit)
+            if best is None or violation < best[0]:
+                best = (violation, meals, totals)
+            if violation == 0.0:
+                break
+
+        violation, meals, totals = best
+        if violation > 0.0:
+            assumptions.append(f"Day {d + 1} could not meet every target with the available foods.")
+
+        day_meals = []
+        for name, foods, grams in meals:
+            items = []
+            nutrients = np.zeros(4)
+            for role, row in foods.items():
+                g = grams.get(role, 0.0)
+                if g <= 0:
+                    continue
+                items.append(MealItem(name=table.names[row], grams=g))
+                nutrients += g * table.per_g[row]
+                shopping[table.names[row]] = shopping.get(table.names[row], 0.0) + g
+            day_meals.append(_meal(name, items, nutrients))
+        days.append(DayPlan(meals=day_meals, totals=_meal("totals", [], totals)))
+
+    return MealPlanResponse(
+        generated_mealplan=days,
+        shopping_list=[f"{name} ({g:.0f} g)" for name, g in shopping.items()],
+        assumptions=assumptions,
+    )
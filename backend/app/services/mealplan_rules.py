@@ -0,0 +1,34 @@
+from app.models import DietaryPreferences
+
+# Constraints every generated meal plan must meet, whichever engine produced it.
+MAX_NET_CARBS_G = 20.0
+CALORIE_TOLERANCE = 0.05
+MAX_ITEMS_PER_MEAL = 3
+
+MEAL_NAMES = ("breakfast", "lunch", "dinner", "snack", "snack2", "snack3")
+
+
+def meal_names(meals_per_day: int) -> list[str]:
+    if meals_per_day == 1:
+        return ["meal"]
+    return list(MEAL_NAMES[:meals_per_day])
+
+
+def allowed_food_kinds(prefs: DietaryPreferences) -> frozenset[str]:
+    """Food kinds (see app/data/foods.csv) compatible with the dietary preferences."""
+    if prefs.vegan:
+        kinds = {"plant"}
+    elif prefs.vegetarian:
+        kinds = {"plant", "egg", "dairy"}
+    else:
+        kinds = {"plant", "egg", "dairy", "meat", "poultry", "pork", "fish", "shellfish"}
+
+    if prefs.kosher:
+        kinds -= {"pork", "shellfish"}
+    if prefs.halal:
+        kinds -= {"pork"}
+    return frozenset(kinds)
+
+
+def mixes_meat_and_dairy(kinds: set[str]) -> bool:
+    return "dairy" in kinds and bool(kinds & {"meat", "poultry"})
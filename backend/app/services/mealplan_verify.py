@@ -0,0 +1,180 @@
+import numpy as np
+
+from app.foods import FAT, KCAL, NET_CARBS, PROTEIN, FoodIndex, food_index
+from app.models import Macros
+from app.models_mealplan import DayPlan, Meal, MealItem, MealPlanResponse
+from app.services.mealplan_rules import CALORIE_TOLERANCE, MAX_NET_CARBS_G
+
+# Rescaling never grows an item beyond this factor and repeats at most this many times
+# as items hit 0 g or the cap.
+MAX_SCALE = 3.0
+MAX_REPAIR_ROUNDS = 5
+# Aim slightly inside the limits so rounding grams cannot push a day back out.
+PROTEIN_MARGIN_G = 0.5
+NET_CARBS_MARGIN_G = 0.5
+
+
+def _meal(name: str, items: list[MealItem], nutrients: np.ndarray) -> Meal:
+    return Meal(
+        meal_name=name,
+        items=items,
+        protein_g=round(float(nutrients[PROTEIN]), 1),
+        fat_g=round(float(nutrients[FAT]), 1),
+        net_carbs_g=round(float(nutrients[NET_CARBS]), 1),
+        calories=round(float(nutrients[KCAL]), 1),
+    )
+
+
+def _reported(meal: Meal) -> np.ndarray:
+    return np.array([meal.protein_g, meal.fat_g, meal.net_carbs_g, meal.calories])
+
+
+class MealPlanVerifier:
+    """
+    Recomputes LLM meal plan nutrition from grams and repairs days that miss the targets.
+
+    Each item is resolved against the food index. Meals whose items all resolve get
+    their macros recomputed; other meals keep the LLM's numbers and are left untouched.
+    Day totals are always rebuilt from the meals. A day that breaks the plan rules
+    (protein >= target, net carbs <= limit, calories within tolerance) has the grams of
+    its verified items rescaled as little as possible to satisfy them.
+
+    Days are verified one at a time (`verify_day`), so streamed plans can be checked as
+    they arrive; `notes` summarizes what was done for `assumptions`.
+    """
+
+    def __init__(self, macros: Macros, index: FoodIndex | None = None) -> None:
+        self.index = index if index is not None else food_index()
+        self.protein_g = macros.protein_g
+        self.calories = macros.calories_total
+        self.fat_g = macros.fat_g
+        self.net_carbs_g = min(macros.net_carbs_g, MAX_NET_CARBS_G)
+        self.days = 0
+        self.items = 0
+        self.resolved = 0
+        self.unknown: dict[str, None] = {}
+        self.repaired: list[int] = []
+        self.failed: list[int] = []
+
+    def verify_day(self, day: DayPlan) -> DayPlan:
+        self.days += 1
+
+        # Rows of every item in meals that fully resolve; other meals count as reported.
+        fixed = np.zeros(4)
+        verified: dict[int, list[int]] = {}
+        for m, meal in enumerate(day.meals):
+            rows = [self.index.resolve(item.name) for item in meal.items]
+            self.items += len(rows)
+            self.resolved += sum(row is not None for row in rows)
+            if None in rows:
+                for item, row in zip(meal.items, rows, strict=True):
+                    if row is None:
+                        self.unknown.setdefault(item.name, None)
+                fixed += _reported(meal)
+            else:
+                verified[m] = rows
+
+        rows = [row for meal_rows in verified.values() for row in meal_rows]
+        nutrients = self.index.table.per_g[rows]
+        grams = np.array(
+            [item.grams for m in verified for item in day.meals[m].items], dtype=np.float64
+        )
+        if self._violation(fixed + grams @ nutrients):
+            if rows:
+                grams = self._repair(grams, nutrients, fixed)
+            if self._violation(fixed + grams @ nutrients):
+                self.failed.append(self.days)
+            else:
+                self.repaired.append(self.days)
+
+        meals = list(day.meals)
+        totals = fixed.copy()
+        k = 0
+        for m in verified:
+            meal = day.meals[m]
+            items = []
+            meal_nutrients = np.zeros(4)
+            for item in meal.items:
+                g = float(grams[k])
+                meal_nutrients += g * nutrients[k]
+                k += 1
+                if g > 0:
+                    items.append(item if g == item.grams else item.model_copy(update={"grams": g}))
+            meals[m] = _meal(meal.meal_name, items, meal_nutrients)
+            totals += meal_nutrients
+
+        return DayPlan(meals=meals, totals=_meal("totals", [], totals))
+
+    def _violation(self, totals: np.ndarray) -> bool:
+        return bool(
+            totals[PROTEIN] < self.protein_g
+            or totals[NET_CARBS] > self.net_carbs_g
+            or abs(totals[KCAL] - self.calories) > CALORIE_TOLERANCE * self.calories
+        )
+
+    def _repair(self, grams: np.ndarray, nutrients: np.ndarray, fixed: np.ndarray) -> np.ndarray:
+        """
+        Minimum-change per-item scale factors for the verified items.
+
+        Starts from the calorie and fat targets (keeping the keto split) and adds the
+        protein and net carb targets as constraints once they are missed, each step
+        solved as a minimum-norm least squares problem. Items
+        pushed below 0 or above MAX_SCALE are pinned there and the rest re-solved.
+        """
+        target = {
+            KCAL: self.calories,
+            FAT: self.fat_g,
+            PROTEIN: self.protein_g + PROTEIN_MARGIN_G,
+            NET_CARBS: self.net_carbs_g - NET_CARBS_MARGIN_G,
+        }
+        columns = [KCAL, FAT]
+        contribution = grams[:, None] * nutrients  # per item at scale 1
+        scale = np.ones(len(grams))
+        free = np.ones(len(grams), dtype=bool)
+
+        for _ in range(MAX_REPAIR_ROUNDS):
+            a = contribution[free][:, columns].T
+            pinned = fixed + scale[~free] @ contribution[~free]
+            rhs = np.array([target[c] for c in columns]) - pinned[columns] - a @ scale[free]
+            scale[free] += np.linalg.lstsq(a, rhs, rcond=None)[0]
+
+            clipped = free & ((scale < 0) | (scale > MAX_SCALE))
+            scale = np.clip(scale, 0.0, MAX_SCALE)
+            free &= ~clipped
+            totals = fixed + np.round(grams * scale) @ nutrients
+            if not self._violation(totals) or not free.any():
+                break
+            if totals[PROTEIN] < self.protein_g and PROTEIN not in columns:
+                columns.append(PROTEIN)
+            if totals[NET_CARBS] > self.net_carbs_g and NET_CARBS not in columns:
+                columns.append(NET_CARBS)
+
+        return np.round(grams * scale)
+
+    def notes(self) -> list[str]:
+        notes = []
+        if self.resolved:
+            notes.append(
+                f"Nutrition recomputed from grams for {self.resolved} of {self.items} items "
+                "using the built-in food table."
+            )
+        if self.unknown:
+            notes.append(f"Not in the food table, LLM values kept: {', '.join(self.unknown)}.")
+        if self.repaired:
+            days = ", ".join(str(d) for d in self.repaired)
+            notes.append(f"Portions rescaled to meet the macro targets on day(s) {days}.")
+        if self.failed:
+            days = ", ".join(str(d) for d in self.failed)
+            notes.append(f"Day(s) {days} may miss the macro targets.")
+        return notes
+
+
+def verify_meal_plan(plan: MealPlanResponse, macros: Macros) -> MealPlanResponse:
+    """`plan` with every day checked and repaired by `MealPlanVerifier`."""
+    verifier = MealPlanVerifier(macros)
+    days = [verifier.verify_day(day) for day in plan.generated_mealplan]
+    return MealPlanResponse(
+        generated_mealplan=days,
+        shopping_list=plan.shopping_list,
+        assumptions=[*plan.assumptions, *verifier.notes()],
+    )
@@ -0,0 +1,89 @@
+"""
+Import-time report for cold starts (e.g. on Lambda, where every new instance pays it).
+
+    cd backend && python -m app.startup [--module app.main] [--top 15]
+
+Imports the module in a fresh interpreter with `-X importtime` and prints the total,
+the self time per top-level package, and the slowest individual modules.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+# Budget for `import app.main` in a fresh interpreter, checked by tests/test_startup.py.
+# Mostly FastAPI/Pydantic and NumPy; google.genai must not be part of it.
+IMPORT_BUDGET_S = 1.0
+
+# Modules that must stay out of `import app.main` because they are only needed for meal plans.
+LAZY_MODULES = ("google.genai", "app.services.llm_mealplan")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass(frozen=True)
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Entries of `python -X importtime` output, in the order they were printed."""
+    entries = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, module = m.groups()
+            entries.append(ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def measure_imports(module: str = "app.main") -> list[ImportTime]:
+    """Import `module` in a fresh interpreter with `-X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+def report(entries: list[ImportTime], module: str, *, top: int = 15) -> str:
+    by_package: dict[str, int] = defaultdict(int)
+    for e in entries:
+        by_package[e.module.split(".")[0]] += e.self_us
+    total_us = sum(e.self_us for e in entries)
+    loaded = {e.module for e in entries}
+
+    lines = [f"import {module}: {total_us / 1e6:.3f} s (budget {IMPORT_BUDGET_S:g} s)", ""]
+    lines.append("self time by top-level package:")
+    for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {us / 1e3:9.1f} ms  {us / total_us:6.1%}  {package}")
+    lines.append("")
+    lines.append("slowest modules (self time):")
+    for e in sorted(entries, key=lambda e: -e.self_us)[:top]:
+        lines.append(f"  {e.self_us / 1e3:9.1f} ms  {e.module}")
+    lines.append("")
+    for lazy in LAZY_MODULES:
+        lines.append(f"{lazy}: {'IMPORTED' if lazy in loaded else 'not imported (lazy)'}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.startup", description=__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    print(report(measure_imports(args.module), args.module, top=args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,246 @@
+import datetime
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from pathlib import Path
+from typing import NamedTuple, Protocol
+
+from app.models import UserInput
+
+
+class StoredProfile(NamedTuple):
+    user: UserInput
+    start_date: datetime.date
+    # Normalized once when the profile is saved, so weigh-ins need no unit conversion.
+    age_years: int
+    height_cm: float
+
+
+class Calibration(NamedTuple):
+    tdee: float  # effective TDEE fitted to the weigh-ins, kcal/day
+    kcal_per_kg: float
+
+
+class ProgressStore(Protocol):
+    """
+    Repository of user profiles, weigh-in series and materialized snapshots.
+
+    Weigh-ins are (date, weight_kg) with at most one per user and date; adding one for a
+    date that already has a weigh-in replaces it. Reads and writes inside
+    `transaction()` are atomic.
+    """
+
+    def transaction(self) -> AbstractContextManager[None]: ...
+
+    def get_profile(self, user_id: str) -> StoredProfile | None: ...
+
+    def put_profile(self, user_id: str, profile: StoredProfile) -> None: ...
+
+    def add_weighins(self, user_id: str, rows: Iterable[tuple[datetime.date, float]]) -> int:
+        """Store `rows` and return the user's weigh-in count."""
+        ...
+
+    def weighins(self, user_id: str) -> list[tuple[datetime.date, float]]: ...
+
+    def latest_weighin(
+        self, user_id: str, *, since: datetime.date
+    ) -> tuple[datetime.date, float] | None: ...
+
+    def get_snapshot(self, user_id: str) -> bytes | None: ...
+
+    def put_snapshot(self, user_id: str, snapshot: bytes) -> None: ...
+
+    def profiles(self) -> Iterator[tuple[str, StoredProfile]]:
+        """Every stored profile, ordered by user_id."""
+        ...
+
+    def all_weighins(self) -> Iterator[tuple[str, datetime.date, float]]:
+        """Every weigh-in as (user_id, date, weight_kg), ordered by user_id and date."""
+        ...
+
+    def get_calibration(self, user_id: str) -> Calibration | None: ...
+
+    def put_calibration(self, user_id: str, calibration: Calibration) -> None: ...
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    user_json TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    age_years INTEGER NOT NULL,
+    height_cm REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS weighins (
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    weight_kg REAL NOT NULL,
+    PRIMARY KEY (user_id, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS calibrations (
+    user_id TEXT PRIMARY KEY,
+    tdee REAL NOT NULL,
+    kcal_per_kg REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    user_id TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+"""
+
+
+class SQLiteStore:
+    """
+    `ProgressStore` in one SQLite database file (":memory:" for a private one).
+
+    The connection is shared by the threads of a process and serialized with a lock;
+    worker processes open their own connections, and WAL mode lets their reads run
+    alongside a write.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._depth = 0
+        if str(path) != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            else:
+                self._db.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def get_profile(self, user_id: str) -> StoredProfile | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT user_json, start_date, age_years, height_cm FROM profiles"
+                " WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        user_json, start_date, age_years, height_cm = row
+        return StoredProfile(
+            UserInput.model_validate_json(user_json),
+            datetime.date.fromisoformat(start_date),
+            age_years,
+            height_cm,
+        )
+
+    def put_profile(self, user_id: str, profile: StoredProfile) -> None:
+        # exclude_unset keeps which fields were sent, e.g. for resolve_macro_strategy.
+        user_json = profile.user.model_dump_json(exclude_unset=True)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    user_json,
+                    profile.start_date.isoformat(),
+                    profile.age_years,
+                    profile.height_cm,
+                ),
+            )
+
+    def add_weighins(self, user_id: str, rows: Iterable[tuple[datetime.date, float]]) -> int:
+        with self.transaction():
+            self._db.executemany(
+                "INSERT OR REPLACE INTO weighins VALUES (?, ?, ?)",
+                [(user_id, date.isoformat(), weight_kg) for date, weight_kg in rows],
+            )
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM weighins WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return count
+
+    def weighins(self, user_id: str) -> list[tuple[datetime.date, float]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT date, weight_kg FROM weighins WHERE user_id = ? ORDER BY date",
+                (user_id,),
+            ).fetchall()
+        return [(datetime.date.fromisoformat(date), weight_kg) for date, weight_kg in rows]
+
+    def latest_weighin(
+        self, user_id: str, *, since: datetime.date
+    ) -> tuple[datetime.date, float] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT date, weight_kg FROM weighins WHERE user_id = ? AND date >= ?"
+                " ORDER BY date DESC LIMIT 1",
+                (user_id, since.isoformat()),
+            ).fetchone()
+        if row is None:
+            return None
+        return datetime.date.fromisoformat(row[0]), row[1]
+
+    def get_snapshot(self, user_id: str) -> bytes | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body FROM snapshots WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def put_snapshot(self, user_id: str, snapshot: bytes) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (user_id, snapshot))
+
+    def profiles(self) -> Iterator[tuple[str, StoredProfile]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT user_id, user_json, start_date, age_years, height_cm FROM profiles"
+                " ORDER BY user_id"
+            ).fetchall()
+        for user_id, user_json, start_date, age_years, height_cm in rows:
+            yield (
+                user_id,
+                StoredProfile(
+                    UserInput.model_validate_json(user_json),
+                    datetime.date.fromisoformat(start_date),
+                    age_years,
+                    height_cm,
+                ),
+            )
+
+    def all_weighins(self) -> Iterator[tuple[str, datetime.date, float]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT user_id, date, weight_kg FROM weighins ORDER BY user_id, date"
+            ).fetchall()
+        for user_id, date, weight_kg in rows:
+            yield user_id, datetime.date.fromisoformat(date), weight_kg
+
+    def get_calibration(self, user_id: str) -> Calibration | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tdee, kcal_per_kg FROM calibrations WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return None if row is None else Calibration(*row)
+
+    def put_calibration(self, user_id: str, calibration: Calibration) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO calibrations VALUES (?, ?, ?)", (user_id, *calibration)
+            )
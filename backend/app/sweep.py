@@ -0,0 +1,99 @@
+import numpy as np
+
+from app.formulas.bmi import calculate_bmi
+from app.formulas.bmr import calculate_bmr_mifflin_st_jeor
+from app.formulas.bodyfat import estimate_body_fat_percent_from_bmi
+from app.formulas.factors import FACTORS, Factors
+from app.formulas.ffmi import calculate_ffmi
+from app.formulas.forecast import KCAL_PER_KG
+from app.formulas.strategies import MACRO_STRATEGIES, resolve_macro_strategy
+from app.models import ForecastModel, SweepOutput, SweepRequest
+from app.units import normalize_inputs
+
+FAT_TOO_LOW = "Calories too low for keto macro targets."
+
+
+def calculate_sweep(req: SweepRequest) -> SweepOutput:
+    """
+    `calculate_all` for every combination of goal x activity level x protein x net carbs.
+
+    Normalization, BMI, BMR, body fat and FFMI do not depend on the swept parameters and
+    are computed once. TDEE is computed per activity level, calories and the forecast
+    per (goal, activity), and macros for the full grid, each as one NumPy broadcast.
+    Protein and net carbs not swept come from the user's macro strategy, evaluated per
+    (goal, activity). The operations match the scalar formulas, so without protein and
+    net carbs axes every scenario is bit-for-bit what /calc returns for it. Errors of the shared
+    stages (e.g. minors) raise ValueError; scenarios whose calories cannot cover the
+    protein and carbs get an `error` instead.
+    """
+    user = req.user
+    goals = req.goals or [user.goal]
+    activities = req.activity_levels or [user.activity_level]
+
+    norm = normalize_inputs(user)
+    weight_kg = norm.weight_kg
+    bmi = calculate_bmi(weight_kg=weight_kg, height_cm=norm.height_cm)
+    bmr = calculate_bmr_mifflin_st_jeor(
+        sex=user.sex, age_years=norm.age_years, height_cm=norm.height_cm, weight_kg=weight_kg
+    )
+    if bmr <= 0:
+        raise ValueError("bmr must be > 0")
+    bf = estimate_body_fat_percent_from_bmi(bmi=bmi, age_years=norm.age_years, sex=user.sex)
+    ffmi = calculate_ffmi(weight_kg=weight_kg, height_cm=norm.height_cm, body_fat_percent=bf)
+
+    # Axes: goal (G), activity (A), protein (P), net carbs (C). Every Factors field
+    # becomes a (G, A) array.
+    table = np.array([[FACTORS[user.sex, a, g] for a in activities] for g in goals])
+    grid = Factors(*table.transpose(2, 0, 1))
+    multiplier = grid.activity_multiplier[0]  # (A,)
+    tdee_per_kg = grid.tdee_per_kg[0]
+    goal_factor = grid.goal_factor[:, 0]  # (G,)
+
+    strategy = MACRO_STRATEGIES[resolve_macro_strategy(user)]
+    strategy_carbs, strategy_protein = strategy(grid, bf, norm.net_carbs_g, norm.protein_g_per_kg)
+    if req.protein_g_per_kg is None:
+        protein_per_kg = np.broadcast_to(strategy_protein, grid.male.shape)[:, :, None, None]
+    else:
+        protein_per_kg = np.array(req.protein_g_per_kg)[None, None, :, None]
+    if req.net_carbs_g is None:
+        carbs = np.broadcast_to(strategy_carbs, grid.male.shape)[:, :, None, None]
+    else:
+        carbs = np.array(req.net_carbs_g, dtype=np.float64)[None, None, None, :]
+
+    tdee = bmr * multiplier  # (A,)
+    calories = tdee[None, :] * goal_factor[:, None]  # (G, A)
+    protein_g = weight_kg * protein_per_kg
+    fat_cal = calories[:, :, None, None] - (protein_g * 4.0 + carbs * 4.0)  # (G, A, P, C)
+    failed = fat_cal < 0
+    fat_g = np.where(failed, np.nan, fat_cal / 9.0)
+
+    delta = ((calories - tdee) * 7.0) / KCAL_PER_KG  # (G, A)
+    weeks = user.forecast_weeks
+    if user.forecast_model == ForecastModel.adaptive:
+        equilibrium = weight_kg + (calories - tdee) / tdee_per_kg
+        retention = 1.0 - tdee_per_kg * 7.0 / KCAL_PER_KG
+        final = np.maximum(0.0, equilibrium + (weight_kg - equilibrium) * retention**weeks)
+    else:
+        raw = weight_kg + weeks * delta
+        final = np.where(raw > 0, raw, 0.0)
+
+    shape = fat_g.shape
+    g, a = np.indices(shape).reshape(4, -1)[:2]
+    return SweepOutput.model_construct(
+        bmi=bmi,
+        bmr=bmr,
+        body_fat_percent_estimate=bf,
+        ffmi=ffmi,
+        # Enum values as plain strings: serializing 10k Enum members costs milliseconds.
+        goal=np.array([x.value for x in goals], dtype=object)[g].tolist(),
+        activity_level=np.array([x.value for x in activities], dtype=object)[a].tolist(),
+        protein_g_per_kg=np.broadcast_to(protein_per_kg, shape).ravel().tolist(),
+        net_carbs_g=np.broadcast_to(carbs, shape).ravel().tolist(),
+        tdee=tdee[a].tolist(),
+        calories_total=calories[g, a].tolist(),
+        protein_g=np.broadcast_to(protein_g, shape).ravel().tolist(),
+        fat_g=fat_g.ravel().tolist(),
+        delta_kg_per_week=delta[g, a].tolist(),
+        final_weight_kg=final[g, a].tolist(),
+        error=[FAT_TOO_LOW if f else None for f in failed.ravel().tolist()],
+    )
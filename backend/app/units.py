@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import math
+from typing import NamedTuple
 
 from .models import UnitSystem, UserInput
 
@@ -6,17 +7,30 @@ LB_TO_KG = 0.45359237
 IN_TO_CM = 2.54
 
 
-@dataclass(frozen=True)
-class NormalizedInputs:
+class NormalizedInputs(NamedTuple):
     sex: str
     age_years: int
     height_cm: float
     weight_kg: float
     activity_level: str
+    # As sent; NaN when the request left the field out (see `requested_macros`).
     net_carbs_g: float
     protein_g_per_kg: float
 
 
+def requested_macros(user: UserInput) -> tuple[float, float]:
+    """
+    The net_carbs_g and protein_g_per_kg the request sent, NaN for a field it left out,
+    so that `user_override` takes that one from the goal's fixed_keto macros instead of
+    the UserInput default.
+    """
+    sent = user.model_fields_set
+    return (
+        float(user.net_carbs_g) if "net_carbs_g" in sent else math.nan,
+        float(user.protein_g_per_kg) if "protein_g_per_kg" in sent else math.nan,
+    )
+
+
 def normalize_inputs(user: UserInput) -> NormalizedInputs:
     if user.unit_system == UnitSystem.metric:
         if user.height_cm is None or user.weight_kg is None:
@@ -29,12 +43,13 @@ def normalize_inputs(user: UserInput) -> NormalizedInputs:
         height_cm = user.height_in * IN_TO_CM
         weight_kg = user.weight_lb * LB_TO_KG
 
+    net_carbs_g, protein_g_per_kg = requested_macros(user)
     return NormalizedInputs(
         sex=user.sex.value,
         age_years=user.age_years,
         height_cm=float(height_cm),
         weight_kg=float(weight_kg),
         activity_level=user.activity_level.value,
-        net_carbs_g=float(user.net_carbs_g),
-        protein_g_per_kg=float(user.protein_g_per_kg),
+        net_carbs_g=net_carbs_g,
+        protein_g_per_kg=protein_g_per_kg,
     )
@@ -0,0 +1,83 @@
+"""
+Run the benchmark suite, print ops/sec and p50/p95/p99 latency per benchmark, and
+optionally save the results as a baseline or check them against one.
+
+    cd backend
+    python -m benchmarks --save baseline.json            # record a baseline
+    python -m benchmarks --baseline baseline.json        # exit 1 on a >25% p50 regression
+    python -m benchmarks -k formulas --min-time 0.2      # subset, shorter runs
+
+Baselines are only comparable on the same machine and Python version.
+"""
+
+import argparse
+import asyncio
+import inspect
+import sys
+
+from benchmarks.harness import (
+    DEFAULT_MIN_TIME_S,
+    DEFAULT_THRESHOLD,
+    BenchResult,
+    ameasure,
+    compare,
+    format_table,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+from benchmarks.suite import benchmarks, fake_llm
+
+
+def run(pattern: str = "", *, min_time_s: float = DEFAULT_MIN_TIME_S) -> list[BenchResult]:
+    """Run every benchmark whose name contains `pattern`."""
+    results = []
+    with fake_llm():
+        for name, factory in benchmarks():
+            if pattern not in name:
+                continue
+            fn = factory()
+            if inspect.iscoroutinefunction(fn):
+                results.append(asyncio.run(ameasure(name, fn, min_time_s=min_time_s)))
+            else:
+                results.append(measure(name, fn, min_time_s=min_time_s))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("-k", dest="pattern", default="", help="only names containing this")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME_S, metavar="S")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed slowdown before failing, as a fraction (default: %(default)s)",
+    )
+    parser.add_argument("--metric", choices=["p50_us", "p95_us", "p99_us"], default="p50_us")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    results = run(args.pattern, min_time_s=args.min_time)
+    print(format_table(results, baseline))
+
+    if args.save:
+        save_baseline(results, args.save)
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, threshold=args.threshold, metric=args.metric)
+    for r in regressions:
+        print(
+            f"REGRESSION {r.name}: {r.metric} {r.baseline:.2f} -> {r.current:.2f} "
+            f"({r.change:+.1%}, threshold {args.threshold:.0%})",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Per-request overhead of /calc: the generic FastAPI/Pydantic path vs the fast path.
+
+    cd backend && python -m benchmarks.bench_calc [-n 20000]
+
+"stages" times validation and serialization in-process; "asgi" drives full requests
+through the ASGI app (no network, no HTTP client) so routing and response handling are
+included. Payloads are all distinct, so the fast /calc route runs its cache-miss path.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import Callable
+
+from fastapi import FastAPI
+
+from app.calc import calculate_all, calculate_values
+from app.fastpath import calc_output_json, parse_user_input
+from app.main import app
+from app.models import CalcOutput, UserInput
+from benchmarks.harness import asgi_post
+
+
+def legacy_app() -> FastAPI:
+    """/calc as it was: a `UserInput` parameter and a `CalcOutput` response model."""
+    legacy = FastAPI()
+
+    @legacy.post("/calc", response_model=CalcOutput)
+    def calc(user: UserInput) -> CalcOutput:
+        return calculate_all(user)
+
+    return legacy
+
+
+def payloads(n: int) -> list[bytes]:
+    return [
+        json.dumps(
+            {
+                "sex": "female" if i % 2 else "male",
+                "age_years": 20 + i % 60,
+                "height_cm": 170,
+                "weight_kg": 60 + i / 1000,
+                "activity_level": "moderate",
+                "goal": "lose",
+            }
+        ).encode()
+        for i in range(n)
+    ]
+
+
+def per_call_us(fn: Callable[[bytes], object], bodies: list[bytes]) -> float:
+    start = time.perf_counter()
+    for body in bodies:
+        fn(body)
+    return (time.perf_counter() - start) / len(bodies) * 1e6
+
+
+def slow_stages(body: bytes) -> bytes:
+    user = UserInput.model_validate(json.loads(body))
+    return calculate_all(user).model_dump_json().encode()
+
+
+def fast_stages(body: bytes) -> bytes:
+    return calc_output_json(calculate_values(parse_user_input(body)))
+
+
+async def asgi_us(target: FastAPI, path: str, bodies: list[bytes]) -> float:
+    start = time.perf_counter()
+    for body in bodies:
+        await asgi_post(target, path, body)
+    return (time.perf_counter() - start) / len(bodies) * 1e6
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=20_000, help="requests per measurement")
+    args = parser.parse_args(argv)
+
+    bodies = payloads(args.n)
+    assert slow_stages(bodies[0]) == fast_stages(bodies[0])
+    for fn in (slow_stages, fast_stages):  # warm up
+        per_call_us(fn, bodies[:500])
+
+    slow = per_call_us(slow_stages, bodies)
+    fast = per_call_us(fast_stages, bodies)
+    print(f"stages  before {slow:8.1f} us/request  after {fast:8.1f} us  ({slow / fast:.1f}x)")
+
+    legacy = legacy_app()
+    asyncio.run(asgi_us(legacy, "/calc", bodies[:500]))
+    slow = asyncio.run(asgi_us(legacy, "/calc", bodies))
+    fast = asyncio.run(asgi_us(app, "/api/calc", bodies))
+    print(f"asgi    before {slow:8.1f} us/request  after {fast:8.1f} us  ({slow / fast:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""
+Memory per calculation result held by a batch: CalcOutput models vs compact CalcResults.
+
+    cd backend && python -m benchmarks.bench_memory [-n 1000000]
+
+One `calculate_columns` batch of n distinct rows (built as columns, so no UserInput
+models are allocated) is turned into one list of `CalcOutput` models, as the batch
+and bulk paths held them before, and one list of `CalcResult`s. The bytes that stay
+allocated for each list (tracemalloc, after the build) are divided by n. About 2 GB of
+memory is needed for the default n.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+
+from app.batch import BatchColumns, BatchResult, calculate_columns
+
+
+def batch(n: int) -> BatchResult:
+    i = np.arange(n)
+    return calculate_columns(
+        BatchColumns(
+            imperial=np.zeros(n, dtype=bool),
+            height=150.0 + i % 50,
+            weight=50.0 + (i % 800) / 10,
+            age_years=20 + i % 60,
+            factor_index=i % 30,
+            macro_strategy=np.zeros(n, dtype=np.intp),
+            net_carbs_g=np.full(n, 25.0),
+            protein_g_per_kg=np.full(n, 1.8),
+            forecast_weeks=np.full(n, 24),
+            adaptive=i % 2 == 1,
+        )
+    )
+
+
+def retained_bytes(build: Callable[[], list[object]]) -> tuple[int, float]:
+    """Bytes still allocated after `build()` returns, and its wall time in seconds."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        held = build()
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del held
+    return size, elapsed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", type=int, default=1_000_000, help="results per batch")
+    args = parser.parse_args(argv)
+
+    result = batch(args.n)
+    assert all(e is None for e in result.errors)
+    assert result.results()[0].to_output() == result.outputs()[0]
+
+    before, before_s = retained_bytes(result.outputs)
+    after, after_s = retained_bytes(result.results)
+    print(f"rows    {args.n}")
+    print(f"before  {before / args.n:8.1f} bytes/result  (CalcOutput, built in {before_s:.2f} s)")
+    print(f"after   {after / args.n:8.1f} bytes/result  (CalcResult, built in {after_s:.2f} s)")
+    print(f"        {before / after:.1f}x smaller")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+import json
+import platform
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+
+# Calls are timed in batches of at least this long, so timer overhead stays small even
+# for sub-microsecond functions; percentiles are over the per-call mean of each batch.
+MIN_BATCH_S = 20e-6
+DEFAULT_MIN_TIME_S = 0.5
+DEFAULT_THRESHOLD = 0.25
+BASELINE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    name: str
+    ops_per_s: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    samples: int
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        """Relative slowdown, e.g. 0.3 for 30% slower."""
+        return self.current / self.baseline - 1.0
+
+
+def _result(name: str, per_call_s: list[float], calls: int, elapsed_s: float) -> BenchResult:
+    p50, p95, p99 = np.percentile(np.array(per_call_s) * 1e6, [50, 95, 99]).tolist()
+    return BenchResult(
+        name=name,
+        ops_per_s=calls / elapsed_s,
+        p50_us=p50,
+        p95_us=p95,
+        p99_us=p99,
+        samples=len(per_call_s),
+    )
+
+
+def _batch_size(call: Callable[[], object]) -> int:
+    """Calls per timed batch: double until one batch takes MIN_BATCH_S."""
+    n = 1
+    while _call_n(call, n) < MIN_BATCH_S and n < 1 << 20:
+        n *= 2
+    return n
+
+
+def _call_n(call: Callable[[], object], n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        call()
+    return time.perf_counter() - start
+
+
+def measure(
+    name: str, fn: Callable[[], object], *, min_time_s: float = DEFAULT_MIN_TIME_S
+) -> BenchResult:
+    """Time `fn()` repeatedly for at least `min_time_s` (after a short warm-up)."""
+    _call_n(fn, 10)
+    n = _batch_size(fn)
+    samples: list[float] = []
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time_s or len(samples) < 10:
+        samples.append(_call_n(fn, n) / n)
+        calls += n
+    return _result(name, samples, calls, sum(samples) * n)
+
+
+async def ameasure(
+    name: str, fn: Callable[[], Awaitable[object]], *, min_time_s: float = DEFAULT_MIN_TIME_S
+) -> BenchResult:
+    """`measure` for coroutine functions; every call is awaited and timed on its own."""
+    for _ in range(10):
+        await fn()
+    samples: list[float] = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time_s or len(samples) < 10:
+        t = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t)
+    return _result(name, samples, len(samples), sum(samples))
+
+
+def save_baseline(results: list[BenchResult], path: str | Path) -> None:
+    data = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {r.name: asdict(r) for r in results},
+    }
+    Path(path).write_text(json.dumps(data, indent=2) + "\n")
+
+
+def load_baseline(path: str | Path) -> dict[str, BenchResult]:
+    data = json.loads(Path(path).read_text())
+    if data.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {data.get('version')!r}")
+    return {name: BenchResult(**r) for name, r in data["results"].items()}
+
+
+def compare(
+    results: list[BenchResult],
+    baseline: dict[str, BenchResult],
+    *,
+    threshold: float = DEFAULT_THRESHOLD,
+    metric: str = "p50_us",
+) -> list[Regression]:
+    """
+    Benchmarks whose `metric` latency grew by more than `threshold` (0.25 = 25%) over
+    the baseline. Benchmarks missing from the baseline are skipped.
+    """
+    regressions = []
+    for r in results:
+        base = baseline.get(r.name)
+        if base is None:
+            continue
+        before, after = getattr(base, metric), getattr(r, metric)
+        if after > before * (1.0 + threshold):
+            regressions.append(Regression(r.name, metric, before, after))
+    return regressions
+
+
+def format_table(results: list[BenchResult], baseline: dict[str, BenchResult] | None = None) -> str:
+    header = f"{'benchmark':<34} {'ops/s':>12} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10}"
+    if baseline is not None:
+        header += f" {'p50 vs base':>12}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        line = (
+            f"{r.name:<34} {r.ops_per_s:>12,.0f} {r.p50_us:>10.2f} {r.p95_us:>10.2f} "
+            f"{r.p99_us:>10.2f}"
+        )
+        if baseline is not None:
+            base = baseline.get(r.name)
+            line += f" {r.p50_us / base.p50_us - 1.0:>+12.1%}" if base else f" {'new':>12}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+async def asgi_post(app: object, path: str, body: bytes) -> tuple[int, bytes]:
+    """POST `body` as JSON straight into an ASGI app; returns (status, response body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("bench", 0),
+        "server": ("bench", 80),
+    }
+    status = 0
+    chunks: list[bytes] = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
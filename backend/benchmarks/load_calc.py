@@ -0,0 +1,207 @@
+"""
+Local load test of /api/calc against `python -m app.serve` with 1, 2, 4, ... workers.
+
+    cd backend && python -m benchmarks.load_calc [--workers 1,2,4] [--duration 5]
+
+For each worker count a server is started on a free port and driven over real HTTP by
+client processes (one per worker, each with several keep-alive connections), and the
+throughput is compared with `workers x` the single-worker rate. Clients run on the
+same machine, so scaling is only near-linear while there are spare cores for them:
+keep `2 x workers` at or below the core count.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from app.serve import available_cpus
+
+BACKEND = Path(__file__).resolve().parent.parent
+DISTINCT_BODIES = 5000
+
+
+@dataclass(frozen=True)
+class LoadResult:
+    workers: int
+    requests: int
+    errors: int
+    seconds: float
+
+    @property
+    def rps(self) -> float:
+        return self.requests / self.seconds
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, *, log: IO | None = None) -> subprocess.Popen:
+    """`python -m app.serve` on 127.0.0.1:`port`, returned once it answers /health."""
+    env = os.environ | {"ACCESS_LOG": "0", "METRICS_SPANS": "0"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port)]
+        + ["--workers", str(workers)],
+        cwd=BACKEND,
+        env=env,
+        stdout=log or subprocess.DEVNULL,
+        stderr=log or subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if asyncio.run(_request(port, b"GET", "/health", b"")) == 200:
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    stop_server(proc)
+    raise RuntimeError(f"server with {workers} workers did not start")
+
+
+def stop_server(proc: subprocess.Popen) -> int:
+    """
+    SIGTERM (graceful shutdown) and wait; returns the exit code, which is -SIGTERM after
+    a clean shutdown because uvicorn re-raises the signal it handled.
+    """
+    proc.send_signal(signal.SIGTERM)
+    try:
+        return proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        return proc.wait()
+
+
+def _http(method: bytes, path: str, body: bytes) -> bytes:
+    return (
+        method
+        + f" {path} HTTP/1.1\r\nhost: localhost\r\ncontent-type: application/json\r\n".encode()
+        + f"content-length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+
+
+async def _response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _request(port: int, method: bytes, path: str, body: bytes) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(_http(method, path, body))
+        return await _response(reader)
+    finally:
+        writer.close()
+
+
+def payloads(seed: int) -> list[bytes]:
+    return [
+        json.dumps(
+            {
+                "sex": "female" if i % 2 else "male",
+                "age_years": 20 + i % 60,
+                "height_cm": 150 + seed % 50,
+                "weight_kg": 60 + i / 100,
+                "activity_level": "moderate",
+                "goal": "lose",
+            }
+        ).encode()
+        for i in range(DISTINCT_BODIES)
+    ]
+
+
+async def _connection(port: int, bodies: list[bytes], offset: int, until: float) -> list[int]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    ok = errors = 0
+    i = offset
+    try:
+        while time.monotonic() < until:
+            writer.write(_http(b"POST", "/api/calc", bodies[i % len(bodies)]))
+            if await _response(reader) == 200:
+                ok += 1
+            else:
+                errors += 1
+            i += 1
+    finally:
+        writer.close()
+    return [ok, errors]
+
+
+async def _client(port: int, seed: int, connections: int, until: float) -> list[int]:
+    bodies = payloads(seed)
+    counts = await asyncio.gather(
+        *(_connection(port, bodies, c * 997, until) for c in range(connections))
+    )
+    return [sum(c[0] for c in counts), sum(c[1] for c in counts)]
+
+
+def _client_process(args: tuple[int, int, int, float]) -> list[int]:
+    return asyncio.run(_client(*args))
+
+
+def load(port: int, *, clients: int, connections: int, duration_s: float) -> tuple[int, int]:
+    """(ok, errors) after `clients` processes keep `connections` requests each in flight."""
+    until = time.monotonic() + duration_s
+    with multiprocessing.Pool(clients) as pool:
+        counts = pool.map(
+            _client_process, [(port, seed, connections, until) for seed in range(clients)]
+        )
+    return sum(c[0] for c in counts), sum(c[1] for c in counts)
+
+
+def run(workers: int, *, duration_s: float, connections: int) -> LoadResult:
+    port = free_port()
+    proc = start_server(workers, port)
+    try:
+        load(port, clients=workers, connections=connections, duration_s=min(1.0, duration_s))
+        start = time.monotonic()
+        ok, errors = load(port, clients=workers, connections=connections, duration_s=duration_s)
+        return LoadResult(workers, ok, errors, time.monotonic() - start)
+    finally:
+        stop_server(proc)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    default_workers = [n for n in (1, 2, 4, 8, 16) if n == 1 or 2 * n <= available_cpus()]
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)))
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per worker count")
+    parser.add_argument("--connections", type=int, default=8, help="per client process")
+    args = parser.parse_args(argv)
+
+    results = [
+        run(int(n), duration_s=args.duration, connections=args.connections)
+        for n in args.workers.split(",")
+    ]
+    base = results[0].rps / results[0].workers
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10} {'errors':>7}")
+    for r in results:
+        speedup = r.rps / base
+        print(
+            f"{r.workers:>7} {r.rps:>10.0f} {speedup:>7.2f}x "
+            f"{speedup / r.workers:>10.0%} {r.errors:>7}"
+        )
+    return 1 if any(r.errors for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,251 @@
+"""
+Benchmarks for the formulas, the calculation pipeline, prompt building and the /api
+routes. Each entry is (name, factory); the factory does any setup and returns the
+function to time, so `-k` filtering skips the setup of unselected benchmarks.
+"""
+
+import itertools
+import json
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from app.cache import LRUBackend, ResultCache
+from app.calc import calculate_all, calculate_values
+from app.formulas.bmi import calculate_bmi
+from app.formulas.bmr import BMR_KCAL_PER_KG, calculate_bmr_mifflin_st_jeor
+from app.formulas.bodyfat import estimate_body_fat_percent_from_bmi
+from app.formulas.calories import calories_target_from_goal
+from app.formulas.factors import FACTORS, evaluate
+from app.formulas.ffmi import calculate_ffmi
+from app.formulas.forecast import forecast_adaptive, forecast_linear, forecast_weight_kg
+from app.formulas.macros import calculate_keto_macros
+from app.formulas.strategies import fixed_keto
+from app.formulas.tdee import calculate_tdee
+from app.main import app
+from app.models import (
+    ActivityLevel,
+    Goal,
+    MealPlanPreferences,
+    Sex,
+    UnitSystem,
+    UserInput,
+)
+from app.services import llm_mealplan
+from app.services.llm_mealplan import _extract_json, build_prompt
+from app.services.local_mealplan import generate_local_meal_plan
+from app.units import normalize_inputs
+from benchmarks.harness import asgi_post
+
+USER = UserInput(
+    sex=Sex.female,
+    age_years=38,
+    height_cm=168,
+    weight_kg=72,
+    activity_level=ActivityLevel.moderate,
+    goal=Goal.lose,
+    mealplan=MealPlanPreferences(days=7, meals_per_day=6),
+)
+IMPERIAL_USER = UserInput(
+    unit_system=UnitSystem.imperial,
+    sex=Sex.male,
+    age_years=45,
+    height_in=70,
+    weight_lb=210,
+    activity_level=ActivityLevel.light,
+)
+
+# Distinct request bodies, so the cached routes run their miss path; more than the
+# default cache sizes so entries are evicted before they repeat.
+DISTINCT_BODIES = 5000
+
+Sync = Callable[[], object]
+Bench = tuple[str, Callable[[], Sync]]
+
+
+def _bodies(**overrides: object) -> Iterator[bytes]:
+    payload = USER.model_dump(mode="json") | overrides
+    bodies = [
+        json.dumps(payload | {"weight_kg": 60 + i / 100}).encode() for i in range(DISTINCT_BODIES)
+    ]
+    return itertools.cycle(bodies)
+
+
+def _formula_benchmarks() -> list[Bench]:
+    v = calculate_values(USER)
+    return [
+        ("formulas.bmi", lambda: lambda: calculate_bmi(weight_kg=72, height_cm=168)),
+        (
+            "formulas.bmr",
+            lambda: (
+                lambda: calculate_bmr_mifflin_st_jeor(
+                    sex=Sex.female, age_years=38, height_cm=168, weight_kg=72
+                )
+            ),
+        ),
+        (
+            "formulas.tdee",
+            lambda: lambda: calculate_tdee(bmr=v.bmr, activity_level=ActivityLevel.moderate),
+        ),
+        (
+            "formulas.bodyfat",
+            lambda: (
+                lambda: estimate_body_fat_percent_from_bmi(bmi=v.bmi, age_years=38, sex=Sex.female)
+            ),
+        ),
+        (
+            "formulas.ffmi",
+            lambda: (
+                lambda: calculate_ffmi(
+                    weight_kg=72, height_cm=168, body_fat_percent=v.body_fat_percent_estimate
+                )
+            ),
+        ),
+        (
+            "formulas.calories",
+            lambda: lambda: calories_target_from_goal(tdee=v.tdee, goal=Goal.lose),
+        ),
+        (
+            "formulas.macros",
+            lambda: (
+                lambda: calculate_keto_macros(
+                    calories_total=v.calories_total, weight_kg=72, goal=Goal.lose
+                )
+            ),
+        ),
+        (
+            "formulas.factors.evaluate",
+            lambda: (
+                lambda: evaluate(
+                    FACTORS[Sex.female, ActivityLevel.moderate, Goal.lose],
+                    fixed_keto,
+                    age_years=38,
+                    height_cm=168,
+                    weight_kg=72,
+                    net_carbs_g=25.0,
+                    protein_g_per_kg=1.8,
+                )
+            ),
+        ),
+        (
+            "formulas.forecast_linear[24]",
+            lambda: (
+                lambda: list(
+                    forecast_linear(
+                        start_weight_kg=72, tdee=v.tdee, calories_target=v.calories_total
+                    )
+                )
+            ),
+        ),
+        (
+            "formulas.forecast_adaptive[24]",
+            lambda: (
+                lambda: list(
+                    forecast_adaptive(
+                        start_weight_kg=72,
+                        tdee=v.tdee,
+                        tdee_per_kg=calculate_tdee(
+                            bmr=BMR_KCAL_PER_KG, activity_level=ActivityLevel.moderate
+                        ),
+                        calories_target=v.calories_total,
+                    )
+                )
+            ),
+        ),
+        (
+            "formulas.forecast_weight_kg[520]",
+            lambda: (
+                lambda: forecast_weight_kg(
+                    start_weight_kg=72, tdee=v.tdee, calories_target=v.calories_total, weeks=520
+                )
+            ),
+        ),
+    ]
+
+
+def _pipeline_benchmarks() -> list[Bench]:
+    calc = calculate_all(USER)
+    return [
+        ("units.normalize_inputs[metric]", lambda: lambda: normalize_inputs(USER)),
+        ("units.normalize_inputs[imperial]", lambda: lambda: normalize_inputs(IMPERIAL_USER)),
+        ("calc.calculate_all", lambda: lambda: calculate_all(USER)),
+        ("calc.calculate_values", lambda: lambda: calculate_values(USER)),
+        ("prompt.build_prompt[7x6]", lambda: lambda: build_prompt(USER, calc)),
+        ("prompt.build_prompt[chunk]", lambda: lambda: build_prompt(USER, calc, days=range(3, 5))),
+        ("llm._extract_json[7x6 fenced]", _extract_json_bench),
+    ]
+
+
+def _llm_text() -> str:
+    """A 7-day, 6-meal plan the way Gemini sometimes sends it: fenced, with chatter."""
+    plan = generate_local_meal_plan(USER, calculate_all(USER)).model_dump_json()
+    return f"Here is your keto plan:\n```json\n{plan}\n```\nEnjoy!"
+
+
+def _extract_json_bench() -> Sync:
+    text = _llm_text()
+    return lambda: _extract_json(text)
+
+
+class _FakeModels:
+    """Stands in for `genai.Client().aio.models`: answers every prompt with `text`."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    async def generate_content(self, *, model, contents, config):
+        return SimpleNamespace(parsed=None, candidates=[], text=self.text)
+
+
+@contextmanager
+def fake_llm() -> Iterator[None]:
+    """Route meal plans to an instant fake Gemini client with an empty cache."""
+    models = _FakeModels(_llm_text())
+    patched = {
+        "_client": SimpleNamespace(models=models, aio=SimpleNamespace(models=models)),
+        "_limiter": None,
+        "_bucket": None,
+        "mealplan_cache": ResultCache(LRUBackend(256)),
+    }
+    saved = {name: getattr(llm_mealplan, name) for name in patched}
+    for name, value in patched.items():
+        setattr(llm_mealplan, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(llm_mealplan, name, value)
+
+
+def _route(path: str, bodies: Iterator[bytes]) -> Callable[[], object]:
+    async def call() -> None:
+        status, _ = await asgi_post(app, path, next(bodies))
+        if status != 200:
+            raise RuntimeError(f"{path} returned {status}")
+
+    return call
+
+
+def _route_benchmarks() -> list[Bench]:
+    repeat = json.dumps(USER.model_dump(mode="json")).encode()
+    # 2 goals x 5 activity levels x 10 protein x 10 net carb values.
+    sweep = json.dumps(
+        {
+            "user": USER.model_dump(mode="json"),
+            "goals": ["lose", "maintain"],
+            "activity_levels": [a.value for a in ActivityLevel],
+            "protein_g_per_kg": {"start": 1.2, "stop": 2.1, "step": 0.1},
+            "net_carbs_g": {"start": 20, "stop": 29, "step": 1},
+        }
+    ).encode()
+    return [
+        ("api./api/calc[miss]", lambda: _route("/api/calc", _bodies())),
+        ("api./api/calc[hit]", lambda: _route("/api/calc", itertools.repeat(repeat))),
+        ("api./api/calc/sweep[1000]", lambda: _route("/api/calc/sweep", itertools.repeat(sweep))),
+        ("api./api/mealplan[fake llm]", lambda: _route("/api/mealplan", _bodies())),
+    ]
+
+
+def benchmarks() -> list[Bench]:
+    """Every benchmark in report order; route benchmarks return coroutine functions."""
+    return _formula_benchmarks() + _pipeline_benchmarks() + _route_benchmarks()
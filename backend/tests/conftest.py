@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.cache import LRUBackend, ResultCache
+from app.models_mealplan import DayPlan, Meal, MealItem, MealPlanResponse
+from app.services import llm_mealplan
+
+
+def make_plan(days: int = 1) -> MealPlanResponse:
+    meal = Meal(
+        meal_name="lunch",
+        items=[MealItem(name="chicken breast", grams=200)],
+        protein_g=62,
+        fat_g=7,
+        net_carbs_g=0,
+        calories=330,
+    )
+    return MealPlanResponse(
+        generated_mealplan=[DayPlan(meals=[meal]) for _ in range(days)],
+        shopping_list=["chicken breast"],
+        assumptions=["test plan"],
+    )
+
+
+class FakeModels:
+    """Stands in for `genai.Client().aio.models`."""
+
+    def __init__(self, plan: MealPlanResponse, delay_s: float = 0.0) -> None:
+        self.plan = plan
+        self.delay_s = delay_s
+        self.error: Exception | None = None
+        self.calls: list[str] = []
+
+    async def generate_content(self, *, model, contents, config):
+        self.calls.append(contents)
+        await asyncio.sleep(self.delay_s)
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(parsed=self.plan, candidates=[], text=None)
+
+    async def generate_content_stream(self, *, model, contents, config):
+        self.calls.append(contents)
+        text = self.plan.model_dump_json()
+
+        async def chunks():
+            for start in range(0, len(text), 40):
+                await asyncio.sleep(self.delay_s)
+                if self.error is not None:
+                    raise self.error
+                yield SimpleNamespace(text=text[start : start + 40], candidates=[])
+
+        return chunks()
+
+
+class FakeClient:
+    def __init__(self, plan: MealPlanResponse | None = None, delay_s: float = 0.0) -> None:
+        self.models = FakeModels(plan or make_plan(), delay_s)
+        self.aio = SimpleNamespace(models=self.models)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch) -> FakeClient:
+    """Route meal plan generation to a local fake client with an empty cache."""
+    client = FakeClient()
+    monkeypatch.setattr(llm_mealplan, "_client", client)
+    monkeypatch.setattr(llm_mealplan, "_limiter", None)
+    monkeypatch.setattr(llm_mealplan, "_bucket", None)
+    monkeypatch.setattr(llm_mealplan, "_stats", llm_mealplan.LLMStats())
+    # Tests get the plan exactly as the fake LLM returned it unless they enable this.
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_VERIFY", False)
+    monkeypatch.setattr(llm_mealplan, "mealplan_cache", ResultCache(LRUBackend(64)))
+    return client
@@ -0,0 +1,179 @@
+import subprocess
+import sys
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import analytics
+from app.analytics import ResultStore
+from app.batch import calculate_batch
+from app.calc import calculate_all
+from app.main import app
+from app.models import (
+    ActivityLevel,
+    AnalyticsQuery,
+    ForecastModel,
+    Goal,
+    MacroStrategy,
+    Sex,
+    UserInput,
+)
+
+client = TestClient(app)
+
+
+def _users() -> list[UserInput]:
+    return [
+        UserInput(
+            sex=sex,
+            age_years=age,
+            goal=goal,
+            height_cm=150 + age,
+            weight_kg=60 + age / 2,
+            activity_level=activity,
+            forecast_model=model,
+        )
+        for sex, goal, activity, age, model in product(
+            Sex, Goal, ActivityLevel, (18, 33, 47, 70), ForecastModel
+        )
+    ]
+
+
+@pytest.fixture
+def store(tmp_path) -> ResultStore:
+    store = ResultStore(tmp_path / "results")
+    users = _users()
+    store.append_batch(users, calculate_batch(users))
+    return store
+
+
+def test_grouped_aggregates_match_the_scalar_results(store):
+    out = store.aggregate(
+        AnalyticsQuery(group_by=["goal", "sex"], metrics=["tdee", "weight_change_kg"], bins=8)
+    )
+
+    assert out.rows == len(_users())
+    assert [(g.key["goal"], g.key["sex"]) for g in out.groups] == [
+        (goal.value, sex.value) for goal, sex in product(Goal, Sex)
+    ]
+    for group in out.groups:
+        calcs = [
+            calculate_all(u)
+            for u in _users()
+            if u.goal.value == group.key["goal"] and u.sex.value == group.key["sex"]
+        ]
+        tdee = np.array([c.tdee for c in calcs])
+        change = np.array([c.forecast[-1][1] - c.forecast[0][1] for c in calcs])
+        assert group.count == len(calcs)
+        assert group.metrics["tdee"].mean == pytest.approx(tdee.mean())
+        assert group.metrics["weight_change_kg"].mean == pytest.approx(change.mean())
+        expected = np.percentile(tdee, [5, 25, 50, 75, 95])
+        assert list(group.metrics["tdee"].percentiles.values()) == pytest.approx(expected)
+        assert list(group.metrics["tdee"].percentiles) == ["p5", "p25", "p50", "p75", "p95"]
+        assert sum(group.metrics["tdee"].histogram) == group.count
+    assert len(out.bin_edges["tdee"]) == 9
+
+
+def test_filters_and_macro_split(store):
+    out = store.aggregate(
+        AnalyticsQuery(
+            metrics=["protein_pct", "fat_pct", "net_carbs_pct"],
+            where={"goal": "lose", "activity_level": "athlete"},
+        )
+    )
+
+    (group,) = out.groups
+    assert group.key == {}
+    assert group.count == out.rows == 2 * 4 * 2
+    total = sum(group.metrics[m].mean for m in ("protein_pct", "fat_pct", "net_carbs_pct"))
+    assert total == pytest.approx(100.0)
+
+    with pytest.raises(ValueError, match="Unknown goal"):
+        store.aggregate(AnalyticsQuery(where={"goal": "bulk"}))
+
+
+def test_empty_selection_and_interrupted_append(tmp_path):
+    store = ResultStore(tmp_path)
+    assert store.aggregate(AnalyticsQuery()).groups == []
+
+    user = UserInput(
+        sex="male",
+        age_years=30,
+        height_cm=180,
+        weight_kg=80,
+        activity_level="light",
+        macro_strategy=MacroStrategy.lean_mass,
+    )
+    store.append_batch([user], calculate_batch([user]))
+    with open(tmp_path / "bmi.col", "ab") as f:
+        f.write(b"partial")
+    store.append_batch([user], calculate_batch([user]))
+
+    assert len(store) == 2
+    assert store.column("bmi").tolist() == [calculate_all(user).bmi] * 2
+    assert store.column("macro_strategy").tolist() == [2, 2]
+
+
+# Appends `batches` batches of 7 rows, all with the weight given on the command line.
+_WRITER = """
+import sys
+from app.analytics import ResultStore
+from app.batch import calculate_batch
+from app.models import UserInput
+
+directory, weight, batches = sys.argv[1], float(sys.argv[2]), int(sys.argv[3])
+users = [
+    UserInput(sex="male", age_years=30, height_cm=180, weight_kg=weight, activity_level="light")
+] * 7
+store = ResultStore(directory)
+for _ in range(batches):
+    store.append_batch(users, calculate_batch(users))
+"""
+
+
+def test_concurrent_writer_processes_keep_every_row(tmp_path):
+    weights = [60.0, 70.0, 80.0, 90.0]
+    writers = [
+        subprocess.Popen(
+            [sys.executable, "-c", _WRITER, str(tmp_path), str(w), "40"],
+            cwd=Path(__file__).resolve().parents[1],
+        )
+        for w in weights
+    ]
+    assert [p.wait(timeout=120) for p in writers] == [0] * len(weights)
+
+    store = ResultStore(tmp_path)
+    weight = store.column("weight_kg")
+    assert len(store) == len(weights) * 40 * 7
+    assert sorted(np.unique(weight, return_counts=True)[1].tolist()) == [40 * 7] * len(weights)
+    # Rows are intact across columns: each weight keeps its own BMI.
+    assert np.array_equal(store.column("bmi"), weight / 1.8**2)
+
+
+def test_batch_route_records_and_analytics_route_aggregates(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics, "_store", None)
+    monkeypatch.setattr(analytics, "ANALYTICS_DIR", None)
+    assert client.post("/api/analytics/calc", json={}).status_code == 503
+
+    monkeypatch.setattr(analytics, "_store", ResultStore(tmp_path))
+    users = [u.model_dump(mode="json") for u in _users()[:12]]
+    assert (
+        client.post("/api/calc/batch", json=users + [users[0] | {"age_years": 16}]).status_code
+        == 200
+    )
+
+    r = client.post(
+        "/api/analytics/calc", json={"group_by": ["activity_level"], "percentiles": [50]}
+    )
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["rows"] == 12
+    assert [(g["key"]["activity_level"], g["count"]) for g in body["groups"]] == [
+        ("sedentary", 8),
+        ("light", 4),
+    ]
+    assert set(body["groups"][0]["metrics"]) == {"bmi", "tdee", "weight_change_kg"}
@@ -27,3 +27,21 @@ def test_calc_ok():
     assert "bmi" in data
     assert "macros" in data
     assert "forecast" in data
+
+
+def test_calc_forecast_weeks_param():
+    payload = {
+        "sex": "female",
+        "age_years": 30,
+        "height_cm": 165,
+        "weight_kg": 70,
+        "activity_level": "light",
+        "goal": "lose",
+        "forecast_weeks": 156,
+    }
+    r = client.post("/api/calc", json=payload)
+    assert r.status_code == 200
+    forecast = r.json()["forecast"]
+    assert len(forecast) == 157
+    assert forecast[0] == {"week": 0, "weight_kg": 70.0}
+    assert forecast[-1]["weight_kg"] < 70.0
@@ -0,0 +1,131 @@
+from itertools import product
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.batch import calculate_batch, project_adaptive
+from app.calc import calculate_all, calculate_values
+from app.main import app
+from app.models import ActivityLevel, ForecastModel, Goal, Sex, UnitSystem, UserInput
+
+client = TestClient(app)
+
+
+def _users() -> list[UserInput]:
+    users = []
+    for sex, goal, activity, age in product(Sex, Goal, ActivityLevel, (18, 25, 47, 90)):
+        users.append(
+            UserInput(
+                sex=sex,
+                age_years=age,
+                goal=goal,
+                height_cm=150 + age,
+                weight_kg=55.5 + age / 3,
+                activity_level=activity,
+            )
+        )
+        users.append(
+            UserInput(
+                sex=sex,
+                age_years=age,
+                goal=goal,
+                height_cm=190 - age / 2,
+                weight_kg=99.9,
+                activity_level=activity,
+                forecast_model=ForecastModel.adaptive,
+                forecast_weeks=age,
+            )
+        )
+        users.append(
+            UserInput(
+                unit_system=UnitSystem.imperial,
+                sex=sex,
+                age_years=age,
+                goal=goal,
+                height_in=70.8661,
+                weight_lb=176.3698 + age,
+                activity_level=activity,
+            )
+        )
+    return users
+
+
+def test_batch_matches_scalar_exactly():
+    users = _users()
+    result = calculate_batch(users, forecast_weeks=24)
+
+    assert result.outputs() == [calculate_all(u, forecast_weeks=24) for u in users]
+
+
+def test_batch_results_pack_the_same_values_as_calculate_values():
+    users = _users()
+    result = calculate_batch(users)
+
+    expected = [calculate_values(u) for u in users]
+    assert result.results() == expected
+    assert [result.result(i) for i in range(len(users))] == expected
+
+
+def test_batch_reports_row_errors_without_aborting():
+    ok = UserInput(sex=Sex.male, age_years=25, height_cm=180, weight_kg=80, activity_level="light")
+    minor = ok.model_copy(update={"age_years": 17})
+    missing = UserInput(sex=Sex.male, age_years=25, activity_level=ActivityLevel.light)
+    too_low = UserInput(
+        sex=Sex.female,
+        age_years=100,
+        goal=Goal.lose,
+        height_cm=50,
+        weight_kg=100,
+        activity_level=ActivityLevel.sedentary,
+    )
+
+    result = calculate_batch([ok, minor, missing, too_low])
+
+    assert result.errors == [
+        None,
+        "BMR formula not supported for minors (<18) yet.",
+        "For metric input, height_cm and weight_kg are required.",
+        "Calories too low for keto macro targets.",
+    ]
+    assert result.output(0) == calculate_all(ok)
+    assert result.output(1) is None
+
+
+def test_api_calc_batch():
+    payload = [
+        {
+            "sex": "male",
+            "age_years": 25,
+            "height_cm": 180,
+            "weight_kg": 80,
+            "activity_level": "moderate",
+        },
+        {
+            "sex": "female",
+            "age_years": 16,
+            "height_cm": 160,
+            "weight_kg": 55,
+            "activity_level": "light",
+        },
+    ]
+    r = client.post("/api/calc/batch", json=payload)
+    assert r.status_code == 200
+    rows = r.json()
+    assert [row["index"] for row in rows] == [0, 1]
+    assert rows[0]["error"] is None
+    assert rows[0]["result"]["bmi"] > 0
+    assert rows[1]["result"] is None
+    assert "minors" in rows[1]["error"]
+
+
+def test_project_adaptive_matches_scalar_forecast():
+    users = [u.model_copy(update={"forecast_model": ForecastModel.adaptive}) for u in _users()[:40]]
+    result = calculate_batch(users)
+
+    weekly = project_adaptive(result, days=7 * 18, step_days=7, dtype=np.float64)
+    daily = project_adaptive(result, days=5 * 365)
+
+    assert daily.shape == (40, 5 * 365 + 1)
+    for i, user in enumerate(users):
+        fc = calculate_all(user, forecast_weeks=18).forecast
+        np.testing.assert_allclose(weekly[i], [kg for _, kg in fc], rtol=1e-12)
@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks.__main__ import main, run
+from benchmarks.harness import BenchResult, compare, load_baseline, measure, save_baseline
+
+
+def _result(name: str, p50_us: float) -> BenchResult:
+    return BenchResult(
+        name=name, ops_per_s=1e6 / p50_us, p50_us=p50_us, p95_us=p50_us, p99_us=p50_us, samples=10
+    )
+
+
+def test_measure_reports_ordered_percentiles():
+    r = measure("sum", lambda: sum(range(100)), min_time_s=0.01)
+
+    assert r.samples >= 10
+    assert 0 < r.p50_us <= r.p95_us <= r.p99_us
+    assert r.ops_per_s > 0
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = {"a": _result("a", 10.0), "b": _result("b", 10.0)}
+    results = [_result("a", 12.0), _result("b", 13.0), _result("new", 99.0)]
+
+    regressions = compare(results, baseline, threshold=0.25)
+
+    assert [(r.name, r.change) for r in regressions] == [("b", pytest.approx(0.3))]
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline([_result("a", 10.0)], path)
+
+    assert load_baseline(path) == {"a": _result("a", 10.0)}
+
+
+def test_suite_runs_routes_with_fake_llm():
+    results = run("api.", min_time_s=0.01)
+
+    assert [r.name for r in results] == [
+        "api./api/calc[miss]",
+        "api./api/calc[hit]",
+        "api./api/calc/sweep[1000]",
+        "api./api/mealplan[fake llm]",
+    ]
+
+
+def test_main_fails_on_regression(tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    save_baseline([_result("formulas.bmi", 1e-6)], path)
+
+    assert main(["-k", "formulas.bmi", "--min-time", "0.01", "--baseline", str(path)]) == 1
+    assert "REGRESSION formulas.bmi" in capsys.readouterr().err
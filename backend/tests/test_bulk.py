@@ -0,0 +1,83 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.bulk import iter_calc
+from app.calc import calculate_all
+from app.main import app
+from app.models import UserInput
+
+client = TestClient(app)
+
+ROW = {
+    "sex": "male",
+    "age_years": 25,
+    "height_cm": 180,
+    "weight_kg": 80,
+    "activity_level": "moderate",
+}
+
+CSV = (
+    "sex,age_years,unit_system,height_in,weight_lb,activity_level,dietary.vegan\n"
+    "female,30,imperial,65,150,light,true\n"
+    "male,16,imperial,70,170,light,\n"
+)
+
+
+def test_iter_calc_ndjson_one_output_per_record_across_chunks():
+    lines = [json.dumps(ROW), "not json", "", json.dumps({**ROW, "age_years": 17}), "{}"]
+
+    out = "".join(iter_calc(lines, chunk_size=2)).splitlines()
+
+    assert len(out) == 4
+    assert json.loads(out[0]) == calculate_all(UserInput(**ROW)).model_dump()
+    assert json.loads(out[1])["row"] == 2
+    assert "Invalid JSON" in json.loads(out[1])["error"]
+    assert "minors" in json.loads(out[2])["error"]
+    assert json.loads(out[3])["row"] == 4
+
+
+def test_iter_calc_csv_keeps_header_across_chunks():
+    out = "".join(iter_calc(CSV.splitlines(), fmt="csv", chunk_size=1)).splitlines()
+
+    assert len(out) == 2
+    assert json.loads(out[0])["bmi"] > 0
+    assert json.loads(out[1]) == {
+        "row": 2,
+        "error": "BMR formula not supported for minors (<18) yet.",
+    }
+
+
+def test_api_calc_stream_ndjson():
+    body = "\n".join(json.dumps(ROW) for _ in range(3)).encode()
+    r = client.post(
+        "/api/calc/stream", content=body, headers={"content-type": "application/x-ndjson"}
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 3
+    assert all("macros" in row for row in rows)
+
+
+def test_api_calc_stream_csv():
+    r = client.post("/api/calc/stream", content=CSV.encode(), headers={"content-type": "text/csv"})
+    assert r.status_code == 200
+    assert len(r.text.splitlines()) == 2
+
+
+def test_cli(tmp_path: Path):
+    src = tmp_path / "users.csv"
+    src.write_text(CSV)
+    dst = tmp_path / "out.ndjson"
+
+    subprocess.run(
+        [sys.executable, "-m", "app.calc", str(src), "-o", str(dst)],
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+
+    assert len(dst.read_text().splitlines()) == 2
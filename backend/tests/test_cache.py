@@ -0,0 +1,111 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.cache import LRUBackend, RedisBackend, ResultCache, calc_cache, calc_cache_key
+from app.main import app
+from app.models import ActivityLevel, DietaryPreferences, Goal, Sex, UserInput
+
+client = TestClient(app)
+
+USER = UserInput(
+    sex=Sex.male, age_years=25, height_cm=180, weight_kg=80, activity_level=ActivityLevel.light
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUBackend(2)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    assert backend.get("a") == b"1"
+    backend.set("c", b"3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+    assert backend.evictions == 1
+
+
+def test_result_cache_counts_hits_and_misses():
+    cache = ResultCache(LRUBackend(8))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b"out"
+
+    assert cache.get_or_compute("k", compute) == b"out"
+    assert cache.get_or_compute("k", compute) == b"out"
+
+    assert len(calls) == 1
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "coalesced": 0,
+        "evictions": 0,
+        "size": 1,
+        "hit_rate": 0.5,
+    }
+
+
+def test_result_cache_with_redis_backend():
+    redis = FakeRedis()
+    cache = ResultCache(RedisBackend(redis, prefix="calc:"))
+    cache.get_or_compute("k", lambda: b"out")
+
+    assert redis.data == {"calc:k": b"out"}
+    assert cache.get_or_compute("k", lambda: b"other") == b"out"
+
+
+def test_cache_key_ignores_fields_calc_does_not_read():
+    vegan = USER.model_copy(update={"dietary": DietaryPreferences(vegan=True)})
+    losing = USER.model_copy(update={"goal": Goal.lose})
+
+    assert calc_cache_key(vegan) == calc_cache_key(USER)
+    assert calc_cache_key(losing) != calc_cache_key(USER)
+
+
+def test_api_calc_serves_repeat_requests_from_cache():
+    payload = USER.model_dump(mode="json") | {"age_years": 61}
+    hits = calc_cache.hits
+
+    first = client.post("/api/calc", json=payload)
+    second = client.post("/api/calc", json=payload)
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert calc_cache.hits == hits + 1
+    assert client.get("/api/calc/cache").json()["hits"] == calc_cache.hits
+
+
+def test_api_calc_errors_are_not_cached():
+    payload = USER.model_dump(mode="json") | {"age_years": 16}
+    assert client.post("/api/calc", json=payload).status_code == 400
+    assert client.post("/api/calc", json=payload).status_code == 400
+
+
+def test_api_calc_reads_the_cache_backend_off_the_event_loop(monkeypatch):
+    on_loop = []
+
+    class RecordingBackend(LRUBackend):
+        def get(self, key):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return super().get(key)
+
+    monkeypatch.setattr(calc_cache, "backend", RecordingBackend(8))
+    assert client.post("/api/calc", json=USER.model_dump(mode="json")).status_code == 200
+    assert on_loop == [False]
@@ -1,5 +1,9 @@
-from app.calc import calculate_all
-from app.models import ActivityLevel, Goal, Sex, UnitSystem, UserInput
+import math
+
+import pytest
+
+from app.calc import CalcResult, calculate_all, calculate_values
+from app.models import ActivityLevel, ForecastModel, Goal, Sex, UnitSystem, UserInput
 
 
 def test_calculate_all_happy_path_metric():
@@ -19,3 +23,35 @@ def test_calculate_all_happy_path_metric():
     assert out.tdee > 0
     assert out.macros.calories_total > 0
     assert len(out.forecast) == 5
+
+
+def test_calc_result_is_one_slotted_array():
+    user = UserInput(
+        sex=Sex.female,
+        age_years=41,
+        height_cm=165,
+        weight_kg=70,
+        activity_level=ActivityLevel.light,
+        goal=Goal.lose,
+        forecast_model=ForecastModel.adaptive,
+    )
+    result = calculate_values(user)
+
+    assert not hasattr(result, "__dict__")
+    assert len(result.values) == len(CalcResult.SCALARS) + len(CalcResult.FORECAST)
+    assert result.to_output() == calculate_all(user)
+    assert list(result.forecast) == list(calculate_all(user).forecast)
+    assert result.tdee == result.values[2]
+
+
+def test_calc_result_stores_none_as_nan():
+    forecast = calculate_values(
+        UserInput(sex=Sex.male, age_years=30, height_cm=180, weight_kg=80, activity_level="light")
+    ).forecast
+    result = CalcResult(25.0, 1800.0, 2200.0, None, None, 2000.0, 150.0, 140.0, 20.0, forecast)
+
+    assert math.isnan(result.values[3])
+    assert result.body_fat_percent_estimate is None and result.ffmi is None
+    assert result.to_output().body_fat_percent_estimate is None
+    with pytest.raises(TypeError, match="Unsupported forecast"):
+        CalcResult(25.0, 1800.0, 2200.0, None, None, 2000.0, 150.0, 140.0, 20.0, [(0, 80.0)])
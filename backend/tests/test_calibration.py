@@ -0,0 +1,119 @@
+import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import progress
+from app.calibration import calibrate
+from app.main import app
+from app.store import SQLiteStore
+
+client = TestClient(app)
+
+
+def _series(tdee, calories, kcal_per_kg, days, w0=90.0, noise=0.0, seed=0):
+    """Weights following the energy-balance model for per-interval `calories`."""
+    eaten = np.concatenate([[0.0], np.cumsum(calories[1:] * np.diff(days))])
+    w = w0 + (eaten - tdee * days) / kcal_per_kg
+    return w + np.random.default_rng(seed).normal(0.0, noise, len(days))
+
+
+def test_recovers_each_users_tdee_in_one_padded_pass():
+    tdees = [2100.0, 2500.0, 1800.0]
+    lengths = [8, 5, 12]
+    days = np.full((3, 12), np.nan)
+    weights = np.full((3, 12), np.nan)
+    for i, (tdee, m) in enumerate(zip(tdees, lengths, strict=True)):
+        t = np.arange(m) * 7.0
+        days[i, :m] = t
+        weights[i, :m] = _series(tdee, np.full(m, 1700.0), 7700.0, t, noise=0.05, seed=i)
+
+    result = calibrate(days, weights, np.full((3, 1), 1700.0))
+
+    assert result.errors == [None, None, None]
+    assert result.tdee == pytest.approx(tdees, rel=0.05)
+    assert list(result.points) == lengths
+    assert not result.energy_density_fitted.any()
+    assert (result.rmse_kg < 0.1).all()
+
+
+def test_fits_energy_density_when_intake_changes():
+    t = np.arange(0.0, 84.0, 3.0)
+    calories = np.where(t < 42, 1500.0, 2300.0)
+    w = _series(2200.0, calories, 5000.0, t)
+
+    result = calibrate(t[None, :], w[None, :], calories[None, :], fit_energy_density=True)
+
+    assert result.energy_density_fitted[0]
+    assert result.kcal_per_kg[0] == pytest.approx(5000.0)
+    assert result.tdee[0] == pytest.approx(2200.0)
+
+
+def test_constant_intake_keeps_the_default_energy_density():
+    t = np.arange(0.0, 60.0, 7.0)
+    w = _series(2000.0, np.full(len(t), 1600.0), 7700.0, t)
+
+    result = calibrate(t[None, :], w[None, :], 1600.0, fit_energy_density=True)
+
+    assert not result.energy_density_fitted[0]
+    assert result.kcal_per_kg[0] == 7700.0
+    assert result.tdee[0] == pytest.approx(2000.0)
+
+
+def test_short_or_impossible_series_get_errors():
+    days = np.array([[0.0, 7.0, np.nan], [0.0, 3.0, 6.0], [0.0, 14.0, 28.0]])
+    weights = np.array([[80.0, 79.0, np.nan], [80.0, 79.0, 78.0], [80.0, 95.0, 110.0]])
+
+    result = calibrate(days, weights, 1000.0)
+
+    assert "weigh-ins" in result.errors[0] and "weigh-ins" in result.errors[1]
+    assert result.errors[2] == "Calibrated TDEE is not positive."
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = SQLiteStore(":memory:")
+    monkeypatch.setattr(progress, "_store", store)
+    yield store
+    store.close()
+
+
+def test_calibrating_the_store_feeds_the_forecast(store):
+    start = datetime.date(2026, 3, 2)
+    user = {
+        "sex": "male",
+        "age_years": 45,
+        "height_cm": 180,
+        "weight_kg": 100,
+        "activity_level": "moderate",
+        "goal": "lose",
+    }
+    for user_id in ("slow", "new"):
+        r = client.put(f"/api/users/{user_id}", params={"start_date": start}, json=user)
+        assert r.status_code == 200
+    # Losing 0.2 kg/week, far less than the ~0.6 kg/week the formulas predict.
+    weighins = [
+        {"date": (start + datetime.timedelta(weeks=k)).isoformat(), "weight_kg": 100 - 0.2 * k}
+        for k in range(1, 7)
+    ]
+    before = client.post("/api/users/slow/weighins", json=weighins).json()
+
+    r = client.post("/api/users/calibrate")
+
+    assert r.json() == {
+        "users": 2,
+        "calibrated": 1,
+        "energy_density_fitted": 0,
+        "errors": {"new": "At least 3 weigh-ins over 14 days are needed."},
+    }
+    after = client.get("/api/users/slow").json()
+    assert before["calibrated_tdee"] is None
+    assert after["calibrated_tdee"] < before["tdee"]
+    assert after["forecast"][:6] == before["forecast"][:6]
+    weekly = after["forecast"][6]["weight_kg"] - after["forecast"][7]["weight_kg"]
+    assert weekly == pytest.approx(0.2, abs=0.03)
+    # Later weigh-ins keep using the calibration.
+    latest = {"date": (start + datetime.timedelta(weeks=7)).isoformat(), "weight_kg": 98.6}
+    body = client.post("/api/users/slow/weighins", json=[latest]).json()
+    assert body["calibrated_tdee"] == after["calibrated_tdee"]
@@ -0,0 +1,81 @@
+import itertools
+
+import pytest
+
+from app.formulas.bmi import calculate_bmi
+from app.formulas.bmr import calculate_bmr_mifflin_st_jeor
+from app.formulas.bodyfat import estimate_body_fat_percent_from_bmi
+from app.formulas.calories import calories_target_from_goal
+from app.formulas.factors import FACTOR_INDEX, FACTORS, evaluate
+from app.formulas.ffmi import calculate_ffmi
+from app.formulas.macros import calculate_keto_macros
+from app.formulas.strategies import fixed_keto
+from app.formulas.tdee import calculate_tdee
+from app.models import ActivityLevel, Goal, Sex
+
+AGES = [18, 19, 33, 47, 64, 100]
+HEIGHTS = [120.0, 152.4, 165.1, 171.3333, 188.0, 230.0]
+WEIGHTS = [35.0, 48.5, 63.502932, 72.1, 99.79032140000001, 180.0, 300.0]
+
+
+def reference(sex, activity_level, goal, *, age_years, height_cm, weight_kg) -> tuple:
+    """The chain of scalar formulas as `calculate_values` called them before the table."""
+    bmi = calculate_bmi(weight_kg=weight_kg, height_cm=height_cm)
+    bmr = calculate_bmr_mifflin_st_jeor(
+        sex=sex, age_years=age_years, height_cm=height_cm, weight_kg=weight_kg
+    )
+    tdee = calculate_tdee(bmr=bmr, activity_level=activity_level)
+    bf = estimate_body_fat_percent_from_bmi(bmi=bmi, age_years=age_years, sex=sex)
+    ffmi = calculate_ffmi(weight_kg=weight_kg, height_cm=height_cm, body_fat_percent=bf)
+    calories = calories_target_from_goal(tdee=tdee, goal=goal)
+    cal, protein_g, fat_g, carbs = calculate_keto_macros(
+        calories_total=calories, weight_kg=weight_kg, goal=goal
+    )
+    return bmi, bmr, tdee, bf, ffmi, cal, protein_g, fat_g, carbs
+
+
+def evaluate_fixed(f, **inputs) -> tuple:
+    return evaluate(f, fixed_keto, **inputs, net_carbs_g=25.0, protein_g_per_kg=1.8)
+
+
+def _outcome(fn, *args, **kwargs):
+    """The results as exact hex strings, or the ValueError message."""
+    try:
+        return tuple(x.hex() for x in fn(*args, **kwargs))
+    except ValueError as e:
+        return str(e)
+
+
+def test_table_covers_every_combination():
+    assert len(FACTORS) == len(Sex) * len(ActivityLevel) * len(Goal)
+    assert list(FACTOR_INDEX.values()) == list(range(len(FACTORS)))
+
+
+@pytest.mark.parametrize("key", list(FACTORS), ids=lambda k: "-".join(e.value for e in k))
+def test_evaluate_is_bit_for_bit_equal_to_the_scalar_formulas(key):
+    compared = 0
+    for age, height, weight in itertools.product(AGES, HEIGHTS, WEIGHTS):
+        inputs = {"age_years": age, "height_cm": height, "weight_kg": weight}
+        expected = _outcome(reference, *key, **inputs)
+        assert _outcome(evaluate_fixed, FACTORS[key], **inputs) == expected, inputs
+        compared += not isinstance(expected, str)
+    assert compared > 0
+
+
+@pytest.mark.parametrize(
+    "inputs",
+    [
+        {"age_years": 17, "height_cm": 170, "weight_kg": 70},
+        {"age_years": 30, "height_cm": 0, "weight_kg": 70},
+        {"age_years": 30, "height_cm": 170, "weight_kg": -1},
+        {"age_years": 100, "height_cm": 20, "weight_kg": 1},
+        {"age_years": 100, "height_cm": 100, "weight_kg": 40},
+    ],
+)
+def test_evaluate_raises_the_same_errors(inputs):
+    key = (Sex.female, ActivityLevel.sedentary, Goal.lose)
+
+    expected = _outcome(reference, *key, **inputs)
+
+    assert isinstance(expected, str)
+    assert _outcome(evaluate_fixed, FACTORS[key], **inputs) == expected
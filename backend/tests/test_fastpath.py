@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.calc import CalcResult, calculate_all, calculate_values
+from app.fastpath import JSONBytesResponse, calc_output_json
+from app.main import app
+from app.models import ActivityLevel, ForecastModel, Goal, Sex, UserInput
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("model", list(ForecastModel))
+@pytest.mark.parametrize("goal", list(Goal))
+@pytest.mark.parametrize("weight_kg", [41.7, 80, 203.25])
+@pytest.mark.parametrize("weeks", [1, 24, 520])
+def test_calc_output_json_matches_model_dump(model, goal, weight_kg, weeks):
+    user = UserInput(
+        sex=Sex.female,
+        age_years=47,
+        height_cm=163.5,
+        weight_kg=weight_kg,
+        activity_level=ActivityLevel.very,
+        goal=goal,
+        forecast_weeks=weeks,
+        forecast_model=model,
+    )
+
+    fast = calc_output_json(calculate_values(user))
+
+    assert fast == calculate_all(user).model_dump_json().encode()
+
+
+def test_calc_output_json_encodes_missing_values_as_null():
+    user = UserInput(
+        sex=Sex.male, age_years=30, height_cm=180, weight_kg=80, activity_level=ActivityLevel.light
+    )
+    v = calculate_values(user)
+    values = CalcResult(
+        v.bmi,
+        v.bmr,
+        v.tdee,
+        None,
+        None,
+        v.calories_total,
+        v.protein_g,
+        v.fat_g,
+        v.net_carbs_g,
+        v.forecast,
+    )
+
+    fast = calc_output_json(values)
+
+    assert b'"body_fat_percent_estimate":null,"ffmi":null' in fast
+    assert b"NaN" not in fast
+
+
+def test_json_bytes_response_passes_bytes_through():
+    assert JSONBytesResponse(b'{"a":1}').body == b'{"a":1}'
+    assert JSONBytesResponse({"a": [1.5, None]}).body == b'{"a":[1.5,null]}'
+
+
+def test_calc_validation_errors_are_422_with_body_locations():
+    r = client.post("/api/calc", json={"sex": "other", "age_years": 30})
+
+    assert r.status_code == 422
+    locs = [err["loc"] for err in r.json()["detail"]]
+    assert locs == [["body", "sex"], ["body", "activity_level"]]
+    assert client.post("/calc", content=b"{not json").status_code == 422
+
+
+def test_calc_request_body_is_documented():
+    body = app.openapi()["paths"]["/api/calc"]["post"]["requestBody"]
+
+    assert body["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/UserInput"
+    }
@@ -1,4 +1,15 @@
-from app.formulas.forecast import KCAL_PER_KG, forecast_weight_kg
+import pytest
+
+from app.formulas.bmr import BMR_KCAL_PER_KG, calculate_bmr_mifflin_st_jeor
+from app.formulas.forecast import (
+    KCAL_PER_KG,
+    LinearForecast,
+    forecast_adaptive,
+    forecast_linear,
+    forecast_weight_kg,
+)
+from app.formulas.tdee import calculate_tdee
+from app.models import ActivityLevel, Sex
 
 
 def test_forecast_week0_equals_start():
@@ -22,3 +33,47 @@ def test_forecast_expected_weekly_change_math():
         start_weight_kg=80, tdee=2500, calories_target=2500 - KCAL_PER_KG / 7, weeks=1
     )
     assert abs(pts[1][1] - 79.0) < 1e-6
+
+
+def test_linear_forecast_any_week_in_closed_form():
+    fc = forecast_linear(start_weight_kg=80, tdee=2500, calories_target=2000, weeks=52 * 5)
+    assert len(fc) == 52 * 5 + 1
+    assert fc[0] == (0, 80.0)
+    assert fc.weight_at(100) == 80.0 + 100 * fc.delta_kg_per_week
+    assert fc[-1] == (260, fc.weight_at(260))
+
+
+def test_linear_forecast_clamps_at_zero():
+    fc = LinearForecast(start_weight_kg=3.0, delta_kg_per_week=-1.0, weeks=6)
+    assert fc.clamp_week == 3
+    assert [kg for _, kg in fc] == [3.0, 2.0, 1.0, 0.0, 0.0, 0.0, 0.0]
+    assert LinearForecast(start_weight_kg=3.0, delta_kg_per_week=0.5, weeks=6).clamp_week is None
+
+
+def test_adaptive_forecast_matches_weekly_tdee_recomputation():
+    def tdee_at(kg: float) -> float:
+        bmr = calculate_bmr_mifflin_st_jeor(
+            sex=Sex.female, age_years=40, height_cm=165, weight_kg=kg
+        )
+        return calculate_tdee(bmr=bmr, activity_level=ActivityLevel.light)
+
+    target = tdee_at(90) * 0.8
+    fc = forecast_adaptive(
+        start_weight_kg=90,
+        tdee=tdee_at(90),
+        tdee_per_kg=calculate_tdee(bmr=BMR_KCAL_PER_KG, activity_level=ActivityLevel.light),
+        calories_target=target,
+        weeks=104,
+    )
+
+    kg = 90.0
+    for week in range(105):
+        assert fc.weight_at(week) == pytest.approx(kg, abs=1e-9)
+        kg += (target - tdee_at(kg)) * 7 / KCAL_PER_KG
+
+
+def test_adaptive_forecast_loses_less_than_linear():
+    kwargs = {"start_weight_kg": 90, "tdee": 2400, "calories_target": 1920, "weeks": 52}
+    adaptive = forecast_adaptive(tdee_per_kg=13.75, **kwargs)
+    linear = forecast_linear(**kwargs)
+    assert linear[-1][1] < adaptive[-1][1] < 90
@@ -0,0 +1,164 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.calc import calculate_all
+from app.foods import food_table
+from app.main import app
+from app.models import (
+    ActivityLevel,
+    DietaryPreferences,
+    Goal,
+    MealPlanEngine,
+    MealPlanPreferences,
+    Sex,
+    UserInput,
+)
+from app.services import llm_mealplan
+from app.services.local_mealplan import generate_local_meal_plan
+from app.services.mealplan_rules import (
+    CALORIE_TOLERANCE,
+    MAX_ITEMS_PER_MEAL,
+    MAX_NET_CARBS_G,
+    meal_names,
+)
+
+KINDS = {name: kind for name, kind in zip(food_table().names, food_table().kinds, strict=True)}
+
+
+def _user(meals_per_day: int = 3, days: int = 7, **dietary) -> UserInput:
+    return UserInput(
+        sex=Sex.female,
+        age_years=38,
+        height_cm=168,
+        weight_kg=72,
+        activity_level=ActivityLevel.moderate,
+        goal=Goal.lose,
+        dietary=DietaryPreferences(**dietary),
+        mealplan=MealPlanPreferences(
+            days=days, meals_per_day=meals_per_day, engine=MealPlanEngine.local
+        ),
+    )
+
+
+@pytest.mark.parametrize("meals_per_day", range(1, 7))
+@pytest.mark.parametrize("diet", [{}, {"vegetarian": True}, {"kosher": True}, {"halal": True}])
+def test_plan_meets_prompt_rules(meals_per_day, diet):
+    user = _user(meals_per_day, **diet)
+    macros = calculate_all(user).macros
+
+    plan = generate_local_meal_plan(user, calculate_all(user))
+
+    assert len(plan.generated_mealplan) == 7
+    for day in plan.generated_mealplan:
+        assert [m.meal_name for m in day.meals] == meal_names(meals_per_day)
+        assert all(len(m.items) <= MAX_ITEMS_PER_MEAL for m in day.meals)
+        assert day.totals.protein_g >= macros.protein_g - 0.05
+        assert day.totals.net_carbs_g <= MAX_NET_CARBS_G
+        assert abs(day.totals.calories - macros.calories_total) <= (
+            CALORIE_TOLERANCE * macros.calories_total
+        )
+    assert not any("could not" in a for a in plan.assumptions)
+
+
+def test_dietary_filters():
+    vegan = generate_local_meal_plan(_user(vegan=True), calculate_all(_user(vegan=True)))
+    kosher = generate_local_meal_plan(_user(kosher=True), calculate_all(_user(kosher=True)))
+
+    vegan_kinds = {
+        KINDS[i.name] for d in vegan.generated_mealplan for m in d.meals for i in m.items
+    }
+    assert vegan_kinds == {"plant"}
+    for day in kosher.generated_mealplan:
+        for meal in day.meals:
+            kinds = {KINDS[i.name] for i in meal.items}
+            assert "pork" not in kinds and "shellfish" not in kinds
+            assert not ({"meat", "poultry"} & kinds and "dairy" in kinds)
+
+
+def test_plan_is_deterministic_and_days_differ():
+    user = _user()
+    first = generate_local_meal_plan(user, calculate_all(user))
+
+    assert first == generate_local_meal_plan(user, calculate_all(user))
+    dinners = {d.meals[2].items[0].name for d in first.generated_mealplan}
+    assert len(dinners) > 3
+
+
+@pytest.mark.filterwarnings("error")
+def test_zero_net_carbs_still_meets_protein_and_calories():
+    user = _user().model_copy(update={"net_carbs_g": 0.0})
+    macros = calculate_all(user).macros
+
+    plan = generate_local_meal_plan(user, calculate_all(user))
+
+    for day in plan.generated_mealplan:
+        assert day.totals.protein_g >= macros.protein_g - 0.05
+        assert abs(day.totals.calories - macros.calories_total) <= (
+            CALORIE_TOLERANCE * macros.calories_total
+        )
+        assert day.totals.net_carbs_g <= 1.0
+
+
+def test_api_local_engine_needs_no_llm(monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "_client", None)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    payload = _user(days=2).model_dump(mode="json")
+
+    r = TestClient(app).post("/api/mealplan", json=payload)
+
+    assert r.status_code == 200
+    assert len(r.json()["generated_mealplan"]) == 2
+
+
+_LOCAL_PLAN = """
+import os, sys
+os.environ.pop("GEMINI_API_KEY", None)
+from fastapi.testclient import TestClient
+from app.main import app
+payload = {"sex": "male", "age_years": 30, "height_cm": 180, "weight_kg": 80,
+           "activity_level": "light", "mealplan": {"days": 1, "engine": "local"}}
+with TestClient(app) as client:
+    for path in ("/api/mealplan", "/api/mealplan/stream"):
+        assert client.post(path, json=payload).status_code == 200
+print("google.genai" in sys.modules)
+"""
+
+
+def test_local_engine_does_not_import_genai():
+    out = subprocess.run(
+        [sys.executable, "-c", _LOCAL_PLAN],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.split() == ["False"]
+
+
+def test_rate_limited_llm_falls_back_to_local(fake_llm):
+    fake_llm.models.error = RuntimeError("RATE_LIMIT: quota exceeded")
+    user = _user(days=2).model_copy(
+        update={"mealplan": MealPlanPreferences(days=2, engine=MealPlanEngine.llm)}
+    )
+
+    plan = asyncio.run(llm_mealplan.generate_meal_plan(user, calculate_all(user)))
+
+    assert len(plan.generated_mealplan) == 2
+    assert "rate-limited" in plan.assumptions[0]
+
+
+def test_stream_falls_back_before_first_day(fake_llm):
+    fake_llm.models.error = RuntimeError("RATE_LIMIT: quota exceeded")
+    payload = _user(days=2).model_dump(mode="json")
+    payload["mealplan"]["engine"] = "llm"
+
+    with TestClient(app).stream("POST", "/api/mealplan/stream", json=payload) as r:
+        body = r.read().decode()
+
+    assert body.count("event: day") == 2
+    assert "event: error" not in body
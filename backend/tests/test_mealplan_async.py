@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import llm_mealplan
+
+PAYLOAD = {
+    "sex": "male",
+    "age_years": 35,
+    "height_cm": 178,
+    "weight_kg": 85,
+    "activity_level": "moderate",
+    "goal": "lose",
+}
+
+
+def test_api_mealplan_uses_pooled_client(fake_llm):
+    client = TestClient(app)
+    r = client.post("/api/mealplan", json=PAYLOAD)
+
+    assert r.status_code == 200
+    assert r.json()["shopping_list"] == ["chicken breast"]
+    assert len(fake_llm.models.calls) == 1
+
+
+def test_mealplan_timeout_is_503(fake_llm, monkeypatch):
+    fake_llm.models.delay_s = 1.0
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_TIMEOUT_S", 0.05)
+
+    r = TestClient(app).post("/api/mealplan", json=PAYLOAD)
+
+    assert r.status_code == 503
+    assert "timed out" in r.json()["detail"]
+
+
+def test_concurrency_limit(fake_llm, monkeypatch):
+    fake_llm.models.delay_s = 0.1
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_MAX_CONCURRENCY", 2)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(
+                *(
+                    client.post("/api/mealplan", json=PAYLOAD | {"age_years": 30 + i})
+                    for i in range(4)
+                )
+            )
+            return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(run())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert elapsed >= 0.2
+
+
+def test_slow_llm_does_not_starve_calc(fake_llm):
+    fake_llm.models.delay_s = 1.0
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            pending = [
+                asyncio.create_task(
+                    client.post("/api/mealplan", json=PAYLOAD | {"age_years": 30 + i})
+                )
+                for i in range(50)
+            ]
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            r = await client.post("/api/calc", json=PAYLOAD)
+            calc_elapsed = time.perf_counter() - started
+            await asyncio.gather(*pending)
+            return r, calc_elapsed
+
+    r, calc_elapsed = asyncio.run(run())
+
+    assert r.status_code == 200
+    assert calc_elapsed < 0.5
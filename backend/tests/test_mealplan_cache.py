@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from app.cache import DiskBackend, LRUBackend, ResultCache, TieredBackend
+from app.calc import calculate_all
+from app.models import ActivityLevel, Sex, UserInput
+from app.services import llm_mealplan
+
+USER = UserInput(
+    sex=Sex.female, age_years=30, height_cm=165, weight_kg=60, activity_level=ActivityLevel.light
+)
+
+
+def test_identical_prompts_call_llm_once(fake_llm):
+    calc = calculate_all(USER)
+
+    first = asyncio.run(llm_mealplan.generate_meal_plan(USER, calc))
+    second = asyncio.run(llm_mealplan.generate_meal_plan(USER, calc))
+
+    assert first == second == fake_llm.models.plan
+    assert len(fake_llm.models.calls) == 1
+
+
+def test_concurrent_identical_requests_are_coalesced(fake_llm):
+    fake_llm.models.delay_s = 0.05
+    calc = calculate_all(USER)
+
+    async def run():
+        return await asyncio.gather(
+            *(llm_mealplan.generate_meal_plan(USER, calc) for _ in range(8))
+        )
+
+    assert asyncio.run(run()) == [fake_llm.models.plan] * 8
+    assert len(fake_llm.models.calls) == 1
+    assert llm_mealplan.mealplan_cache.coalesced == 7
+
+
+def test_failed_calls_are_not_cached(fake_llm):
+    calc = calculate_all(USER)
+    fake_llm.models.error = RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        asyncio.run(llm_mealplan.generate_meal_plan(USER, calc))
+
+    fake_llm.models.error = None
+    assert asyncio.run(llm_mealplan.generate_meal_plan(USER, calc)) == fake_llm.models.plan
+    assert len(fake_llm.models.calls) == 2
+
+
+def test_lru_ttl_expires(monkeypatch):
+    backend = LRUBackend(8, ttl_s=10)
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    backend.set("k", b"v")
+
+    now[0] = 109.0
+    assert backend.get("k") == b"v"
+    now[0] = 110.0
+    assert backend.get("k") is None
+
+
+def test_disk_tier_survives_new_process_cache(tmp_path):
+    ResultCache(TieredBackend(LRUBackend(8), DiskBackend(tmp_path))).get_or_compute(
+        "k", lambda: b"plan"
+    )
+
+    cold = ResultCache(TieredBackend(LRUBackend(8), DiskBackend(tmp_path)))
+    assert cold.get_or_compute("k", lambda: b"other") == b"plan"
+    assert cold.hits == 1
+
+
+def test_disk_tier_ttl(tmp_path):
+    backend = DiskBackend(tmp_path, ttl_s=0)
+    backend.set("k", b"v")
+    assert backend.get("k") is None
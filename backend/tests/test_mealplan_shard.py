@@ -0,0 +1,166 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.calc import calculate_all
+from app.main import app
+from app.models import ActivityLevel, MealPlanPreferences, Sex, UserInput
+from app.models_mealplan import DayPlan, Meal, MealItem, MealPlanResponse
+from app.services import llm_mealplan
+
+USER = UserInput(
+    sex=Sex.male,
+    age_years=35,
+    height_cm=178,
+    weight_kg=85,
+    activity_level=ActivityLevel.moderate,
+    mealplan=MealPlanPreferences(days=5, days_per_chunk=2),
+)
+
+
+class ShardModels:
+    """Returns as many days as the prompt asks for, with items unique to each call."""
+
+    def __init__(self, delay_s: float = 0.0) -> None:
+        self.delay_s = delay_s
+        self.calls: list[str] = []
+
+    async def generate_content(self, *, model, contents, config):
+        call = len(self.calls)
+        self.calls.append(contents)
+        await asyncio.sleep(self.delay_s)
+        days = int(re.search(r"Number of days: (\d+)", contents).group(1))
+        plan = MealPlanResponse(
+            generated_mealplan=[
+                DayPlan(
+                    meals=[
+                        Meal(
+                            meal_name="lunch",
+                            items=[MealItem(name=f"dish {call}-{d}", grams=200)],
+                            protein_g=60,
+                            fat_g=40,
+                            net_carbs_g=5,
+                            calories=620,
+                        )
+                    ]
+                )
+                for d in range(days)
+            ],
+            shopping_list=["Olive oil", f"dish {call}"],
+            assumptions=["raw weights"],
+        )
+        return SimpleNamespace(parsed=plan, candidates=[], text=None)
+
+
+def _install(fake_llm, delay_s: float = 0.0) -> ShardModels:
+    models = ShardModels(delay_s)
+    fake_llm.aio.models = models
+    return models
+
+
+def test_chunked_plan_is_merged_in_order(fake_llm):
+    models = _install(fake_llm)
+
+    plan = asyncio.run(llm_mealplan.generate_meal_plan(USER, calculate_all(USER)))
+
+    assert len(models.calls) == 3
+    assert len(plan.generated_mealplan) == 5
+    assert plan.shopping_list == ["Olive oil", "dish 0", "dish 1", "dish 2"]
+    assert plan.assumptions == ["raw weights"]
+    assert "days 5-5 of a 5-day plan" in models.calls[2]
+
+
+def test_later_waves_avoid_used_items(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_SHARD_PARALLELISM", 2)
+    models = _install(fake_llm)
+
+    asyncio.run(llm_mealplan.generate_meal_plan(USER, calculate_all(USER)))
+
+    assert all("Do not repeat these dishes" not in prompt for prompt in models.calls[:2])
+    assert "lunch with dish 0-1" in models.calls[2] and "lunch with dish 1-0" in models.calls[2]
+
+
+class StapleModels(ShardModels):
+    """Each day's lunch is a different protein with the same vegetable, oil and butter."""
+
+    PROTEINS = ["Grilled salmon fillet", "chicken thighs", "Pork chops", "shrimp", "Tuna steak"]
+
+    async def generate_content(self, *, model, contents, config):
+        self.calls.append(contents)
+        days = [int(d) for d in re.search(r"days (\d+)-(\d+)", contents).groups()]
+        meals = [
+            Meal(
+                meal_name="lunch",
+                items=[
+                    MealItem(name="Broccoli", grams=150),
+                    MealItem(name=self.PROTEINS[d - 1], grams=200),
+                    MealItem(name="olive oil", grams=15),
+                    MealItem(name="Butter", grams=10),
+                ],
+                protein_g=45,
+                fat_g=40,
+                net_carbs_g=6,
+                calories=560,
+            )
+            for d in range(days[0], days[1] + 1)
+        ]
+        plan = MealPlanResponse(
+            generated_mealplan=[DayPlan(meals=[meal]) for meal in meals],
+            shopping_list=[],
+            assumptions=[],
+        )
+        return SimpleNamespace(parsed=plan, candidates=[], text=None)
+
+
+def test_avoided_dishes_are_meals_not_staple_ingredients(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_SHARD_PARALLELISM", 2)
+    models = StapleModels()
+    fake_llm.aio.models = models
+
+    asyncio.run(llm_mealplan.generate_meal_plan(USER, calculate_all(USER)))
+
+    rule = next(line for line in models.calls[2].splitlines() if "Do not repeat" in line)
+    assert rule.endswith(
+        "lunch with salmon, lunch with chicken thigh, lunch with pork chop, lunch with shrimp."
+    )
+    for staple in ("oil", "butter", "broccoli"):
+        assert staple not in rule.lower()
+
+
+def test_avoided_dishes_are_capped(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MAX_AVOIDED_DISHES", 3)
+    models = _install(fake_llm)
+    user = USER.model_copy(update={"mealplan": MealPlanPreferences(days=7, days_per_chunk=1)})
+
+    asyncio.run(llm_mealplan.generate_meal_plan(user, calculate_all(user)))
+
+    rule = next(line for line in models.calls[4].splitlines() if "Do not repeat" in line)
+    assert rule.endswith("lunch with dish 1-0, lunch with dish 2-0, lunch with dish 3-0.")
+
+
+def test_chunks_run_concurrently(fake_llm):
+    models = _install(fake_llm, delay_s=0.1)
+    user = USER.model_copy(update={"mealplan": MealPlanPreferences(days=4, days_per_chunk=1)})
+
+    start = time.perf_counter()
+    plan = asyncio.run(llm_mealplan.generate_meal_plan(user, calculate_all(user)))
+
+    assert time.perf_counter() - start < 0.3
+    assert len(models.calls) == 4
+    assert len(plan.generated_mealplan) == 4
+
+
+def test_stream_emits_days_of_every_chunk(fake_llm):
+    _install(fake_llm)
+    payload = USER.model_dump(mode="json")
+
+    with TestClient(app).stream("POST", "/api/mealplan/stream", json=payload) as r:
+        events = [block for block in r.read().decode().split("\n\n") if block]
+
+    days = [json.loads(e.split("data: ", 1)[1]) for e in events if e.startswith("event: day")]
+    assert [d["index"] for d in days] == [0, 1, 2, 3, 4]
+    assert events[-1].startswith("event: done")
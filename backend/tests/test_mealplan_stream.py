@@ -0,0 +1,91 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models_mealplan import DayPlan, Meal, MealItem, MealPlanResponse
+from app.services.llm_mealplan import MealPlanStreamParser
+
+PAYLOAD = {
+    "sex": "female",
+    "age_years": 41,
+    "height_cm": 168,
+    "weight_kg": 72,
+    "activity_level": "light",
+    "mealplan": {"days": 3},
+}
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_parser_emits_each_day_once_it_closes():
+    tricky = Meal(
+        meal_name="dinner",
+        items=[MealItem(name='salmon "teriyaki" {no sugar} [keto]', grams=150, notes="a\\b")],
+        protein_g=30,
+        fat_g=20,
+        net_carbs_g=2,
+        calories=310,
+    )
+    plan = MealPlanResponse(
+        generated_mealplan=[DayPlan(meals=[tricky]), DayPlan(meals=[tricky, tricky])],
+        shopping_list=["salmon"],
+    )
+    text = "```json\n" + plan.model_dump_json() + "\n```"
+    parser = MealPlanStreamParser()
+
+    days = []
+    seen_at = []
+    for i in range(0, len(text), 7):
+        new = parser.feed(text[i : i + 7])
+        days.extend(new)
+        seen_at.extend([i] * len(new))
+
+    assert days == plan.generated_mealplan
+    assert seen_at[0] < text.index('"shopping_list"')
+    assert parser.finish() == plan
+
+
+def test_api_mealplan_stream_emits_days_then_summary(fake_llm):
+    plan = fake_llm.models.plan
+    fake_llm.models.plan = plan.model_copy(
+        update={"generated_mealplan": plan.generated_mealplan * 3}
+    )
+
+    r = TestClient(app).post("/api/mealplan/stream", json=PAYLOAD)
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert [name for name, _ in events] == ["day", "day", "day", "summary", "done"]
+    assert [data["index"] for _, data in events[:3]] == [0, 1, 2]
+    assert events[3][1]["shopping_list"] == ["chicken breast"]
+
+
+def test_api_mealplan_stream_replays_cached_plan(fake_llm):
+    client = TestClient(app)
+    first = client.post("/api/mealplan/stream", json=PAYLOAD)
+    second = client.post("/api/mealplan/stream", json=PAYLOAD)
+
+    assert first.text == second.text
+    assert len(fake_llm.models.calls) == 1
+
+
+def test_api_mealplan_stream_reports_errors_as_events(fake_llm):
+    fake_llm.models.error = RuntimeError("upstream broke")
+
+    r = TestClient(app).post("/api/mealplan/stream", json=PAYLOAD)
+
+    assert _events(r.text) == [("error", {"status": 503, "detail": "upstream broke"})]
+
+
+def test_api_mealplan_stream_requires_api_key(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    r = TestClient(app).post("/api/mealplan/stream", json=PAYLOAD)
+    assert r.status_code == 400
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+from app.calc import calculate_all
+from app.foods import food_index, food_table, normalize_food_name
+from app.models import ActivityLevel, Macros, Sex, UserInput
+from app.models_mealplan import DayPlan, Meal, MealItem, MealPlanResponse
+from app.services import llm_mealplan
+from app.services.mealplan_rules import CALORIE_TOLERANCE
+from app.services.mealplan_verify import MealPlanVerifier, verify_meal_plan
+
+MACROS = Macros(calories_total=1800, protein_g=120, fat_g=130, net_carbs_g=20)
+
+
+def _name(item: str) -> str | None:
+    row = food_index().resolve(item)
+    return None if row is None else food_table().names[row]
+
+
+def _meal(name: str, items: list[tuple[str, float]], calories: float = 500) -> Meal:
+    return Meal(
+        meal_name=name,
+        items=[MealItem(name=n, grams=g) for n, g in items],
+        protein_g=30,
+        fat_g=35,
+        net_carbs_g=3,
+        calories=calories,
+    )
+
+
+def _day(*meals: Meal) -> DayPlan:
+    return DayPlan(meals=list(meals))
+
+
+def test_normalize_food_name():
+    assert normalize_food_name("Eggs (large)") == "egg"
+    assert normalize_food_name("Grilled Skinless Chicken Breasts") == "chicken breast"
+
+
+def test_index_resolution_order():
+    assert _name("chicken breast") == "chicken breast"
+    assert _name("EVOO") == "olive oil"
+    assert _name("Pan-seared salmon fillet with dill") == "salmon"
+    assert _name("brocolli") == "broccoli"
+    assert _name("quinoa") is None
+
+
+def test_index_resolves_thousands_of_items_per_second():
+    names = [f"grilled chicken breast {i}" for i in range(5000)] + ["Olive oil"] * 5000
+    start = time.perf_counter()
+    rows = [food_index().resolve(n) for n in names]
+    assert time.perf_counter() - start < 1.0
+    assert None not in rows
+
+
+def test_totals_are_recomputed_from_grams():
+    day = _day(
+        _meal("lunch", [("chicken thigh", 300), ("broccoli", 150), ("olive oil", 40)]),
+        _meal("dinner", [("salmon", 300), ("spinach", 100), ("butter", 40)]),
+    )
+    verifier = MealPlanVerifier(MACROS)
+
+    checked = verifier.verify_day(day)
+
+    lunch = checked.meals[0]
+    assert lunch.calories == round(3 * 176 + 1.5 * 34 + 0.4 * 884, 1)
+    assert checked.totals.calories == round(lunch.calories + checked.meals[1].calories, 1)
+    assert [i.grams for i in lunch.items] == [300, 150, 40]
+    assert verifier.repaired == verifier.failed == []
+
+
+def test_days_missing_targets_are_rescaled():
+    day = _day(
+        _meal("breakfast", [("eggs", 100), ("spinach", 50), ("butter", 10)]),
+        _meal("lunch", [("chicken breast", 150), ("broccoli", 100), ("olive oil", 15)]),
+        _meal("dinner", [("salmon", 150), ("asparagus", 100), ("butter", 20)]),
+    )
+    plan = verify_meal_plan(MealPlanResponse(generated_mealplan=[day]), MACROS)
+
+    totals = plan.generated_mealplan[0].totals
+    assert totals.protein_g >= MACROS.protein_g
+    assert totals.net_carbs_g <= MACROS.net_carbs_g
+    assert abs(totals.calories - MACROS.calories_total) <= CALORIE_TOLERANCE * 1800
+    assert any("rescaled" in a for a in plan.assumptions)
+
+
+def test_unknown_items_keep_llm_values():
+    unknown = _meal("dinner", [("quinoa", 200), ("salmon", 150)], calories=640)
+    day = _day(_meal("lunch", [("chicken breast", 200)]), unknown)
+
+    plan = verify_meal_plan(MealPlanResponse(generated_mealplan=[day]), MACROS)
+
+    assert plan.generated_mealplan[0].meals[1] == unknown
+    assert "Not in the food table, LLM values kept: quinoa." in plan.assumptions
+
+
+def test_generate_meal_plan_verifies_llm_output(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_VERIFY", True)
+    user = UserInput(
+        sex=Sex.male, age_years=30, height_cm=180, weight_kg=80, activity_level=ActivityLevel.light
+    )
+    calc = calculate_all(user)
+
+    plan = asyncio.run(llm_mealplan.generate_meal_plan(user, calc))
+
+    assert plan.generated_mealplan[0].totals.protein_g >= calc.macros.protein_g
+    assert plan.assumptions[0] == "test plan"
+    assert any("recomputed" in a for a in plan.assumptions)
+    cached = asyncio.run(llm_mealplan.generate_meal_plan(user, calc))
+    assert cached == plan
+    assert len(fake_llm.models.calls) == 1
@@ -0,0 +1,115 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app import profiler
+from app.main import app
+from app.metrics import IN_FLIGHT, REQUESTS, STAGE_DURATION, Counter, Histogram, Registry
+from app.models import ActivityLevel, Sex, UserInput
+from app.services import llm_mealplan
+
+client = TestClient(app)
+
+PAYLOAD = UserInput(
+    sex=Sex.male, age_years=35, height_cm=178, weight_kg=84, activity_level=ActivityLevel.light
+).model_dump(mode="json")
+
+
+def test_exposition_format():
+    registry = Registry()
+    latency = registry.register(Histogram("latency_seconds", "Latency.", ("route",), (0.1, 1)))
+    errors = registry.register(Counter("errors_total", "Errors.", ("detail",)))
+    latency.observe(0.05, "/a")
+    latency.observe(0.1, "/a")
+    latency.observe(3, "/a")
+    registry.register(Counter("restarts_total", "Restarts."))
+    errors.inc('say "hi"\n')
+
+    assert registry.render() == (
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{route="/a",le="0.1"} 2\n'
+        'latency_seconds_bucket{route="/a",le="1"} 2\n'
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3\n'
+        'latency_seconds_sum{route="/a"} 3.15\n'
+        'latency_seconds_count{route="/a"} 3\n'
+        "# HELP errors_total Errors.\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{detail="say \\"hi\\"\\n"} 1\n'
+        "# HELP restarts_total Restarts.\n"
+        "# TYPE restarts_total counter\n"
+        "restarts_total 0\n"
+    )
+
+
+def test_requests_are_counted_by_route_and_status():
+    ok = REQUESTS.value("POST", "/api/calc", "200")
+    bad = REQUESTS.value("POST", "/api/calc", "400")
+    invalid = REQUESTS.value("POST", "/calc", "422")
+    unmatched = REQUESTS.value("GET", "unmatched", "404")
+
+    client.post("/api/calc", json=PAYLOAD)
+    client.post("/api/calc", json=PAYLOAD | {"age_years": 15})
+    client.post("/calc", json={"sex": "male"})
+    client.get("/no/such/path")
+
+    assert REQUESTS.value("POST", "/api/calc", "200") == ok + 1
+    assert REQUESTS.value("POST", "/api/calc", "400") == bad + 1
+    assert REQUESTS.value("POST", "/calc", "422") == invalid + 1
+    assert REQUESTS.value("GET", "unmatched", "404") == unmatched + 1
+    assert IN_FLIGHT.value("POST", "/api/calc") == 0
+
+
+def test_mealplan_errors_and_stages(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_LOCAL_FALLBACK", False)
+    stages = ("mealplan.prompt", "mealplan.llm", "mealplan.parse")
+    before = {stage: STAGE_DURATION.count(stage) for stage in stages}
+    failed = REQUESTS.value("POST", "/api/mealplan", "503")
+    limited = REQUESTS.value("POST", "/api/mealplan", "429")
+
+    assert client.post("/api/mealplan", json=PAYLOAD).status_code == 200
+    fake_llm.models.error = RuntimeError("boom")
+    client.post("/api/mealplan", json=PAYLOAD | {"age_years": 36})
+    fake_llm.models.error = RuntimeError("RATE_LIMIT: quota")
+    client.post("/api/mealplan", json=PAYLOAD | {"age_years": 37})
+
+    assert {stage: STAGE_DURATION.count(stage) - before[stage] for stage in stages} == {
+        "mealplan.prompt": 3,
+        "mealplan.llm": 3,
+        "mealplan.parse": 1,
+    }
+    assert REQUESTS.value("POST", "/api/mealplan", "503") == failed + 1
+    assert REQUESTS.value("POST", "/api/mealplan", "429") == limited + 1
+
+
+def test_metrics_endpoint_exposes_requests_and_calc_stages():
+    client.post("/api/calc", json=PAYLOAD | {"weight_kg": 91})
+
+    r = client.get("/metrics")
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="POST",route="/api/calc",status="200"}' in r.text
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/api/calc",le=' in r.text
+    for stage in ("normalize", "formulas", "forecast"):
+        assert f'stage_duration_seconds_count{{stage="calc.{stage}"}}' in r.text
+    assert client.get("/api/metrics").text.startswith("# HELP")
+
+
+def test_profile_header_is_ignored_unless_enabled():
+    r = client.post("/api/calc", json=PAYLOAD, headers={"X-Profile": "1"})
+
+    assert "x-profile-id" not in r.headers
+
+
+def test_profiled_request_returns_folded_stacks(fake_llm, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILING_ENABLED", True)
+    fake_llm.models.delay_s = 0.05
+
+    r = client.post("/api/mealplan", json=PAYLOAD, headers={"X-Profile": "1"})
+    folded = client.get(f"/api/profiles/{r.headers['x-profile-id']}")
+
+    assert r.status_code == folded.status_code == 200
+    assert folded.text
+    assert all(re.fullmatch(r".+ \d+", line) for line in folded.text.splitlines())
+    assert client.get("/api/profiles/unknown").status_code == 404
@@ -0,0 +1,131 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import progress
+from app.calc import calculate_all
+from app.main import app
+from app.models import ProgressOutput, UserInput
+from app.store import SQLiteStore
+
+client = TestClient(app)
+
+START = datetime.date(2026, 1, 5)
+
+USER = {
+    "sex": "female",
+    "age_years": 36,
+    "height_cm": 165,
+    "weight_kg": 80,
+    "activity_level": "light",
+    "goal": "lose",
+    "forecast_weeks": 12,
+}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = SQLiteStore(":memory:")
+    monkeypatch.setattr(progress, "_store", store)
+    yield store
+    store.close()
+
+
+def _put(user_id: str = "u1", **extra) -> dict:
+    r = client.put(f"/api/users/{user_id}", params={"start_date": START}, json=USER | extra)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _weigh(days: int, weight_kg: float, user_id: str = "u1"):
+    date = START + datetime.timedelta(days=days)
+    return client.post(
+        f"/api/users/{user_id}/weighins",
+        json=[{"date": date.isoformat(), "weight_kg": weight_kg}],
+    )
+
+
+@pytest.mark.parametrize("model", ["linear", "adaptive"])
+def test_new_profile_snapshot_matches_calc(store, model):
+    body = _put(forecast_model=model)
+
+    expected = calculate_all(UserInput(**USER, forecast_model=model)).model_dump(mode="json")
+    assert {k: body[k] for k in expected} == expected
+    assert (body["as_of"], body["weight_kg"], body["weighins"]) == (START.isoformat(), 80.0, 0)
+    assert client.get("/api/users/u1").json() == body
+
+
+@pytest.mark.parametrize("model", ["linear", "adaptive"])
+def test_weighin_keeps_the_head_and_reprojects_the_tail(store, model):
+    before = _put(forecast_model=model)
+
+    r = _weigh(21, 78.0)
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["forecast"][:3] == before["forecast"][:3]
+    reanchored = calculate_all(
+        UserInput(**USER | {"weight_kg": 78.0, "forecast_weeks": 9}, forecast_model=model)
+    )
+    assert body["forecast"][3:] == [
+        {"week": week + 3, "weight_kg": kg} for week, kg in reanchored.forecast
+    ]
+    assert body["bmi"] == reanchored.bmi and body["tdee"] == reanchored.tdee
+    assert body["macros"] == reanchored.macros.model_dump()
+    assert (body["as_of"], body["weight_kg"], body["weighins"]) == ("2026-01-26", 78.0, 1)
+
+
+def test_mid_week_weighin_evaluates_the_tail_at_fractional_weeks(store):
+    _put()
+
+    body = _weigh(10, 79.0).json()
+
+    delta = body["forecast"][2]["weight_kg"] - body["forecast"][3]["weight_kg"]
+    assert body["forecast"][2]["weight_kg"] == pytest.approx(79.0 - delta * 4 / 7)
+
+
+def test_backfilled_weighins_are_counted_but_do_not_move_the_snapshot(store):
+    _put()
+    latest = _weigh(14, 78.5).json()
+
+    r = client.post(
+        "/api/users/u1/weighins",
+        json=[{"date": "2026-01-10", "weight_kg": 79.5}, {"date": "2026-01-12", "weight_lb": 175}],
+    )
+
+    assert r.json() == latest | {"weighins": 3}
+    weighins = client.get("/api/users/u1/weighins").json()
+    assert [w["date"] for w in weighins] == ["2026-01-10", "2026-01-12", "2026-01-19"]
+    assert weighins[1]["weight_kg"] == pytest.approx(175 * 0.45359237)
+
+
+def test_profile_update_reanchors_at_the_latest_weighin(store):
+    _put()
+    _weigh(7, 79.0)
+
+    body = _put(goal="maintain")
+
+    assert body["as_of"] == "2026-01-12" and body["weight_kg"] == 79.0
+    assert body["macros"]["calories_total"] == body["tdee"]
+
+
+def test_unknown_user_and_invalid_weighins(store):
+    assert client.get("/api/users/nobody").status_code == 404
+    assert _weigh(7, 79.0, user_id="nobody").status_code == 404
+    assert client.get("/api/users/nobody/weighins").status_code == 404
+
+    _put()
+    both = [{"date": "2026-02-01", "weight_kg": 70, "weight_lb": 150}]
+    assert client.post("/api/users/u1/weighins", json=both).status_code == 422
+    assert client.post("/api/users/u1/weighins", json=[]).status_code == 400
+
+
+def test_failed_weighin_is_rolled_back(store):
+    _put(weight_kg=60, protein_g_per_kg=4, net_carbs_g=100)
+
+    r = _weigh(7, 80.0)
+
+    assert r.status_code == 400
+    assert store.weighins("u1") == []
+    assert ProgressOutput.model_validate_json(store.get_snapshot("u1")).weighins == 0
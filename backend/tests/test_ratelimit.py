@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+from google.genai import errors
+
+from app.main import app
+from app.metrics import (
+    MEALPLAN_DEADLINE_EXCEEDED,
+    MEALPLAN_RETRIES,
+    MEALPLAN_SLOT_WAITING,
+    RATE_LIMIT_WAITING,
+    RATE_LIMIT_WAITS,
+)
+from app.ratelimit import MemoryBucketStore, TokenBucket, backoff_delay
+from app.services import llm_mealplan
+
+PAYLOAD = {
+    "sex": "female",
+    "age_years": 41,
+    "height_cm": 168,
+    "weight_kg": 70,
+    "activity_level": "light",
+}
+
+
+def _api_error(code: int, status: str) -> errors.APIError:
+    return errors.APIError(code, {"error": {"code": code, "message": "x", "status": status}})
+
+
+class FlakyModels:
+    """Fails with each of `errors` in turn, then delegates to the fake client."""
+
+    def __init__(self, models, errors):
+        self.models = models
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def generate_content(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return await self.models.generate_content(**kwargs)
+
+
+def _flaky(fake_llm, monkeypatch, *errors) -> FlakyModels:
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_RETRY_BASE_S", 0.001)
+    flaky = FlakyModels(fake_llm.models, errors)
+    fake_llm.aio.models = flaky
+    return flaky
+
+
+def test_memory_bucket_refills_at_rate():
+    store = MemoryBucketStore()
+
+    assert store.take("k", rate=1.0, capacity=2, now=0.0) == 0.0
+    assert store.take("k", rate=1.0, capacity=2, now=0.0) == 0.0
+    assert store.take("k", rate=1.0, capacity=2, now=0.0) == 1.0
+    assert store.take("k", rate=1.0, capacity=2, now=0.5) == 0.5
+    assert store.take("k", rate=1.0, capacity=2, now=1.0) == 0.0
+
+
+def test_token_bucket_smooths_bursts():
+    bucket = TokenBucket(20.0, 1)
+
+    async def burst():
+        deadline = time.monotonic() + 5
+        return await asyncio.gather(*(bucket.acquire(deadline) for _ in range(4)))
+
+    start = time.perf_counter()
+    assert asyncio.run(burst()) == [True] * 4
+    assert 0.14 <= time.perf_counter() - start < 1.0
+    assert bucket.throttled == 3
+    assert bucket.waiting == 0
+
+
+def test_token_bucket_gives_up_at_deadline():
+    bucket = TokenBucket(0.1, 1)
+
+    async def run():
+        deadline = time.monotonic() + 0.05
+        return await bucket.acquire(deadline), await bucket.acquire(deadline)
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_backoff_is_capped():
+    assert all(0 <= backoff_delay(n, base_s=1, max_s=5) <= 5 for n in range(10))
+
+
+def test_transient_errors_are_retried(fake_llm, monkeypatch):
+    retries = MEALPLAN_RETRIES.value()
+    flaky = _flaky(
+        fake_llm, monkeypatch, _api_error(503, "UNAVAILABLE"), _api_error(429, "RESOURCE_EXHAUSTED")
+    )
+
+    r = TestClient(app).post("/api/mealplan", json=PAYLOAD)
+
+    assert r.status_code == 200
+    assert flaky.calls == 3
+    assert llm_mealplan.mealplan_stats()["retries"] == 2
+    assert MEALPLAN_RETRIES.value() == retries + 2
+
+
+def test_client_errors_are_not_retried(fake_llm, monkeypatch):
+    flaky = _flaky(fake_llm, monkeypatch, _api_error(400, "INVALID_ARGUMENT"))
+
+    r = TestClient(app).post("/api/mealplan", json=PAYLOAD)
+
+    assert r.status_code == 503
+    assert flaky.calls == 1
+
+
+def test_persistent_rate_limit_is_429(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_LOCAL_FALLBACK", False)
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_MAX_RETRIES", 2)
+    flaky = _flaky(fake_llm, monkeypatch, *[_api_error(429, "RESOURCE_EXHAUSTED")] * 5)
+
+    r = TestClient(app).post("/api/mealplan", json=PAYLOAD)
+
+    assert r.status_code == 429
+    assert flaky.calls == 3
+
+
+def test_requests_queued_past_deadline_get_429(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_LOCAL_FALLBACK", False)
+    monkeypatch.setattr(llm_mealplan, "_bucket", TokenBucket(0.01, 1, key="deadline-test"))
+    monkeypatch.setattr(llm_mealplan, "MEALPLAN_QUEUE_DEADLINE_S", 0.05)
+    client = TestClient(app)
+    exceeded = MEALPLAN_DEADLINE_EXCEEDED.value()
+
+    assert client.post("/api/mealplan", json=PAYLOAD).status_code == 200
+    second = client.post("/api/mealplan", json=PAYLOAD | {"age_years": 42})
+
+    assert second.status_code == 429
+    assert "queued longer" in second.json()["detail"]
+    stats = client.get("/api/mealplan/stats").json()
+    assert stats == {"queue_depth": 0, "throttled": 1, "retries": 0, "deadline_exceeded": 1}
+    assert RATE_LIMIT_WAITS.value("deadline-test") == 1
+    assert RATE_LIMIT_WAITING.value("deadline-test") == MEALPLAN_SLOT_WAITING.value() == 0
+    assert MEALPLAN_DEADLINE_EXCEEDED.value() == exceeded + 1
+    metrics = client.get("/metrics").text
+    assert 'rate_limit_waits_total{bucket="deadline-test"} 1' in metrics
+    assert 'rate_limit_waiting_requests{bucket="deadline-test"} 0' in metrics
+    for name in ("mealplan_slot_waiting_requests", "mealplan_queue_deadline_exceeded_total"):
+        assert f"\n{name} " in metrics
@@ -0,0 +1,149 @@
+import json
+import tracemalloc
+from itertools import product
+
+import numpy as np
+import pytest
+
+from app import records
+from app.bulk import iter_calc
+from app.formulas.strategies import resolve_macro_strategy
+from app.models import ActivityLevel, ForecastModel, Goal, MacroStrategy, Sex, UserInput
+
+
+def _users() -> list[UserInput]:
+    users = [
+        UserInput(
+            sex=sex,
+            goal=goal,
+            activity_level=activity,
+            age_years=age,
+            height_cm=170,
+            weight_kg=40 + age,
+            forecast_model=model,
+            forecast_weeks=age // 2,
+            **({} if strategy is None else {"macro_strategy": strategy}),
+        )
+        for sex, goal, activity, age, model, strategy in product(
+            Sex, Goal, ActivityLevel, (16, 33, 70), ForecastModel, (None, *MacroStrategy)
+        )
+    ]
+    return users + [
+        UserInput(
+            sex="male",
+            age_years=52,
+            height_cm=181,
+            weight_kg=95,
+            activity_level="very",
+            goal="maintain",
+            protein_g_per_kg=2.1,
+        ),
+        UserInput(
+            sex="female",
+            age_years=30,
+            unit_system="imperial",
+            height_in=64,
+            weight_lb=150,
+            activity_level="light",
+            net_carbs_g=40,
+        ),
+        UserInput(sex="female", age_years=30, activity_level="light"),
+        # Reaches 0 kg within the horizon.
+        UserInput(
+            sex="male",
+            age_years=30,
+            height_cm=150,
+            weight_kg=2,
+            activity_level="light",
+            goal="lose",
+            forecast_weeks=520,
+            protein_g_per_kg=0.5,
+            net_carbs_g=0,
+        ),
+    ]
+
+
+def test_calculated_records_decode_to_the_bulk_ndjson(tmp_path):
+    users = _users()
+    assert records.write_inputs(tmp_path / "users.kin", users, chunk_size=100) == len(users)
+    inputs = records.open_inputs(tmp_path / "users.kin")
+
+    out = records.calculate_records(inputs, tmp_path / "results.kout", chunk_size=77)
+
+    assert isinstance(inputs, np.memmap) and isinstance(out, np.memmap)
+    assert inputs.dtype.itemsize == 41
+    assert out.dtype["forecast"].shape == (521,)
+    lines = "".join(records.output_lines(records.open_outputs(tmp_path / "results.kout")))
+    expected = "".join(iter_calc(u.model_dump_json(exclude_unset=True) for u in users))
+    assert lines == expected
+    assert json.loads(lines.splitlines()[-2]) == {
+        "row": len(users) - 1,
+        "error": "For metric input, height_cm and weight_kg are required.",
+    }
+
+
+def test_forecasts_are_written_in_blocks_of_bounded_size(tmp_path, monkeypatch):
+    user = _users()[-1]  # 520 forecast weeks
+    records.write_inputs(tmp_path / "users.kin", [user] * 4096 + _users())
+    inputs = records.open_inputs(tmp_path / "users.kin")
+    records.calculate_records(inputs, tmp_path / "whole.kout")
+
+    monkeypatch.setattr(records, "FORECAST_BLOCK_BYTES", 1 << 20)
+    tracemalloc.start()
+    try:
+        records.calculate_records(inputs, tmp_path / "blocks.kout")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert (tmp_path / "blocks.kout").read_bytes() == (tmp_path / "whole.kout").read_bytes()
+    # One full-width temporary of the chunk alone would be 4096 * 521 * 8 bytes (17 MB).
+    assert peak < 10 << 20
+
+
+def test_inputs_round_trip_with_the_resolved_strategy(tmp_path):
+    users = _users()
+    records.write_inputs(tmp_path / "users.kin", users)
+
+    decoded = records.decode_users(records.open_inputs(tmp_path / "users.kin"))
+
+    fields = {"dietary", "mealplan", "macro_strategy"}
+    assert [u.model_dump(exclude=fields) for u in decoded] == [
+        u.model_dump(exclude=fields) for u in users
+    ]
+    assert [u.macro_strategy for u in decoded] == [resolve_macro_strategy(u) for u in users]
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_cli_converts_to_and_from_text(tmp_path, fmt):
+    users = _users()[::40]
+    src = tmp_path / f"users.{fmt}"
+    with open(src, "w", encoding="utf-8") as f:
+        records.write_users(users, f, fmt)
+
+    assert records.main(["encode", str(src), str(tmp_path / "users.kin")]) == 0
+    assert records.main(["calc", str(tmp_path / "users.kin"), str(tmp_path / "r.kout")]) == 0
+    assert records.main(["decode", str(tmp_path / "users.kin"), str(tmp_path / f"back.{fmt}")]) == 0
+    assert records.main(["decode", str(tmp_path / "r.kout"), str(tmp_path / "r.ndjson")]) == 0
+
+    # Decoded rows name their resolved strategy, so they encode to the same records.
+    assert records.main(["encode", str(tmp_path / f"back.{fmt}"), str(tmp_path / "b.kin")]) == 0
+    assert (tmp_path / "b.kin").read_bytes() == (tmp_path / "users.kin").read_bytes()
+    assert (tmp_path / "r.ndjson").read_text() == "".join(
+        records.output_lines(records.open_outputs(tmp_path / "r.kout"))
+    )
+
+
+def test_bad_files_and_rows_raise_value_error(tmp_path):
+    path = tmp_path / "users.kin"
+    records.write_inputs(path, _users()[:3])
+
+    with pytest.raises(ValueError, match="expected KETOOUT1"):
+        records.open_outputs(path)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        records.open_inputs(path)
+    records.write_inputs(path, [])
+    assert len(records.open_inputs(path)) == 0
+    with pytest.raises(ValueError, match="row 2"):
+        list(records.read_users([_users()[0].model_dump_json(), "", '{"sex": "male"}']))
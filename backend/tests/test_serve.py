@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.main import app
+from app.pools import POOL_REJECTED, WorkPool
+from app.serve import available_cpus, server_options
+from benchmarks.load_calc import free_port, load, start_server, stop_server
+
+PAYLOAD = {
+    "sex": "female",
+    "age_years": 30,
+    "height_cm": 165,
+    "weight_kg": 70,
+    "activity_level": "moderate",
+    "goal": "lose",
+}
+
+
+def test_pool_admits_up_to_max_in_flight_and_refuses_when_closed():
+    pool = WorkPool("test", threads=1, max_in_flight=2)
+    pool.acquire()
+    pool.acquire()
+    with pytest.raises(RuntimeError, match="at capacity"):
+        pool.acquire()
+
+    pool.release()
+    pool.close()
+    with pytest.raises(RuntimeError, match="shutting down"):
+        pool.acquire()
+    assert pool.in_flight == 1
+    assert POOL_REJECTED.value("test") == 2
+
+
+def test_pool_runs_blocking_work_on_its_own_threads():
+    pool = WorkPool("test", threads=2)
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def work() -> str:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.02)
+        with lock:
+            running -= 1
+        return threading.current_thread().name
+
+    async def go() -> list[str]:
+        return await asyncio.gather(*(pool.run_sync(work) for _ in range(6)))
+
+    names = asyncio.run(go())
+    assert peak == 2
+    assert threading.main_thread().name not in names
+
+
+def test_drain_waits_for_admitted_requests():
+    pool = WorkPool("test", threads=1)
+
+    async def go() -> tuple[int, int]:
+        async def request() -> None:
+            with pool:
+                await asyncio.sleep(0.1)
+
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        pool.close()
+        still_running = await pool.drain(timeout_s=0.01)
+        await task
+        return still_running, await pool.drain(timeout_s=1)
+
+    assert asyncio.run(go()) == (1, 0)
+
+
+@pytest.mark.parametrize("path", ["/api/mealplan", "/api/mealplan/stream"])
+def test_mealplan_routes_return_503_while_draining(fake_llm, monkeypatch, path):
+    pool = WorkPool("mealplan", threads=1)
+    pool.close()
+    monkeypatch.setattr(main, "MEALPLAN_POOL", pool)
+
+    r = TestClient(app).post(path, json=PAYLOAD)
+
+    assert r.status_code == 503
+    assert "shutting down" in r.json()["detail"]
+    assert fake_llm.models.calls == []
+
+
+def test_stream_releases_its_slot_and_shutdown_drains(fake_llm, monkeypatch):
+    pool = WorkPool("mealplan", threads=1)
+    monkeypatch.setattr(main, "MEALPLAN_POOL", pool)
+
+    with TestClient(app) as client:
+        r = client.post("/api/mealplan/stream", json=PAYLOAD)
+        assert r.status_code == 200
+        assert pool.in_flight == 0
+    assert pool.closed
+
+
+def test_server_options_default_to_one_worker_per_cpu(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+
+    options = server_options(["--port", "9000"])
+
+    assert options["workers"] == available_cpus()
+    assert options["port"] == 9000
+    assert server_options(["--workers", "3"])["workers"] == 3
+
+
+def test_served_calc_and_graceful_exit(tmp_path):
+    port = free_port()
+    with open(tmp_path / "server.log", "w+") as log:
+        proc = start_server(1, port, log=log)
+        try:
+            ok, errors = load(port, clients=1, connections=2, duration_s=0.3)
+        finally:
+            stop_server(proc)
+        log.seek(0)
+        output = log.read()
+
+    assert ok > 0 and errors == 0
+    assert "Application shutdown complete" in output
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+from app import main
+from app.startup import IMPORT_BUDGET_S, LAZY_MODULES, parse_importtime, report
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": list(sys.modules)}))
+"""
+
+
+def _import_app_main() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def test_import_app_main_is_lazy_and_within_budget():
+    runs = [_import_app_main() for _ in range(2)]
+
+    assert not set(LAZY_MODULES) & set(runs[0]["modules"])
+    assert min(r["seconds"] for r in runs) < IMPORT_BUDGET_S
+
+
+def test_mealplan_service_is_imported_on_first_use(monkeypatch):
+    monkeypatch.setattr(main, "_mealplan_service", None)
+
+    service = asyncio.run(main.mealplan_service())
+
+    assert service.__name__ == main.MEALPLAN_SERVICE
+    assert asyncio.run(main.mealplan_service()) is service
+
+
+def test_importtime_report():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     fastapi.params\n"
+        "import time:       300 |        400 |   fastapi\n"
+        "import time:       600 |       1000 | app.main\n"
+    )
+
+    entries = parse_importtime(stderr)
+    text = report(entries, "app.main", top=2)
+
+    assert [(e.module, e.depth) for e in entries] == [
+        ("fastapi.params", 2),
+        ("fastapi", 1),
+        ("app.main", 0),
+    ]
+    assert text.startswith("import app.main: 0.001 s")
+    assert "0.4 ms   40.0%  fastapi" in text
+    assert "google.genai: not imported (lazy)" in text
@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.batch import calculate_batch
+from app.cache import calc_cache_key
+from app.calc import calculate_all
+from app.main import app
+from app.models import ActivityLevel, Goal, MacroStrategy, SweepRequest, UserInput
+from app.sweep import calculate_sweep
+
+client = TestClient(app)
+
+USER = {
+    "sex": "male",
+    "age_years": 41,
+    "height_cm": 178,
+    "weight_kg": 92,
+    "activity_level": "moderate",
+    "goal": "lose",
+}
+
+
+def _macros(**extra) -> dict:
+    r = client.post("/api/calc", json=USER | extra)
+    assert r.status_code == 200, r.text
+    return r.json()["macros"]
+
+
+def test_without_macro_fields_the_original_rules_apply():
+    macros = _macros()
+
+    assert macros["net_carbs_g"] == 20.0
+    assert macros["protein_g"] == 92 * 1.8
+    assert _macros(macro_strategy="fixed_keto", net_carbs_g=50) == macros
+
+
+def test_sent_macro_fields_are_honored():
+    macros = _macros(net_carbs_g=35, protein_g_per_kg=2.0)
+
+    assert macros["net_carbs_g"] == 35.0
+    assert macros["protein_g"] == 92 * 2.0
+    assert macros["fat_g"] == (macros["calories_total"] - (184.0 * 4.0 + 35.0 * 4.0)) / 9.0
+    # Sending fixed_keto's own protein for the goal changes nothing.
+    assert _macros(protein_g_per_kg=1.8) == _macros()
+
+
+@pytest.mark.parametrize("goal", ["maintain", "gain"])
+def test_a_field_left_out_keeps_the_fixed_keto_value(goal):
+    fixed = _macros(goal=goal)
+
+    carbs_only = _macros(goal=goal, net_carbs_g=35)
+    assert carbs_only["net_carbs_g"] == 35.0
+    assert carbs_only["protein_g"] == fixed["protein_g"]
+
+    protein_only = _macros(goal=goal, protein_g_per_kg=2.0)
+    assert protein_only["net_carbs_g"] == fixed["net_carbs_g"] == 20.0
+    assert protein_only["protein_g"] == 92 * 2.0
+
+
+def test_lean_mass_scales_protein_with_fat_free_mass():
+    body = client.post("/api/calc", json=USER | {"macro_strategy": "lean_mass"}).json()
+
+    lean_kg = 92 * (1.0 - body["body_fat_percent_estimate"] / 100.0)
+    assert body["macros"]["protein_g"] == pytest.approx(lean_kg * 2.2)
+    assert body["macros"]["net_carbs_g"] == 20.0
+
+
+def test_cyclical_and_targeted_average_the_week():
+    assert _macros(macro_strategy="cyclical")["net_carbs_g"] == pytest.approx(400 / 7)
+    targeted = _macros(macro_strategy="targeted")["net_carbs_g"]
+    assert targeted == pytest.approx(20 + 25 * 4 / 7)
+    rest = _macros(macro_strategy="targeted", activity_level="sedentary")
+    assert rest["net_carbs_g"] == 20.0
+
+
+def test_impossible_targets_are_400():
+    small = {"age_years": 90, "height_cm": 150, "weight_kg": 45, "activity_level": "sedentary"}
+    r = client.post("/api/calc", json=USER | small | {"net_carbs_g": 100, "protein_g_per_kg": 4})
+
+    assert r.status_code == 400
+    assert "too low" in r.json()["detail"]
+
+
+def test_cache_key_covers_the_strategy_and_its_inputs():
+    base = UserInput(**USER)
+    keys = {
+        calc_cache_key(base),
+        calc_cache_key(UserInput(**USER, net_carbs_g=20)),
+        calc_cache_key(UserInput(**USER, net_carbs_g=30)),
+        calc_cache_key(UserInput(**USER, macro_strategy=MacroStrategy.lean_mass)),
+    }
+
+    assert len(keys) == 4
+
+
+def test_mixed_strategy_batch_and_sweep_match_calc_exactly():
+    users = [
+        UserInput(**USER | {"goal": goal, "activity_level": activity}, macro_strategy=strategy)
+        for strategy in MacroStrategy
+        for goal in Goal
+        for activity in ActivityLevel
+    ]
+    users.append(UserInput(**USER | {"net_carbs_g": 42.5, "protein_g_per_kg": 1.3}))
+    users += [
+        UserInput(**USER | {"goal": goal, "activity_level": activity} | sent)
+        for goal in Goal
+        for activity in ActivityLevel
+        for sent in ({"net_carbs_g": 30.0}, {"protein_g_per_kg": 2.1})
+    ]
+
+    assert calculate_batch(users).outputs() == [calculate_all(u) for u in users]
+
+    partial = [UserInput(**USER, net_carbs_g=30), UserInput(**USER, protein_g_per_kg=2.1)]
+    for user in [UserInput(**USER, macro_strategy=s) for s in MacroStrategy] + partial:
+        out = calculate_sweep(
+            SweepRequest(user=user, goals=list(Goal), activity_levels=list(ActivityLevel))
+        )
+        for i, (goal, activity) in enumerate(zip(out.goal, out.activity_level, strict=True)):
+            update = {"goal": Goal(goal), "activity_level": ActivityLevel(activity)}
+            expected = calculate_all(user.model_copy(update=update)).macros
+            assert out.protein_g[i] == expected.protein_g
+            assert out.net_carbs_g[i] == expected.net_carbs_g
+            assert out.fat_g[i] == expected.fat_g
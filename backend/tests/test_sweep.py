@@ -0,0 +1,98 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.calc import calculate_all
+from app.main import app
+from app.models import ActivityLevel, ForecastModel, Goal, SweepRequest, UserInput
+from app.sweep import calculate_sweep
+
+client = TestClient(app)
+
+USER = {
+    "sex": "female",
+    "age_years": 34,
+    "height_cm": 168,
+    "weight_kg": 82.5,
+    "activity_level": "light",
+    "goal": "lose",
+    "forecast_weeks": 30,
+}
+
+
+@pytest.mark.parametrize("model", list(ForecastModel))
+def test_default_macros_match_calc_bit_for_bit(model):
+    user = UserInput(**USER, forecast_model=model)
+    out = calculate_sweep(
+        SweepRequest(user=user, goals=list(Goal), activity_levels=list(ActivityLevel))
+    )
+
+    assert len(out.tdee) == len(Goal) * len(ActivityLevel)
+    for i, (goal, activity) in enumerate(zip(out.goal, out.activity_level, strict=True)):
+        update = {"goal": Goal(goal), "activity_level": ActivityLevel(activity)}
+        expected = calculate_all(user.model_copy(update=update))
+        assert (out.bmi, out.bmr) == (expected.bmi, expected.bmr)
+        assert out.body_fat_percent_estimate == expected.body_fat_percent_estimate
+        assert out.ffmi == expected.ffmi
+        assert out.tdee[i] == expected.tdee
+        assert out.calories_total[i] == expected.macros.calories_total
+        assert out.protein_g[i] == expected.macros.protein_g
+        assert out.fat_g[i] == expected.macros.fat_g
+        assert out.net_carbs_g[i] == expected.macros.net_carbs_g
+        assert out.final_weight_kg[i] == expected.forecast.weight_at(user.forecast_weeks)
+
+
+def test_grid_order_ranges_and_custom_macros():
+    r = client.post(
+        "/api/calc/sweep",
+        json={
+            "user": USER,
+            "goals": ["lose", "gain"],
+            "protein_g_per_kg": [1.5, 2.0],
+            "net_carbs_g": {"start": 20, "stop": 30, "step": 5},
+        },
+    )
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["goal"] == ["lose"] * 6 + ["gain"] * 6
+    assert body["activity_level"] == ["light"] * 12
+    assert body["protein_g_per_kg"] == [1.5, 1.5, 1.5, 2.0, 2.0, 2.0] * 2
+    assert body["net_carbs_g"] == [20.0, 25.0, 30.0] * 4
+
+    protein_g = 82.5 * 2.0
+    assert body["protein_g"][4] == protein_g
+    expected_fat = (body["calories_total"][4] - (protein_g * 4.0 + 25.0 * 4.0)) / 9.0
+    assert body["fat_g"][4] == expected_fat
+    assert body["error"] == [None] * 12
+
+
+def test_infeasible_scenarios_get_an_error_instead_of_failing_the_sweep():
+    r = client.post(
+        "/api/calc/sweep",
+        json={"user": USER, "protein_g_per_kg": [4.0], "net_carbs_g": [20, 100]},
+    )
+
+    body = r.json()
+    assert r.status_code == 200
+    assert body["error"] == [None, "Calories too low for keto macro targets."]
+    assert body["fat_g"][0] > 0 and body["fat_g"][1] is None
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        {"protein_g_per_kg": {"start": 1.0, "stop": 2.0, "step": 0}},
+        {"net_carbs_g": [20, 150]},
+        {"protein_g_per_kg": {"start": 0.5, "stop": 4.0, "step": 0.0001}},
+        {"goals": []},
+    ],
+)
+def test_invalid_sweeps_are_rejected(extra):
+    assert client.post("/api/calc/sweep", json={"user": USER, **extra}).status_code == 422
+
+
+def test_shared_stage_errors_are_400():
+    r = client.post("/api/calc/sweep", json={"user": USER | {"age_years": 16}})
+
+    assert r.status_code == 400
+    assert "minors" in r.json()["detail"]